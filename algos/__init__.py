@@ -1,3 +1,5 @@
-from .algo_map import get_algo_method
-from .algos_def import AVAILABLE_ALGOS, get_required_algo_params, get_algo_info
-from .compute_features import get_features_from_segm_mask
+from .algo_map import get_algo_method, get_prewarm_algos, prewarm_algos
+from .algos_def import (AVAILABLE_ALGOS, registry, get_algo_names, get_required_algo_params, get_algo_info,
+                        discover_plugin_dirs)
+from .compute_features import get_features_from_segm_mask, geometry_options, measure_objects, add_measurements
+from .model_cache import model_cache, get_preload_models
@@ -1,12 +1,57 @@
+import functools
+import os
+import warnings
 from typing import Callable
 
-from .example_run import run_example
-from .stardist_run import run_stardist
+from .algos_def import registry
+from .labels import run_compacted
+from .planes import get_plane_axes, run_planes
+from .tiling import run_tiled
 
-# This maps the algo name from its definition in algos_def.py to its Callable method
-ALGOS_MAP = {"example": run_example, "stardist": run_stardist}
 
+def is_algo_loaded(algo_name: str) -> bool:
+    """ Whether the method of the given algo_name has already been imported """
+    plugin = registry.get(algo_name)
+    return plugin is not None and plugin.loaded
 
-def get_algo_method(algo_name: str) -> Callable or None:
-    """ Return the Callable algo method for the given algo name"""
-    return ALGOS_MAP.get(algo_name)
+
+def get_algo_method(algo_name: str, axes: str or None = None) -> Callable or None:
+    """ Return the Callable algo method for the given algo name, importing its module on first use
+    (which processes the image by tiles if the algo definition has a "tiling" entry, and a stack with the given axes
+    plane by plane if the algorithm is a 2D algorithm, its label outputs being converted to their smallest dtype) """
+    plugin = registry.get(algo_name)
+    if plugin is None:
+        return None
+    algo_method = plugin.load()
+    if plugin.tileable:
+        tiling = plugin.info["tiling"]
+        algo_method = functools.partial(run_tiled, algo_method, tile_size=tiling["tile_size"],
+                                        overlap=tiling["overlap"], label_outputs=plugin.info.get("label_outputs", []))
+    if plugin.stackable and get_plane_axes(axes):
+        algo_method = functools.partial(run_planes, algo_method, axes=axes)
+    if plugin.info.get("label_outputs"):
+        # the labels are compacted once assembled (the tiles & planes may not have the same number of objects)
+        algo_method = functools.partial(run_compacted, algo_method, label_outputs=plugin.info["label_outputs"])
+    return algo_method
+
+
+def get_prewarm_algos() -> [str]:
+    """
+    Get the names of the algorithms to import in the background at server startup, from the PYALGOS_PREWARM_ALGOS
+    environment variable, e.g. "stardist" ("all" for all the algorithms)
+    """
+    names = [name.strip() for name in os.environ.get("PYALGOS_PREWARM_ALGOS", "").split(",") if name.strip()]
+    return registry.names if "all" in names else names
+
+
+def prewarm_algos(algo_names: [str]):
+    """ Import the modules of the given algorithms, so that their first request does not pay the import cost """
+    for algo_name in algo_names:
+        plugin = registry.get(algo_name)
+        if plugin is None:
+            continue
+        try:
+            plugin.load()
+        except Exception as e:
+            # The error is raised again when the algorithm is used
+            warnings.warn(f"Could not prewarm algorithm {algo_name}: {e}")
@@ -1,3 +1,6 @@
+from .registry import AlgoRegistry, get_plugin_dirs
+
+# Definitions of the built-in algorithms, with the "module:function" reference of their method
 AVAILABLE_ALGOS = [
     {"id": 1, "name": "example", "description": "Description for example algorithm",
      "input_data_format": {"type": "2D image"},
@@ -15,7 +18,8 @@ AVAILABLE_ALGOS = [
           "description": "Description for choices",
           "type": "list", "values": ["Option A", "Option B"]}
      ],
-     "output_endpoints": ["image"]
+     "output_endpoints": ["image"],
+     "method": "algos.example_run:run_example"
      },
     {"id": 2, "name": "stardist", "description": "Object detection with star-convex shapes",
      "input_data_format": {"type": "2D image"},
@@ -25,46 +29,68 @@ AVAILABLE_ALGOS = [
           "type": "list", "values": ["2D_versatile_he", "2D_versatile_fluo"]},
          {"name": "prob_thresh", "display_name": "Probability threshold",
           "description": "Consider only object candidates from pixels with predicted object probability above this threshold",
-          "type": "float", "default_value": 0.5},
+          "type": "float", "min": 0, "max": 1, "default_value": 0.5},
          {"name": "nms_thresh", "display_name": "Overlap threshold",
           "description": "Perform non-maximum suppression that considers two objects to be the same when their area/surface overlap exceeds this threshold",
-          "type": "float", "default_value": 0.4},
+          "type": "float", "min": 0, "max": 1, "default_value": 0.4},
+         {"name": "norm_pmin", "display_name": "Normalization low percentile",
+          "description": "Percentile of the image intensities mapped to 0 by the normalization of the input image (estimated from a sample of the pixels)",
+          "type": "float", "min": 0, "max": 100, "default_value": 3.0, "less_than": "norm_pmax"},
+         {"name": "norm_pmax", "display_name": "Normalization high percentile",
+          "description": "Percentile of the image intensities mapped to 1 by the normalization of the input image (estimated from a sample of the pixels)",
+          "type": "float", "min": 0, "max": 100, "default_value": 99.8},
          {"name": "scale", "display_name": "Scale",
           "description": "Scale the input image internally by this factor and rescale the output accordingly (<1 to downsample, >1 to upsample)",
-          "type": "float", "default_value": 1.0},
+          "type": "float", "min": 0.01, "default_value": 1.0},
          {"name": "block_size", "display_name": "Tile size",
           "description": "Process input image in tiles of the provided shape",
-          "type": "int", "default_value": 2048},
+          "type": "int", "min": 1, "default_value": 2048},
          {"name": "min_overlap", "display_name": "Tile overlap",
           "description": "Amount of guaranteed overlap between tiles (All predicted object instances should be smaller than this value!)",
-          "type": "int", "default_value": 128}
+          "type": "int", "min": 0, "default_value": 128}
      ],
-     "output_endpoints": ["image", "features"]
+     "output_endpoints": ["image", "features"],
+     "label_outputs": ["image"],
+     "resources": {"cpus": 4, "memory_mb": 2048},
+     "method": "algos.stardist_run:run_stardist"
      }
 ]
 
 
+# Registry of the available algorithms: the built-in algorithms and the plugins discovered from the entry points
+# and the plugin directories
+registry = AlgoRegistry(AVAILABLE_ALGOS)
+registry.discover_entry_points()
+
+
+def discover_plugin_dirs(plugin_dirs: [str] or None = None):
+    """ Register the algorithms of the plugin directories (from the PYALGOS_PLUGIN_DIRS environment variable by
+    default), e.g. in the job worker processes, which import the modules of the plugins to run their methods """
+    for plugin_dir in get_plugin_dirs() if plugin_dirs is None else plugin_dirs:
+        registry.discover_directory(plugin_dir)
+
+
+discover_plugin_dirs()
+
+
+def get_algo_names() -> [str]:
+    """ Get the names of the available algorithms """
+    return registry.names
+
+
 def get_required_algo_params(algo_name: str) -> []:
     """ Get the list of required algo parameters for the given algo_name """
-    for algo in AVAILABLE_ALGOS:
-        if algo.get("name") == algo_name:
-            required_params = algo.get("required_parameters")
-            return required_params if required_params else []
-    return []
+    plugin = registry.get(algo_name)
+    return plugin.required_parameters if plugin else []
 
 
 def get_input_dataformat(algo_name: str) -> {}:
     """ Get information about the expected input data format for the given algo_name """
-    for algo in AVAILABLE_ALGOS:
-        if algo.get("name") == algo_name:
-            input_data_format = algo.get("input_data_format")
-            return input_data_format if input_data_format else {}
-    return {}
+    plugin = registry.get(algo_name)
+    return (plugin.info.get("input_data_format") or {}) if plugin else {}
 
 
 def get_algo_info(algo_name: str) -> {}:
     """ Get information about the given algo_name """
-    for algo in AVAILABLE_ALGOS:
-        if algo.get("name") == algo_name:
-            return algo
-    return {}
+    plugin = registry.get(algo_name)
+    return plugin.info if plugin else {}
@@ -1,39 +1,124 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import geojson
 import numpy as np
 from geojson import Feature
 from geojson import Polygon as geojson_polygon
+from scipy import ndimage
 from scipy.spatial import Delaunay
 from skimage import measure
 
+# Number of rows of the chunks of the images measured in parallel
+MEASUREMENTS_CHUNK_ROWS = 512
+# Number of chunks of the images measured in parallel
+MEASUREMENTS_WORKERS = int(os.environ.get("PYALGOS_MEASUREMENTS_WORKERS") or os.cpu_count() or 1)
+
+# Options of the geometries of the features extracted from the segmentation masks in the current context
+# (e.g. of a request, see geometry_options)
+_geometry_options = contextvars.ContextVar("pyalgos_geometry_options",
+                                           default={"tolerance": 0.0, "decimals": None, "holes": False})
+
+
+@contextmanager
+def geometry_options(tolerance: float = 0.0, decimals: int or None = None, holes: bool = False):
+    """
+    Set the options of the geometries of the features extracted by get_features_from_segm_mask in the enclosed block
+    (when they are not given as arguments), e.g. for the features computed by an algorithm for a request.
+
+    Args:
+        tolerance: Maximum distance in pixels between the simplified contours and the original ones (Douglas-Peucker
+         algorithm, 0 to keep all the vertices)
+        decimals: Number of decimals of the coordinates (0 for integers, None for full precision)
+        holes: Whether the contours of the holes of the objects are added to their polygons
+    """
+    token = _geometry_options.set({"tolerance": tolerance, "decimals": decimals, "holes": holes})
+    try:
+        yield
+    finally:
+        _geometry_options.reset(token)
 
-def get_features_from_segm_mask(segm_mask: np.ndarray) -> [geojson.Feature]:
+
+def get_features_from_segm_mask(segm_mask: np.ndarray, tolerance: float or None = None, decimals: int or None = None,
+                                holes: bool or None = None) -> [geojson.Feature]:
     """
     Args:
         segm_mask: Segmentation mask with the background pixels set to zero and the pixels assigned to a segmented
          object set to an int value
+        tolerance, decimals, holes: Options of the geometries (see geometry_options, whose values are used for the
+         options which are not given)
 
     Returns:
         A list containing the contours of each object as a geojson.Feature
     """
+    options = _geometry_options.get()
+    tolerance = options["tolerance"] if tolerance is None else tolerance
+    decimals = options["decimals"] if decimals is None else decimals
+    holes = options["holes"] if holes is None else holes
+    labels, objects_rings = [], []
+    for label, bbox, mask in _iter_objects(segm_mask):
+        labels.append(label)
+        objects_rings.append(_mask_to_rings(mask, offset=(bbox[0].start, bbox[1].start), holes=holes))
+    # The rings of all the objects are simplified at once
+    rings = _simplify_rings([ring for object_rings in objects_rings for ring in object_rings], tolerance, decimals)
+    rings = iter(rings)
     features = []
-    indices = np.unique(segm_mask)
-    indices = np.delete(indices, indices == 0)  # remove background
-    if indices.size > 0:
-        for i in indices.tolist():
-            geom = _mask_to_geometry(np.asarray(segm_mask == i))
-            features.append(Feature(geometry=geom, properties={"Detection ID": i}))
+    for label, object_rings in zip(labels, objects_rings):
+        # the coordinates are set directly instead of going through the per-vertex validation & rounding of the
+        # geojson constructor, which dominates the cost for many objects
+        geom = geojson_polygon()
+        geom["coordinates"] = [next(rings).tolist() for _ in object_rings]
+        features.append(Feature(geometry=geom, properties={"Detection ID": label}))
     return features
 
 
-def _mask_to_geometry(mask: np.ndarray) -> geojson.Polygon:
+def _iter_objects(segm_mask: np.ndarray):
+    """
+    Iterate over the objects of a segmentation mask in increasing label order, yielding for each object its label,
+    its bounding box (as a tuple of slices) and the binary mask of the object cropped to this bounding box.
+    The bounding boxes are computed in a single pass over the mask, so the total cost is proportional to the image
+    size plus the total area of the objects (instead of the number of objects times the image size).
+    """
+    if segm_mask.size == 0:
+        return
+    labels, label_image = _index_labels(segm_mask)
+    for index, bbox in enumerate(ndimage.find_objects(label_image), start=1):
+        if bbox is None:
+            continue
+        label = index if labels is None else labels[index].tolist()
+        yield label, bbox, label_image[bbox] == index
+
+
+def _index_labels(segm_mask: np.ndarray) -> (np.ndarray or None, np.ndarray):
+    """
+    Get the labels of a segmentation mask as indices (0 being the background): returns the label of each index
+    (None if the labels are the indices) and the image of the indices
+    """
+    if np.issubdtype(segm_mask.dtype, np.integer) and segm_mask.min() >= 0 and segm_mask.max() <= segm_mask.size:
+        # Integer labels can be used directly as indices (e.g. of the bounding boxes)
+        return None, segm_mask
+    # Otherwise (e.g. float masks, negative or very large label values) relabel the non-zero labels to consecutive
+    # indices from 1, 0 being the background whatever the order of the labels (e.g. with negative labels)
+    labels = np.unique(segm_mask)
+    labels = labels[labels != 0]
+    label_image = np.searchsorted(labels, segm_mask) + 1
+    label_image[segm_mask == 0] = 0
+    return np.insert(labels, 0, 0), label_image
+
+
+def _mask_to_rings(mask: np.ndarray, offset: (int, int) = (0, 0), holes: bool = False) -> [np.ndarray]:
     """
     Adapted from ksugar's samapi https://github.com/ksugar/samapi/blob/3c93d64497051ebb34ddeacd47153313bf31a5b5/src/samapi/utils.py#L16
     which is modified from https://github.com/MouseLand/cellpose_web/blob/main/utils.py
     Args:
         mask: Binary mask with background pixels = 0 & single object pixels = 1
+        offset: (row, column) position of the mask in the full image, added to the contour coordinates
+        holes: Whether the contours of the holes of the object are returned after its exterior contour
     Returns:
-        The contour of the object as a geojson.Polygon (if there is more than one object in the mask,
-         the geometry of the largest one is returned)
+        The closed contours of the object as arrays of (x, y) coordinates (if there is more than one object in the
+         mask, the contours of the largest one are returned)
     """
     # ensure the mask is binary for correct contours finding & handle objects at the edges properly by zero-padding
     mask = np.pad(mask > 0, 1)
@@ -46,10 +131,271 @@ def _mask_to_geometry(mask: np.ndarray) -> geojson.Polygon:
         for _, item in enumerate(contours_find):
             n_pixels.append(len(item))
         index = np.argmax(n_pixels)
-    contour = contours_find[index]
-    contour -= 1  # reset padding
-    contour_as_numpy = contour[:, np.argsort([1, 0])]  # sort for correct x-y convention
-    return geojson_polygon([contour_as_numpy.tolist()])
+    contours = [contours_find[index]]
+    if holes and len(contours_find) > 1:
+        contours += _find_holes(contours_find, index)
+    rings = []
+    for contour in contours:
+        contour -= 1  # reset padding
+        contour += offset  # move back to the full image coordinates
+        rings.append(contour[:, np.argsort([1, 0])])  # sort for correct x-y convention
+    return rings
+
+
+def _find_holes(contours: [np.ndarray], outer_index: int) -> [np.ndarray]:
+    """ Get the contours of the holes of the outer contour: the closed contours inside it with the opposite
+    orientation (the contours of the holes run in the opposite direction to the contours of the objects) """
+    outer = contours[outer_index]
+    orientation = np.sign(_signed_area(outer))
+    return [contour for i, contour in enumerate(contours)
+            if i != outer_index and np.sign(_signed_area(contour)) == -orientation and
+            measure.points_in_poly(contour[:1], outer)[0]]
+
+
+def _signed_area(ring: np.ndarray) -> float:
+    """ Signed area of a ring of coordinates (shoelace formula) """
+    return float(np.dot(ring[:-1, 0], ring[1:, 1]) - np.dot(ring[1:, 0], ring[:-1, 1])) / 2
+
+
+def _simplify_rings(rings: [np.ndarray], tolerance: float = 0.0, decimals: int or None = None) -> [np.ndarray]:
+    """
+    Simplify the closed rings with the Douglas-Peucker algorithm, and round their coordinates to the given number of
+    decimals (as integers for 0 decimals), removing the consecutive duplicated vertices.
+    The vertices of all the rings are processed at once, the rings with less than 4 vertices after simplification
+    being kept unchanged
+    """
+    if not rings or (tolerance <= 0 and decimals is None):
+        return rings
+    offsets = np.cumsum([0] + [len(ring) for ring in rings])
+    coordinates = np.concatenate(rings)
+    keep = _douglas_peucker(coordinates, offsets, tolerance) if tolerance > 0 else np.ones(len(coordinates), bool)
+    if decimals is not None:
+        coordinates = np.round(coordinates, decimals)
+        if decimals == 0:
+            coordinates = coordinates.astype(np.int64)
+        # remove the vertices equal to the previous kept vertex of their ring
+        kept = np.flatnonzero(keep)
+        duplicated = np.zeros(len(kept), dtype=bool)
+        duplicated[1:] = np.all(coordinates[kept[1:]] == coordinates[kept[:-1]], axis=1)
+        duplicated[np.searchsorted(kept, offsets[:-1])[np.diff(offsets) > 0]] = False  # first vertex of each ring
+        keep[kept[duplicated]] = False
+    simplified = []
+    for ring, start, end in zip(rings, offsets[:-1], offsets[1:]):
+        ring_keep = keep[start:end]
+        simplified.append(coordinates[start:end][ring_keep] if ring_keep.sum() >= 4 else
+                          coordinates[start:end])
+    return simplified
+
+
+def _douglas_peucker(coordinates: np.ndarray, offsets: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification of the closed rings (whose first & last vertices are the same) concatenated in
+    coordinates, with the ring i from offsets[i] to offsets[i + 1]: returns the mask of the vertices to keep.
+    The segments of all the rings are split at once at each iteration, so the number of iterations is the depth of
+    the recursion of the algorithm (instead of the number of segments)
+    """
+    keep = np.zeros(len(coordinates), dtype=bool)
+    starts, ends = offsets[:-1], offsets[1:] - 1
+    valid = ends > starts
+    starts, ends = starts[valid], ends[valid]
+    keep[starts] = keep[ends] = True
+    # The rings are first split at their farthest vertex from their first one, as the chord of a closed ring is
+    # a point (distance to the first vertex instead of the chord)
+    farthest = _segments_farthest(coordinates, starts, ends, to_chord=False)[0]
+    keep[farthest] = True
+    starts, ends = np.concatenate([starts, farthest]), np.concatenate([farthest, ends])
+    while len(starts):
+        split = ends - starts >= 2
+        starts, ends = starts[split], ends[split]
+        if not len(starts):
+            break
+        farthest, distances = _segments_farthest(coordinates, starts, ends)
+        split = distances > tolerance
+        keep[farthest[split]] = True
+        starts, ends = (np.concatenate([starts[split], farthest[split]]),
+                        np.concatenate([farthest[split], ends[split]]))
+    return keep
+
+
+def _segments_farthest(coordinates: np.ndarray, starts: np.ndarray, ends: np.ndarray, to_chord: bool = True) -> \
+        (np.ndarray, np.ndarray):
+    """ For each segment of vertices from starts to ends (with at least one vertex inside), get the index of the
+    interior vertex which is the farthest from the chord of the segment (or from its start) and its distance """
+    lengths = ends - starts - 1
+    segment = np.repeat(np.arange(len(starts)), lengths)
+    first = np.cumsum(lengths) - lengths
+    indices = np.arange(lengths.sum()) - np.repeat(first, lengths) + np.repeat(starts + 1, lengths)
+    vectors = coordinates[indices] - coordinates[starts][segment]
+    if to_chord:
+        chords = (coordinates[ends] - coordinates[starts]).astype(np.float64)
+        chord_lengths = np.hypot(chords[:, 0], chords[:, 1])
+        cross = np.abs(chords[segment, 0] * vectors[:, 1] - chords[segment, 1] * vectors[:, 0])
+        distances = np.where(chord_lengths[segment] > 0, cross / np.maximum(chord_lengths[segment], 1e-12),
+                             np.hypot(vectors[:, 0], vectors[:, 1]))
+    else:
+        distances = np.hypot(vectors[:, 0], vectors[:, 1])
+    maximum = np.maximum.reduceat(distances, first)
+    # first vertex of each segment reaching the maximum distance
+    candidates = np.flatnonzero(distances == maximum[segment])
+    _, first_candidates = np.unique(segment[candidates], return_index=True)
+    return indices[candidates[first_candidates]], maximum
+
+
+def translate_features(features: [geojson.Feature], offset: (float, float), scale: float = 1,
+                       decimals: int or None = None) -> [geojson.Feature]:
+    """ Translate in place the geometry of the features by the (x, y) offset (after scaling it by the scale factor),
+    rounding the coordinates to the given number of decimals (if not None), and return them. The measurements of
+    add_measurements depending on the coordinates are updated accordingly """
+    for feature in features:
+        geometry = feature.get("geometry")
+        if geometry is not None:
+            geometry["coordinates"] = _translate_coordinates(geometry["coordinates"], offset, scale, decimals)
+        properties = feature.get("properties") or {}
+        for name, axis in [("Centroid X", 0), ("Centroid Y", 1)]:
+            if name in properties:
+                properties[name] = properties[name] * scale + offset[axis]
+        if scale != 1:
+            for name, power in [("Area", 2), ("Perimeter", 1)]:
+                if name in properties:
+                    properties[name] = properties[name] * scale ** power
+    return features
+
+
+def _translate_coordinates(coordinates: [], offset: (float, float), scale: float = 1,
+                           decimals: int or None = None) -> []:
+    if not coordinates:
+        return coordinates
+    if isinstance(coordinates[0], (list, tuple)):
+        return [_translate_coordinates(item, offset, scale, decimals) for item in coordinates]
+    x, y = coordinates[0] * scale + offset[0], coordinates[1] * scale + offset[1]
+    if decimals is not None:
+        x, y = (round(x), round(y)) if decimals == 0 else (round(x, decimals), round(y, decimals))
+    return [x, y, *coordinates[2:]]
+
+
+def measure_objects(segm_mask: np.ndarray, image: np.ndarray or None = None,
+                    max_workers: int = MEASUREMENTS_WORKERS) -> {}:
+    """
+    Measure all the objects of a segmentation mask in a single pass over the mask: the sums of the pixel coordinates,
+    of their squares & products (and of the intensities of each channel of the image and of their squares), and the
+    lengths of the contours crossing each 2x2 cell of pixels are accumulated per label, by chunks of rows of the mask
+    processed in parallel for large masks.
+
+    Args:
+        segm_mask: Segmentation mask with the background pixels set to zero
+        image: Optional image (with the same height & width as the mask) whose intensities are measured
+        max_workers: Number of chunks of rows measured in parallel
+
+    Returns:
+        The measurements as columns (np.ndarray) with one value per object in increasing label order: "label",
+        "Area" (number of pixels), "Centroid X", "Centroid Y", "Eccentricity" (of the ellipse with the same second
+        moments), "Perimeter" (length of the contours of the object, including its holes, as found by
+        skimage.measure.find_contours on its mask), and for each channel c (from 1) of the image "Channel c mean" and
+        "Channel c std"
+    """
+    labels, label_image = _index_labels(segm_mask)
+    n_labels = int(label_image.max()) + 1 if label_image.size else 1
+    channels = None if image is None else image.reshape(image.shape[0], image.shape[1], -1)
+    chunks = [slice(row, min(row + MEASUREMENTS_CHUNK_ROWS, segm_mask.shape[0]))
+              for row in range(0, segm_mask.shape[0], MEASUREMENTS_CHUNK_ROWS)]
+
+    def chunk_moments(rows: slice) -> np.ndarray:
+        # Only the pixels of the objects are accumulated
+        row_coordinates, col_coordinates = np.nonzero(label_image[rows])
+        indices = label_image[rows][row_coordinates, col_coordinates]
+        row_coordinates = row_coordinates.astype(np.float64) + rows.start
+        col_coordinates = col_coordinates.astype(np.float64)
+        weights = [None, row_coordinates, col_coordinates, row_coordinates ** 2, col_coordinates ** 2,
+                   row_coordinates * col_coordinates]
+        if channels is not None:
+            values = channels[rows][row_coordinates.astype(np.intp) - rows.start, col_coordinates.astype(np.intp)]
+            values = values.astype(np.float64)
+            weights += [values[:, c] for c in range(values.shape[1])] + \
+                       [values[:, c] ** 2 for c in range(values.shape[1])]
+        return np.stack([np.bincount(indices, weights=weight, minlength=n_labels) for weight in weights] +
+                        [_contour_lengths(label_image, rows, n_labels)])
+
+    if len(chunks) > 1 and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="measure") as executor:
+            moments = sum(executor.map(chunk_moments, chunks))
+    else:
+        moments = sum(map(chunk_moments, chunks))
+
+    # Only the labels present in the mask are measured (excluding the background)
+    present = np.flatnonzero(moments[0, 1:]) + 1
+    area, sum_rows, sum_cols, sum_rows2, sum_cols2, sum_rows_cols = moments[:6, present]
+    centroid_row, centroid_col = sum_rows / area, sum_cols / area
+    # Central second moments & eigenvalues of the covariance matrix
+    mu_rows = sum_rows2 / area - centroid_row ** 2
+    mu_cols = sum_cols2 / area - centroid_col ** 2
+    mu_rows_cols = sum_rows_cols / area - centroid_row * centroid_col
+    half_trace = (mu_rows + mu_cols) / 2
+    delta = np.sqrt(((mu_rows - mu_cols) / 2) ** 2 + mu_rows_cols ** 2)
+    major, minor = half_trace + delta, np.maximum(half_trace - delta, 0)
+    eccentricity = np.sqrt(1 - np.divide(minor, major, out=np.ones_like(major), where=major > 0))
+    measurements = {"label": present if labels is None else labels[present],
+                    "Area": area,
+                    "Centroid X": centroid_col,
+                    "Centroid Y": centroid_row,
+                    "Eccentricity": eccentricity,
+                    "Perimeter": moments[-1, present]}
+    if channels is not None:
+        n_channels = channels.shape[2]
+        for c in range(n_channels):
+            mean = moments[6 + c, present] / area
+            variance = np.maximum(moments[6 + n_channels + c, present] / area - mean ** 2, 0)
+            measurements[f"Channel {c + 1} mean"] = mean
+            measurements[f"Channel {c + 1} std"] = np.sqrt(variance)
+    return measurements
+
+
+def _contour_lengths(label_image: np.ndarray, rows: slice, n_labels: int) -> np.ndarray:
+    """
+    Lengths of the contours of the objects of the label_image (with 0 as background) in the 2x2 cells of pixels whose
+    bottom row is in the rows (the image being padded with the background, the last chunk also has the cells below
+    its last row), per label. The contours are the marching squares contours at the 0.5 level of the binary mask of
+    each object (as skimage.measure.find_contours), so their length in a cell only depends on the corners of the
+    object: half a diagonal for 1 or 3 corners, 1 for 2 adjacent corners, and 2 half diagonals for 2 opposite
+    corners.
+    """
+    top = label_image[max(rows.start - 1, 0):rows.stop]
+    cells = np.pad(top, ((int(rows.start == 0), int(rows.stop == label_image.shape[0])), (1, 1)))
+    corners = [cells[:-1, :-1], cells[:-1, 1:], cells[1:, :-1], cells[1:, 1:]]
+    half_diagonal = np.sqrt(0.5)
+    lengths = np.zeros(n_labels)
+    for k, corner in enumerate(corners):
+        # each object of a cell is counted at its first corner
+        first = corner > 0
+        for previous in corners[:k]:
+            first &= corner != previous
+        if not first.any():
+            continue
+        labels = corner[first]
+        same = [other[first] == labels for other in corners]
+        count = np.sum(same, axis=0)
+        opposite = (count == 2) & ((same[0] & same[3]) | (same[1] & same[2]))
+        length = np.select([(count == 1) | (count == 3), opposite, count == 2], [half_diagonal, 2 * half_diagonal, 1])
+        lengths += np.bincount(labels, weights=length, minlength=n_labels)
+    return lengths
+
+
+def add_measurements(features: [geojson.Feature], segm_mask: np.ndarray, image: np.ndarray or None = None) -> \
+        [geojson.Feature]:
+    """
+    Add the measurements of measure_objects for the objects of the segm_mask to the properties of the features
+    (matched to the objects by their "Detection ID" property). The measurements do not depend on the options of the
+    geometries of the features (see geometry_options). Returns the features
+    """
+    measurements = measure_objects(segm_mask, image)
+    names = [name for name in measurements if name != "label"]
+    rows = {label: row for row, label in enumerate(measurements["label"].tolist())}
+    columns = [measurements[name].tolist() for name in names]
+    for feature in features:
+        row = rows.get(feature.get("properties", {}).get("Detection ID"))
+        if row is None:
+            continue
+        feature["properties"].update({name: column[row] for name, column in zip(names, columns)})
+    return features
 
 
 def get_triangulation_features(points: np.ndarray) -> [geojson.Feature]:
@@ -57,12 +403,71 @@ def get_triangulation_features(points: np.ndarray) -> [geojson.Feature]:
     Compute the Delaunay triangulation from the input points (e.g. coordinates of the centroids of the detected cells),
     then convert it to features (where each feature is a triangle), and return the list of features
     """
-    assert points.ndim == 2, "Excepting 2D array for input coordinates"
-    tri = Delaunay(points)
     features = []
-    for coords in points[tri.simplices]:
-        c = coords.tolist()
-        c.append(coords[0].tolist())  # to get a closed contour
-        geom = geojson_polygon([c])
+    for ring in _get_triangulation_rings(points).tolist():
+        geom = geojson_polygon()
+        geom["coordinates"] = [ring]
         features.append(Feature(geometry=geom))
     return features
+
+
+def get_triangulation_geojson(points: np.ndarray) -> bytes:
+    """
+    Compute the Delaunay triangulation from the input points, and serialize it directly as the bytes of a GeoJSON
+    FeatureCollection (where each feature is a triangle), without building intermediate geojson.Feature objects
+    """
+    rings = _get_triangulation_rings(points)
+    template = '{"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [[' + \
+               ", ".join(["[%r, %r]"] * rings.shape[1]) + ']]}, "properties": {}}'
+    features = ", ".join([template % tuple(ring) for ring in rings.reshape(len(rings), -1).tolist()])
+    return ('{"type": "FeatureCollection", "features": [' + features + ']}').encode()
+
+
+def get_triangulation(points: np.ndarray) -> {}:
+    """
+    Compute the Delaunay triangulation from the input points, and return it in a compact form: the "vertices"
+    (the input points) and the "triangles" as triplets of indices of vertices
+    """
+    _check_triangulation_points(points)
+    return {"vertices": points.tolist(), "triangles": Delaunay(points).simplices.tolist()}
+
+
+def get_feature_centroids(features: [geojson.Feature]) -> np.ndarray:
+    """
+    Get the (x, y) centroids of the features as an array of shape (number of features, 2), from their "Centroid X" &
+    "Centroid Y" measurements (see add_measurements) or else as the mean of the vertices of their exterior ring
+    """
+    centroids = np.empty((len(features), 2), dtype=np.float64)
+    for index, feature in enumerate(features):
+        properties = feature.get("properties") or {}
+        if "Centroid X" in properties and "Centroid Y" in properties:
+            centroids[index] = properties["Centroid X"], properties["Centroid Y"]
+            continue
+        geometry = feature.get("geometry") or {}
+        coordinates = geometry.get("coordinates") if geometry.get("type") == "Polygon" else None
+        if not coordinates or not coordinates[0]:
+            raise ValueError(f"Feature {index} has neither centroid measurements nor polygon geometry")
+        ring = np.asarray(coordinates[0], dtype=np.float64)[:, :2]
+        # the last vertex closes the ring
+        centroids[index] = ring[:-1].mean(axis=0) if len(ring) > 1 else ring[0]
+    return centroids
+
+
+def _check_triangulation_points(points: np.ndarray):
+    assert points.ndim == 2, "Excepting 2D array for input coordinates"
+    # NaN & infinite coordinates have no valid triangulation (nor JSON representation)
+    if not np.isfinite(points).all():
+        raise ValueError("Expecting finite coordinates for the triangulation points")
+
+
+def _get_triangulation_rings(points: np.ndarray) -> np.ndarray:
+    """
+    Compute the Delaunay triangulation from the input points, and return the closed contours of all the triangles
+    as an array of shape (number of triangles, 4, 2)
+    """
+    _check_triangulation_points(points)
+    simplices = Delaunay(points).simplices
+    # repeat the first vertex of each triangle to get closed contours
+    rings = points[np.concatenate([simplices, simplices[:, :1]], axis=1)]
+    # round to the default precision of the geojson.Polygon coordinates
+    return np.round(rings, 6)
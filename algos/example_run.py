@@ -2,11 +2,12 @@ import time
 
 import numpy as np
 
-from .compute_features import get_features_from_segm_mask
+from .compute_features import get_features_from_segm_mask, add_measurements
+from .timing import timed
 
 
 def draw_mask(image: np.ndarray) -> np.ndarray:
-    mask = np.zeros(shape=(image.shape[0], image.shape[1]), dtype=">u2")
+    mask = np.zeros(shape=(image.shape[0], image.shape[1]), dtype=np.uint16)
     hw_ratio = 12
     n, m = mask.shape[0], mask.shape[1]
     mask[n // 4 - n // hw_ratio: n // 4 + n // hw_ratio, m // 4 - m // hw_ratio: m // 4 + m // hw_ratio] = 1
@@ -36,7 +37,11 @@ def run_example(data: np.ndarray, **kwargs) -> {}:
             result_image[:, :, i] = np.where(mask > 0, data[:, :, i], mask)
 
     # Compute the geojson.Feature for each object from the mask
-    features = get_features_from_segm_mask(mask)
+    with timed("features"):
+        features = get_features_from_segm_mask(mask)
+    # Add the shape (area, perimeter, centroid, eccentricity) & intensity measurements of each object
+    with timed("measurements"):
+        add_measurements(features, mask, data)
 
     # Add measurements and classification to each feature by updating its properties
     # For QuPath: the measurements value should be a number (not a string)
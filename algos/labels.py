@@ -0,0 +1,42 @@
+from typing import Callable
+
+import numpy as np
+
+# Unsigned dtypes of the label images, from the smallest
+LABEL_DTYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+def minimal_label_dtype(labels: np.ndarray) -> np.dtype:
+    """ Get the smallest unsigned dtype (in native byte order) holding all the labels of a label image, or the dtype of
+    the labels in native byte order if they are not non-negative integers """
+    dtype = labels.dtype.newbyteorder("=")
+    if labels.dtype.kind not in "biu":
+        return dtype
+    if labels.size == 0:
+        return np.dtype(np.uint8)
+    if labels.dtype.kind == "i" and labels.min() < 0:
+        return dtype
+    max_label = int(labels.max())
+    return next(np.dtype(candidate) for candidate in LABEL_DTYPES if max_label <= np.iinfo(candidate).max)
+
+
+def compact_labels(labels: np.ndarray) -> np.ndarray:
+    """ Convert a label image to the smallest unsigned dtype holding its labels, in native byte order (the label
+    image itself if it already has this dtype) """
+    dtype = minimal_label_dtype(labels)
+    if labels.dtype == dtype and labels.dtype.isnative:
+        return labels
+    return labels.astype(dtype)
+
+
+def run_compacted(algo_method: Callable, data: np.ndarray, label_outputs: [str] = (), **algo_parameters) -> {}:
+    """
+    Run the algo_method and convert its label_outputs (segmentation masks) to the smallest unsigned dtype holding
+    their labels (e.g. uint16 instead of int32 for up to 65535 objects), so that the label images take less memory
+    and are returned with less bytes
+    """
+    result = algo_method(data, **algo_parameters)
+    for key in label_outputs:
+        if isinstance(result.get(key), np.ndarray):
+            result[key] = compact_labels(result[key])
+    return result
@@ -0,0 +1,125 @@
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from typing import Callable
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class ModelCache:
+    """
+    Per-process cache of the models used by the algorithms (e.g. the pretrained Stardist models).
+    Each model is loaded once with the loader registered for its algorithm and kept in memory for the next requests.
+    When the maximum number of models or the memory budget is exceeded, the least recently used models are evicted.
+    """
+
+    def __init__(self, max_models: int = 0, max_memory: int = 0):
+        """
+        Args:
+            max_models: Maximum number of models kept in memory (0 for no limit)
+            max_memory: Maximum memory in bytes used by the models kept in memory (0 for no limit)
+        """
+        self.max_models = max_models
+        self.max_memory = max_memory
+        self._loaders = {}
+        self._models = OrderedDict()  # (algo_name, model_name) -> (model, memory in bytes)
+        self._model_locks = {}  # (algo_name, model_name) -> threading.Lock
+        self._lock = threading.RLock()
+
+    def register_loader(self, algo_name: str, loader: Callable, memory_size: Callable = None):
+        """
+        Register the method loading a model from its name for the given algo_name, and optionally the method
+        returning the memory size in bytes of a loaded model
+        """
+        with self._lock:
+            self._loaders[algo_name] = (loader, memory_size)
+
+    def get(self, algo_name: str, model_name: str):
+        """ Return the model with the given model_name for the algo_name, loading it if it is not in the cache yet """
+        key = (algo_name, model_name)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            if algo_name not in self._loaders:
+                raise KeyError(f"No model loader registered for algorithm {algo_name}")
+            loader, memory_size = self._loaders[algo_name]
+            model = loader(model_name)
+            self._models[key] = (model, memory_size(model) if memory_size else 0)
+            self._evict(keep=key)
+            return model
+
+    def lock(self, algo_name: str, model_name: str) -> threading.Lock:
+        """
+        Lock serializing the use of the model with the given model_name for the algo_name by concurrent threads
+        (e.g. the images of a batch or the requests of several sessions), since the models (e.g. the Keras models of
+        Stardist) are not guaranteed to be thread-safe
+        """
+        with self._lock:
+            return self._model_locks.setdefault((algo_name, model_name), threading.Lock())
+
+    def preload(self, models: [(str, str)]):
+        """ Load the given (algo_name, model_name) models in the cache (e.g. at server startup) """
+        for algo_name, model_name in models:
+            try:
+                self.get(algo_name, model_name)
+            except Exception as e:
+                warnings.warn(f"Could not preload model {model_name} for algorithm {algo_name}: {e}")
+
+    def evict(self, algo_name: str, model_name: str):
+        """ Remove the given model from the cache """
+        with self._lock:
+            self._models.pop((algo_name, model_name), None)
+
+    def clear(self):
+        """ Remove all the models from the cache """
+        with self._lock:
+            self._models.clear()
+
+    @property
+    def memory(self) -> int:
+        """ Memory in bytes used by the models in the cache """
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._models.values())
+
+    def info(self) -> {}:
+        """ Get information about the loaded models (from least to most recently used) and the cache limits """
+        with self._lock:
+            models = [{"algo_name": algo_name, "model_name": model_name, "memory_bytes": nbytes}
+                      for (algo_name, model_name), (_, nbytes) in self._models.items()]
+        return {"models": models, "memory_bytes": sum(model["memory_bytes"] for model in models),
+                "max_models": self.max_models, "max_memory_bytes": self.max_memory}
+
+    def _evict(self, keep: (str, str)):
+        """ Evict the least recently used models (except the keep one) until the cache limits are satisfied """
+        for key in list(self._models.keys()):
+            if not self._over_limits():
+                break
+            if key != keep:
+                del self._models[key]
+
+    def _over_limits(self) -> bool:
+        return (0 < self.max_models < len(self._models)) or \
+            (0 < self.max_memory < sum(nbytes for _, nbytes in self._models.values()))
+
+
+def get_preload_models() -> [(str, str)]:
+    """
+    Get the (algo_name, model_name) models to preload at server startup, from the PYALGOS_PRELOAD_MODELS
+    environment variable, e.g. "stardist:2D_versatile_he,stardist:2D_versatile_fluo"
+    """
+    models = []
+    for item in os.environ.get("PYALGOS_PRELOAD_MODELS", "").split(","):
+        if item.strip():
+            algo_name, _, model_name = item.strip().partition(":")
+            models.append((algo_name, model_name))
+    return models
+
+
+# Cache shared by all the algorithms of the process
+model_cache = ModelCache(max_models=_env_int("PYALGOS_MODEL_CACHE_SIZE", 2),
+                         max_memory=_env_int("PYALGOS_MODEL_CACHE_MEMORY_MB", 0) * 1024 ** 2)
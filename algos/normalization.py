@@ -0,0 +1,36 @@
+import numpy as np
+
+# Maximum number of pixels sampled to estimate the percentiles of an image
+NORMALIZATION_SAMPLES = 2 ** 20
+
+
+def sample_pixels(data: np.ndarray, max_samples: int = NORMALIZATION_SAMPLES) -> np.ndarray:
+    """ Get a regular grid of pixels of the image data (with the height & width as first dimensions) with at most
+    max_samples pixels, as a strided view (only the sampled rows of a memory-mapped image are read) """
+    height, width = data.shape[:2]
+    step = max(1, int(np.sqrt(height * width / max_samples)))
+    while -(-height // step) * -(-width // step) > max_samples:
+        step += 1
+    return data[::step, ::step]
+
+
+def sample_percentiles(data: np.ndarray, pmin: float = 3, pmax: float = 99.8,
+                       max_samples: int = NORMALIZATION_SAMPLES) -> (float, float):
+    """
+    Estimate the pmin & pmax percentiles of the values of the image data (over all its channels, as
+    csbdeep.utils.normalize) from a regular grid of at most max_samples pixels, so that the cost & memory of the
+    estimation do not depend on the size of the image
+    """
+    if not 0 <= pmin < pmax <= 100:
+        raise ValueError(f"Unexpected percentiles {pmin} & {pmax}, expecting 0 <= pmin < pmax <= 100")
+    low, high = np.percentile(sample_pixels(data, max_samples), [pmin, pmax])
+    return float(low), float(high)
+
+
+def normalize_percentiles(data: np.ndarray, low: float, high: float, eps: float = 1e-20) -> np.ndarray:
+    """ Normalize the data with its low & high percentiles to float32 values (0 & 1 at the percentiles, as
+    csbdeep.utils.normalize_mi_ma without clipping) """
+    data = data.astype(np.float32)
+    data -= np.float32(low)
+    data /= np.float32(high - low + eps)
+    return data
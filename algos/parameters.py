@@ -0,0 +1,53 @@
+from typing import Any, Literal
+
+from pydantic import BaseModel, ConfigDict, Field, create_model, model_validator
+from pydantic_core import PydanticCustomError
+
+# Python types of the parameter types of the algorithm definitions
+PARAMETER_TYPES = {"int": int, "float": float, "string": str, "str": str, "bool": bool}
+
+
+def compile_parameters_model(algo_name: str, required_parameters: [{}]) -> type[BaseModel]:
+    """
+    Compile the required_parameters of an algorithm definition into a pydantic model, which checks the type of each
+    parameter (converting compatible values, e.g. "0.5" to a float), its range ("min" & "max" entries) or its choices
+    (the "values" of a "list" parameter), applies the "default_value" of the missing parameters and rejects the
+    unknown parameters. A parameter with a "less_than" entry (name of another parameter) should be less than the
+    other parameter
+    """
+    fields = {}
+    field_names = {param["name"]: f"param_{index}" for index, param in enumerate(required_parameters)}
+    orders = []
+    for param in required_parameters:
+        if param.get("less_than") is not None:
+            if param["less_than"] not in field_names:
+                raise ValueError(f"Unknown parameter {param['less_than']} in the less_than entry of {param['name']}")
+            orders.append((param["name"], param["less_than"]))
+
+    def check_orders(model: BaseModel) -> BaseModel:
+        for name, other_name in orders:
+            value, other_value = getattr(model, field_names[name]), getattr(model, field_names[other_name])
+            if value is not None and other_value is not None and not value < other_value:
+                raise PydanticCustomError(
+                    "less_than_parameter", "{name} ({value}) should be less than {other_name} ({other_value})",
+                    {"name": name, "value": value, "other_name": other_name, "other_value": other_value})
+        return model
+
+    validators = {"check_orders": model_validator(mode="after")(check_orders)} if orders else {}
+    for index, param in enumerate(required_parameters):
+        if param.get("type") == "list":
+            annotation = Literal[tuple(param.get("values", []))]
+        else:
+            annotation = PARAMETER_TYPES.get(param.get("type"), Any)
+        default = param["default_value"] if "default_value" in param else ...
+        # The fields are aliased so that the parameter names cannot conflict with the attributes of the pydantic models
+        fields[f"param_{index}"] = (annotation, Field(default, alias=param["name"], ge=param.get("min"),
+                                                      le=param.get("max"), description=param.get("description")))
+    return create_model(f"{algo_name}_parameters", __config__=ConfigDict(extra="forbid"), __validators__=validators,
+                        **fields)
+
+
+def validate_parameters(model: type[BaseModel], parameters: {} or None) -> {}:
+    """ Validate the parameters with the compiled model, and return them converted & completed with the defaults
+    (raises a pydantic.ValidationError listing all the errors) """
+    return model.model_validate(parameters or {}).model_dump(by_alias=True)
@@ -0,0 +1,77 @@
+import contextvars
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+# Number of planes processed in parallel (the algorithms are expected to release the GIL, e.g. numpy or TensorFlow)
+PLANES_WORKERS = int(os.environ.get("PYALGOS_PLANES_WORKERS") or os.cpu_count() or 1)
+
+# Axes of the planes of a stack (time & depth), and name of the property of the features giving their plane index
+PLANE_AXES = "TZ"
+PLANE_PROPERTIES = {"T": "T index", "Z": "Z index"}
+
+
+def get_plane_axes(axes: str or None) -> str:
+    """ Get the plane axes of an image with the given axes (e.g. "TZ" for "TZYXC", "" for a 2D image) """
+    return "".join(axis for axis in axes or "" if axis in PLANE_AXES)
+
+
+def run_planes(algo_method: Callable, data: np.ndarray, axes: str, max_workers: int = PLANES_WORKERS,
+               **algo_parameters) -> {}:
+    """
+    Run the 2D algo_method on each plane of a stack (in parallel) and assemble the results of the planes.
+    The image outputs are stacked along the plane axes (the labels of the segmentation masks are those of each
+    plane), the features are tagged with the index of their plane ("T index" & "Z index" properties) and
+    the other outputs are listed in the order of the planes.
+
+    Args:
+        algo_method: 2D algorithm method
+        data: Input stack, with the plane axes (time & depth) as first dimensions
+        axes: Axes of the data (see app.axes), e.g. "TZYX"
+        max_workers: Number of planes processed in parallel
+        **algo_parameters: Parameters of the algo_method
+
+    Returns:
+        The assembled outputs of the algorithm
+    """
+    plane_axes = get_plane_axes(axes)
+    if not plane_axes:
+        return algo_method(data, **algo_parameters)
+    planes_shape = data.shape[:len(plane_axes)]
+    assembled = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plane") as executor:
+        # Only a few planes are in flight at a time to bound the memory, and they are assembled in order
+        pending = deque()
+        for index in np.ndindex(planes_shape):
+            # the planes are processed in the context of the caller so that their stages timings are recorded
+            pending.append((index, executor.submit(contextvars.copy_context().run, algo_method, data[index],
+                                                   **algo_parameters)))
+            if len(pending) >= 2 * max_workers:
+                _add_plane(assembled, planes_shape, plane_axes, *_pop_result(pending))
+        while pending:
+            _add_plane(assembled, planes_shape, plane_axes, *_pop_result(pending))
+    return assembled
+
+
+def _pop_result(pending: deque) -> (tuple, {}):
+    index, future = pending.popleft()
+    return index, future.result()
+
+
+def _add_plane(assembled: {}, planes_shape: tuple, plane_axes: str, index: tuple, result: {}):
+    """ Add the outputs of the algorithm for the plane at the given index to the assembled outputs """
+    for key, value in result.items():
+        if isinstance(value, np.ndarray):
+            if key not in assembled:
+                assembled[key] = np.zeros(planes_shape + value.shape, dtype=value.dtype)
+            assembled[key][index] = value
+        elif key == "features":
+            plane = {PLANE_PROPERTIES[axis]: position for axis, position in zip(plane_axes, index)}
+            for feature in value:
+                feature.setdefault("properties", {}).update(plane)
+            assembled.setdefault(key, []).extend(value)
+        else:
+            assembled.setdefault(key, []).append(value)
@@ -0,0 +1,176 @@
+import importlib
+import importlib.metadata
+import importlib.util
+import os
+import sys
+import threading
+import types
+import warnings
+from typing import Callable
+
+from .parameters import compile_parameters_model, validate_parameters
+
+# Group of the Python entry points declaring algorithm plugins
+ENTRY_POINT_GROUP = "pyalgos.algorithms"
+# Package of the modules of the plugin directories, registered in sys.modules so that the methods they define can be
+# pickled (e.g. to run the jobs in worker processes)
+PLUGINS_PACKAGE = "pyalgos_plugins"
+
+# Default resources needed by a run of an algorithm
+DEFAULT_RESOURCES = {"cpus": 1, "memory_mb": 0, "gpu": False}
+
+
+class AlgoPlugin:
+    """
+    Algorithm declared by its definition (see algos_def.py), with the "module:function" reference of its method
+    (or the method itself) in its "method" entry. The method is only imported on first use
+    """
+
+    def __init__(self, definition: {}):
+        if not definition.get("name"):
+            raise ValueError(f"Missing name in the algorithm definition {definition}")
+        if not definition.get("method"):
+            raise ValueError(f"Missing method in the definition of the algorithm {definition['name']}")
+        self.name = definition["name"]
+        self._method = definition["method"]
+        # Information visible to the clients (the method is internal)
+        self.info = {key: value for key, value in definition.items() if key != "method"}
+        self.info["resources"] = {**DEFAULT_RESOURCES, **definition.get("resources", {})}
+        self.info.setdefault("batchable", True)
+        self.info["tileable"] = bool(definition.get("tiling"))
+        # The 2D algorithms process the stacks (time-lapses & Z-stacks) plane by plane
+        input_type = (definition.get("input_data_format") or {}).get("type", "2D image")
+        self.info.setdefault("stackable", input_type.startswith("2D"))
+        self.required_parameters = definition.get("required_parameters") or []
+        # Schema of the parameters by name, to check the input parameters without scanning the definition
+        self.parameters = {param["name"]: param for param in self.required_parameters}
+        # Validator of the parameters compiled once from their schema
+        self.parameters_model = compile_parameters_model(self.name, self.required_parameters)
+        self._lock = threading.Lock()
+
+    @property
+    def resources(self) -> {}:
+        return self.info["resources"]
+
+    @property
+    def batchable(self) -> bool:
+        return self.info["batchable"]
+
+    @property
+    def tileable(self) -> bool:
+        return self.info["tileable"]
+
+    @property
+    def stackable(self) -> bool:
+        return self.info["stackable"]
+
+    @property
+    def loaded(self) -> bool:
+        return callable(self._method)
+
+    def validate_parameters(self, parameters: {} or None) -> {}:
+        """ Check the types, ranges & choices of the parameters, and return them converted & completed with the
+        default values (raises a pydantic.ValidationError) """
+        return validate_parameters(self.parameters_model, parameters)
+
+    def load(self) -> Callable:
+        """ Import the method of the algorithm (once) and return it """
+        if not callable(self._method):
+            with self._lock:
+                if not callable(self._method):
+                    module_name, _, method_name = self._method.partition(":")
+                    self._method = getattr(importlib.import_module(module_name), method_name)
+        return self._method
+
+
+class AlgoRegistry:
+    """
+    Registry of the available algorithms, indexed by name. Besides the algorithms registered explicitly, plugins are
+    discovered from the Python entry points of the "pyalgos.algorithms" group, whose objects are algorithm
+    definitions (or lists of definitions), and from the Python files of plugin directories, which define the
+    ALGORITHMS list of algorithm definitions
+    """
+
+    def __init__(self, definitions: [{}] = ()):
+        self._plugins = {}
+        self._directories = set()
+        for definition in definitions:
+            self.register(definition)
+
+    def register(self, definition: {}) -> AlgoPlugin:
+        """ Register the algorithm with the given definition (raises a ValueError if its name is already used) """
+        plugin = AlgoPlugin(definition)
+        if plugin.name in self._plugins:
+            raise ValueError(f"Algorithm {plugin.name} is already registered")
+        self._plugins[plugin.name] = plugin
+        return plugin
+
+    def unregister(self, algo_name: str):
+        self._plugins.pop(algo_name, None)
+
+    @property
+    def names(self) -> [str]:
+        return list(self._plugins)
+
+    def __contains__(self, algo_name: str) -> bool:
+        return algo_name in self._plugins
+
+    def __len__(self) -> int:
+        return len(self._plugins)
+
+    def get(self, algo_name: str) -> AlgoPlugin or None:
+        return self._plugins.get(algo_name)
+
+    def discover_entry_points(self, group: str = ENTRY_POINT_GROUP):
+        """ Register the algorithms declared by the entry points of the given group """
+        for entry_point in importlib.metadata.entry_points(group=group):
+            try:
+                self._register_plugin(entry_point.load())
+            except Exception as e:
+                warnings.warn(f"Could not load algorithm plugin {entry_point.name}: {e}")
+
+    def discover_directory(self, directory: str):
+        """ Register the algorithms defined by the ALGORITHMS list of the Python files of the given directory
+        (once per directory) """
+        directory = os.path.abspath(directory)
+        if directory in self._directories:
+            return
+        self._directories.add(directory)
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(".py") or file_name.startswith("_"):
+                continue
+            try:
+                module = _load_plugin_module(os.path.join(directory, file_name))
+                self._register_plugin(getattr(module, "ALGORITHMS"))
+            except Exception as e:
+                warnings.warn(f"Could not load algorithm plugin {file_name}: {e}")
+
+    def _register_plugin(self, definitions: {} or [{}]):
+        for definition in [definitions] if isinstance(definitions, dict) else definitions:
+            self.register(definition)
+
+
+def get_plugin_dirs() -> [str]:
+    """ Get the plugin directories from the PYALGOS_PLUGIN_DIRS environment variable (separated by os.pathsep) """
+    return [path for path in os.environ.get("PYALGOS_PLUGIN_DIRS", "").split(os.pathsep) if path]
+
+
+def _load_plugin_module(path: str) -> types.ModuleType:
+    """ Import the Python file of a plugin directory as a module of the PLUGINS_PACKAGE (once per file) """
+    module_name = f"{PLUGINS_PACKAGE}.{os.path.basename(path)[:-3]}"
+    module = sys.modules.get(module_name)
+    if module is not None and getattr(module, "__file__", None) == path:
+        return module
+    if PLUGINS_PACKAGE not in sys.modules:
+        package = types.ModuleType(PLUGINS_PACKAGE)
+        package.__path__ = []
+        sys.modules[PLUGINS_PACKAGE] = package
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
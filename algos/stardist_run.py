@@ -1,8 +1,50 @@
 import numpy as np
-from csbdeep.utils import normalize
+from csbdeep.data import Normalizer
 from stardist.models import StarDist2D
 
-from .compute_features import get_features_from_segm_mask
+from .compute_features import get_features_from_segm_mask, add_measurements
+from .model_cache import model_cache
+from .normalization import sample_percentiles, normalize_percentiles
+from .timing import timed
+
+
+def _load_model(model_name: str) -> StarDist2D:
+    """ Load the pretrained Stardist model with the given model_name """
+    model = StarDist2D.from_pretrained(model_name)
+    if model is None:
+        raise ValueError(f"Unknown pretrained Stardist model {model_name}")
+    return model
+
+
+def _model_memory_size(model: StarDist2D) -> int:
+    """ Memory size in bytes of the weights of the Stardist model """
+    return int(sum(np.prod(weight.shape) * weight.dtype.size for weight in model.keras_model.weights))
+
+
+# The pretrained models are loaded once per process and kept in the model cache
+model_cache.register_loader("stardist", _load_model, _model_memory_size)
+
+
+class SampledPercentileNormalizer(Normalizer):
+    """
+    Normalizer of the input of the Stardist models with the percentiles of the whole image estimated beforehand
+    from a sample of its pixels (see algos.normalization). Stardist normalizes each block of the image with it just
+    before its prediction, so that the whole image is never converted to float
+    """
+
+    def __init__(self, data: np.ndarray, pmin: float, pmax: float):
+        self.low, self.high = sample_percentiles(data, pmin, pmax)
+
+    def before(self, x, axes):
+        return normalize_percentiles(x, self.low, self.high)
+
+    def after(self, mean, scale, axes):
+        # The normalization of the Stardist input is not reverted (as csbdeep.data.NoNormalizer)
+        return mean, scale
+
+    @property
+    def do_after(self):
+        return False
 
 
 def run_stardist(data: np.ndarray, **kwargs) -> {}:
@@ -16,8 +58,11 @@ def run_stardist(data: np.ndarray, **kwargs) -> {}:
     elif model_name == "2D_versatile_fluo":
         assert data.ndim == 2, \
             f"Expecting 2D single-channel image for predictions using the '{model_name}' model"
-    model = StarDist2D.from_pretrained(model_name)
+    model = model_cache.get("stardist", model_name)
     kwargs.pop("model_name")
+    # The percentiles are estimated from a sample of the image, and each block is normalized before its prediction
+    with timed("stardist_normalize"):
+        normalizer = SampledPercentileNormalizer(data, kwargs.pop("norm_pmin", 3.0), kwargs.pop("norm_pmax", 99.8))
 
     block_size = kwargs.get("block_size")
     if (data.shape[0] > block_size) or (data.shape[1] > block_size):
@@ -27,14 +72,20 @@ def run_stardist(data: np.ndarray, **kwargs) -> {}:
             axes = "YXC"
         else:
             raise ValueError(f"Unexpected image dimensions: {data.ndim}")
-        labels, polys = model.predict_instances_big(normalize(data), axes=axes, **kwargs)
+        with timed("stardist_predict"), model_cache.lock("stardist", model_name):
+            labels, polys = model.predict_instances_big(data, axes=axes, normalizer=normalizer, **kwargs)
     else:
         kwargs.pop("block_size")
         kwargs.pop("min_overlap")
-        labels, polys = model.predict_instances(normalize(data), **kwargs)
+        with timed("stardist_predict"), model_cache.lock("stardist", model_name):
+            labels, polys = model.predict_instances(data, normalizer=normalizer, **kwargs)
 
     # Compute the geojson.Feature for each object from the segmentation mask
-    features = get_features_from_segm_mask(labels)
+    with timed("features"):
+        features = get_features_from_segm_mask(labels)
+    # Add the shape & intensity measurements of each object (in the intensities of the input image)
+    with timed("measurements"):
+        add_measurements(features, labels, data)
     # Add the detection probabilitiy to each feature (same indexing as the polys since it orginates from the segmentation mask indices in both cases)
     probs = list(polys["prob"])
     for prob, feature in zip(probs, features):
@@ -0,0 +1,185 @@
+import contextvars
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+from scipy import ndimage
+
+from .compute_features import add_measurements, get_features_from_segm_mask, translate_features
+
+# Number of tiles processed in parallel (the algorithms are expected to release the GIL, e.g. numpy or TensorFlow)
+TILING_WORKERS = int(os.environ.get("PYALGOS_TILING_WORKERS") or os.cpu_count() or 1)
+
+
+def iter_tiles(shape: (int, int), tile_size: int, overlap: int):
+    """
+    Iterate over the tiles covering an image of the given (height, width) shape, in row-major order.
+    The cores of the tiles (of tile_size x tile_size pixels at most) partition the image, and each tile is
+    extended by overlap pixels on each side (within the image).
+    Yields the (row, column) slices of the extended tile and of its core, both in image coordinates
+    """
+    if tile_size <= 0 or overlap < 0:
+        raise ValueError(f"Unexpected tile size {tile_size} or overlap {overlap}")
+    for row in range(0, shape[0], tile_size):
+        for col in range(0, shape[1], tile_size):
+            core = (slice(row, min(row + tile_size, shape[0])), slice(col, min(col + tile_size, shape[1])))
+            tile = tuple(slice(max(0, s.start - overlap), min(s.stop + overlap, size)) for s, size in zip(core, shape))
+            yield tile, core
+
+
+def run_tiled(algo_method: Callable, data: np.ndarray, tile_size: int, overlap: int, label_outputs: [str] = (),
+              max_workers: int = TILING_WORKERS, **algo_parameters) -> {}:
+    """
+    Run the algo_method on overlapping tiles of the data (in parallel) and stitch the results of the tiles.
+    An image output listed in label_outputs is a segmentation mask: each object is kept from the tile containing
+    the center of its bounding box in its core (so the objects crossing the borders between tiles are not
+    duplicated, provided the overlap is larger than the objects) and relabelled with a unique id.
+    The other image outputs are stitched from the cores of the tiles.
+    The features outputs are translated to the image coordinates, and kept with the same rule as the objects
+    (using their "Detection ID" property if they relate to a label output, or the center of their bounding box).
+
+    Args:
+        algo_method: Algorithm method, whose image outputs have the same height & width as the input data
+        data: Input image, with the height & width as first dimensions
+        tile_size: Size of the core of the tiles
+        overlap: Number of overlapping pixels on each side of the tiles (should be larger than the objects)
+        label_outputs: Keys of the image outputs of the algorithm which are segmentation masks
+        max_workers: Number of tiles processed in parallel
+        **algo_parameters: Parameters of the algo_method
+
+    Returns:
+        The stitched outputs of the algorithm
+    """
+    if data.shape[0] <= tile_size and data.shape[1] <= tile_size:
+        return algo_method(data, **algo_parameters)
+
+    stitched = {}
+    next_label = [1]
+    tiles = iter_tiles(data.shape[:2], tile_size, overlap)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tile") as executor:
+        # Only a few tiles are in flight at a time to bound the memory, and they are stitched in order
+        # so that the resulting labels do not depend on the scheduling
+        pending = deque()
+        for tile, core in tiles:
+            # the tiles are processed in the context of the caller so that their stages timings are recorded
+            pending.append((tile, core, executor.submit(contextvars.copy_context().run, algo_method, data[tile],
+                                                        **algo_parameters)))
+            if len(pending) >= 2 * max_workers:
+                _stitch_tile(stitched, data, label_outputs, next_label, *_pop_result(pending))
+        while pending:
+            _stitch_tile(stitched, data, label_outputs, next_label, *_pop_result(pending))
+    return stitched
+
+
+def _pop_result(pending: deque) -> ((slice, slice), (slice, slice), {}):
+    tile, core, future = pending.popleft()
+    return tile, core, future.result()
+
+
+def _stitch_tile(stitched: {}, data: np.ndarray, label_outputs: [str], next_label: [int],
+                 tile: (slice, slice), core: (slice, slice), result: {}):
+    """ Add the outputs of the algorithm for the tile of the data to the stitched outputs """
+    shape = data.shape[:2]
+    offset = (tile[0].start, tile[1].start)
+    core_in_tile = tuple(slice(c.start - t.start, c.stop - t.start) for c, t in zip(core, tile))
+    relabelled, clipped = {}, {}  # label in the tile -> label in the stitched output, stitched mask of the object
+    for key in label_outputs:
+        labels = result.get(key)
+        if labels is None:
+            continue
+        if key not in stitched:
+            stitched[key] = np.zeros(shape + labels.shape[2:], dtype=np.int32)
+        relabelled, clipped = _stitch_labels(stitched[key], labels, offset, core_in_tile, next_label)
+    for key, value in result.items():
+        if key in label_outputs:
+            continue
+        if isinstance(value, np.ndarray):
+            if key not in stitched:
+                stitched[key] = np.zeros(shape + value.shape[2:], dtype=value.dtype)
+            stitched[key][core] = value[core_in_tile]
+        elif key == "features":
+            stitched.setdefault(key, []).extend(_stitch_features(value, offset, core_in_tile, relabelled,
+                                                                 bool(label_outputs), clipped, data[tile]))
+
+
+def _stitch_labels(stitched_labels: np.ndarray, labels: np.ndarray, offset: (int, int),
+                   core: (slice, slice), next_label: [int]) -> ({}, {}):
+    """
+    Copy the objects of the labels of a tile whose bounding box center is in the core of the tile to the
+    stitched_labels, with new labels, without overwriting the objects already stitched from previous tiles:
+    an object overlapping them (e.g. another detection of the same object from the previous tile) is dropped as a
+    duplicate if at least half of its pixels are already stitched, and is clipped to its remaining pixels otherwise.
+    Returns the mapping of the kept labels of the tile to their new labels, and the bounding box & stitched mask of
+    the clipped objects by label of the tile
+    """
+    relabelled, clipped = {}, {}
+    for index, bbox in enumerate(ndimage.find_objects(labels), start=1):
+        if bbox is None or not _center_in_core(bbox[0].start, bbox[0].stop - 1, bbox[1].start, bbox[1].stop - 1,
+                                               core):
+            continue
+        target = stitched_labels[bbox[0].start + offset[0]:bbox[0].stop + offset[0],
+                                 bbox[1].start + offset[1]:bbox[1].stop + offset[1]]
+        mask = labels[bbox] == index
+        free = mask & (target == 0)
+        n_free = np.count_nonzero(free)
+        if 2 * n_free <= np.count_nonzero(mask):
+            continue
+        target[free] = next_label[0]
+        if n_free < np.count_nonzero(mask):
+            clipped[index] = (bbox, free)
+        relabelled[index] = next_label[0]
+        next_label[0] += 1
+    return relabelled, clipped
+
+
+def _stitch_features(features: [], offset: (int, int), core: (slice, slice), relabelled: {},
+                     has_labels: bool, clipped: {} = None, tile_data: np.ndarray or None = None) -> []:
+    """ Select the features of a tile to keep (the features of the clipped objects being clipped as their
+    objects), and translate them to the image coordinates """
+    kept = []
+    for feature in features:
+        detection_id = feature.get("properties", {}).get("Detection ID")
+        if has_labels and detection_id is not None:
+            if detection_id not in relabelled:
+                continue
+            if clipped and detection_id in clipped:
+                _clip_feature(feature, *clipped[detection_id], tile_data)
+            feature["properties"]["Detection ID"] = relabelled[detection_id]
+        else:
+            coordinates = np.asarray(_flatten_coordinates(feature.get("geometry", {}).get("coordinates", [])))
+            if coordinates.size == 0:
+                continue
+            # The coordinates are in (x, y) order
+            if not _center_in_core(coordinates[:, 1].min(), coordinates[:, 1].max(),
+                                   coordinates[:, 0].min(), coordinates[:, 0].max(), core):
+                continue
+        kept.append(feature)
+    return translate_features(kept, (offset[1], offset[0]))
+
+
+def _clip_feature(feature, bbox: (slice, slice), mask: np.ndarray, tile_data: np.ndarray or None):
+    """ Replace the geometry of the feature of a clipped object by the contour of its stitched mask within its
+    bbox (in the coordinates of the tile), and update its measurements (see add_measurements) if it has any """
+    properties = feature["properties"]
+    segm_mask = mask * np.int64(properties["Detection ID"])
+    clipped_features = get_features_from_segm_mask(segm_mask)
+    if "Area" in properties:
+        image = tile_data[bbox] if tile_data is not None and "Channel 1 mean" in properties else None
+        add_measurements(clipped_features, segm_mask, image)
+    translate_features(clipped_features, (bbox[1].start, bbox[0].start))
+    feature["geometry"] = clipped_features[0]["geometry"]
+    properties.update(clipped_features[0]["properties"])
+
+
+def _center_in_core(row_min: float, row_max: float, col_min: float, col_max: float, core: (slice, slice)) -> bool:
+    row, col = (row_min + row_max) / 2, (col_min + col_max) / 2
+    return core[0].start <= np.floor(row + 0.5) < core[0].stop and core[1].start <= np.floor(col + 0.5) < core[1].stop
+
+
+def _flatten_coordinates(coordinates: []) -> []:
+    """ Flatten the nested coordinates of a geometry into a list of positions """
+    if not coordinates or not isinstance(coordinates[0], (list, tuple)):
+        return [coordinates[:2]] if coordinates else []
+    return [position for item in coordinates for position in _flatten_coordinates(item)]
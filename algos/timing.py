@@ -0,0 +1,45 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Measurements of the request being processed (None when the request is not instrumented)
+_measurements = contextvars.ContextVar("pyalgos_measurements", default=None)
+
+
+class Measurements:
+    """ Timings of the stages & other values (e.g. array sizes, number of objects) measured during a request """
+
+    def __init__(self):
+        self.timings = {}
+        self.values = {}
+
+
+@contextmanager
+def record_measurements() -> Measurements:
+    """ Record the measurements of the stages timed & values recorded in the enclosed block """
+    measurements = Measurements()
+    token = _measurements.set(measurements)
+    try:
+        yield measurements
+    finally:
+        _measurements.reset(token)
+
+
+@contextmanager
+def timed(stage: str):
+    """ Time the enclosed block as the given stage (e.g. "stardist_predict") of the current request.
+    The times of the stages with the same name are summed """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        measurements = _measurements.get()
+        if measurements is not None:
+            measurements.timings[stage] = measurements.timings.get(stage, 0) + time.perf_counter() - start
+
+
+def record(name: str, value: float):
+    """ Record a value (e.g. "result_objects") for the current request """
+    measurements = _measurements.get()
+    if measurements is not None:
+        measurements.values[name] = value
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import uuid
+import warnings
+
+import numpy as np
+
+
+class ArrayStore:
+    """
+    Store spilling the large arrays (e.g. the uploaded images and the label results) to memory-mapped .npy files in
+    a scratch directory, so that they are paged in & out by the OS instead of being held in the memory of the process.
+    The spilled arrays are np.memmap (copy-on-write, so that the algorithms can use them as any np.ndarray)
+    """
+
+    def __init__(self, directory: str or None = None, threshold: int = 0):
+        """
+        Args:
+            directory: Scratch directory where the files of the arrays are written (None to disable the store)
+            threshold: Size in bytes from which the arrays are spilled to disk
+        """
+        self.threshold = threshold
+        self.directory = None
+        if directory:
+            # The files of each process are in their own directory, removed when the store is closed
+            os.makedirs(directory, exist_ok=True)
+            self.directory = os.path.abspath(tempfile.mkdtemp(prefix="pyalgos-", dir=directory))
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def spill(self, data: np.ndarray or None) -> np.ndarray or None:
+        """ Write the data to a memory-mapped file if it is larger than the threshold, and return the np.memmap
+        (the data is returned as is if it is small or already memory-mapped) """
+        if not self.enabled or not isinstance(data, np.ndarray) or isinstance(data, np.memmap) or \
+                data.nbytes < self.threshold or data.dtype.hasobject:
+            return data
+        path = os.path.join(self.directory, uuid.uuid4().hex + ".npy")
+        array = np.lib.format.open_memmap(path, mode="w+", dtype=data.dtype, shape=data.shape)
+        array[...] = data
+        array.flush()
+        del array
+        return np.load(path, mmap_mode="c")
+
+    def is_spilled(self, data) -> bool:
+        """ Whether the data is an array spilled by this store """
+        return self.enabled and isinstance(data, np.memmap) and data.filename is not None and \
+            os.path.dirname(data.filename) == self.directory
+
+    def release(self, data: np.ndarray or None):
+        """ Delete the file of a spilled array (the array should not be used after) """
+        if self.is_spilled(data):
+            _remove(data.filename)
+
+    def info(self) -> {}:
+        """ Get the number of spilled arrays and their size on disk """
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".npy")] \
+            if self.enabled else []
+        return {"directory": self.directory, "threshold_bytes": self.threshold, "arrays": len(files),
+                "disk_bytes": sum(entry.stat().st_size for entry in files)}
+
+    def close(self):
+        """ Delete all the files of the store """
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _remove(path: str):
+    if not os.path.exists(path):
+        return
+    try:
+        # The file is only removed from the disk once the array is no longer mapped (on POSIX systems)
+        os.remove(path)
+    except OSError as e:
+        warnings.warn(f"Could not remove the spilled array {path}: {e}")
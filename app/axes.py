@@ -0,0 +1,54 @@
+import numpy as np
+
+# Axes of the stored images, in order: time (frames), depth (Z planes), height, width & channels.
+# A 2D image has the "YX" or "YXC" axes, and the time & depth axes of a stack are its planes
+AXES = "TZYXC"
+
+# Axes of the TIFF series (see tifffile) which are not in AXES: the samples are channels, and the other axes
+# (e.g. "I" or "Q" for the pages of a file without axes metadata) are planes
+_TIFF_AXES = {"S": "C"}
+
+
+def default_axes(ndim: int) -> str or None:
+    """ Get the axes of an image without axes information from its number of dimensions (None if ambiguous) """
+    return {2: "YX", 3: "YXC"}.get(ndim)
+
+
+def parse_axes(axes: str, ndim: int) -> str:
+    """ Parse the axes of an array with ndim dimensions (e.g. "ZYX" or "TZYXC"), raising a ValueError if they are
+    not a sequence of distinct axes of AXES with the height & width """
+    axes = axes.strip().upper()
+    if len(axes) != ndim or len(set(axes)) != ndim or not set(axes) <= set(AXES) or not {"Y", "X"} <= set(axes):
+        raise ValueError(f"Unexpected axes {axes} for an array with {ndim} dimensions, expecting distinct axes of "
+                         f"{AXES} including Y & X")
+    return axes
+
+
+def to_canonical(data: np.ndarray, axes: str, depth: int or None = None, frames: int or None = None) -> \
+        (np.ndarray, str):
+    """
+    Reorder the dimensions of the data with the given axes (e.g. the axes of a TIFF series) in the order of AXES,
+    and drop the time, depth & channel axes of size 1 (so that a single plane is a 2D image).
+    An axis of unknown type (e.g. the pages of a TIFF file without axes metadata) is split into frames x depth
+    planes if both are given, or is the time axis if only frames is given, and the depth axis otherwise.
+    Returns the reordered data (a view) and its axes
+    """
+    axes = "".join(_TIFF_AXES.get(axis, axis) for axis in axes.upper())
+    unknown = [index for index, axis in enumerate(axes) if axis not in AXES]
+    if len(unknown) > 1:
+        raise ValueError(f"Unexpected axes {axes}, expecting a single axis of unknown type")
+    if unknown:
+        index = unknown[0]
+        size = data.shape[index]
+        if frames and depth and frames * depth == size and "T" not in axes and "Z" not in axes:
+            data = data.reshape(data.shape[:index] + (frames, depth) + data.shape[index + 1:])
+            axes = axes[:index] + "TZ" + axes[index + 1:]
+        else:
+            axes = axes[:index] + ("T" if frames and not depth else "Z") + axes[index + 1:]
+    axes = parse_axes(axes, data.ndim)
+    # drop the axes of size 1 (except the height & width)
+    squeezed = tuple(index for index, axis in enumerate(axes) if axis in "TZC" and data.shape[index] == 1)
+    data = np.squeeze(data, axis=squeezed)
+    axes = "".join(axis for index, axis in enumerate(axes) if index not in squeezed)
+    order = sorted(range(len(axes)), key=lambda index: AXES.index(axes[index]))
+    return data.transpose(order), "".join(axes[index] for index in order)
@@ -0,0 +1,75 @@
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterator
+
+# Returned by next() when an iterator is exhausted (a StopIteration cannot be raised through a future)
+_END = object()
+
+
+class CodecExecutor:
+    """
+    Pool of workers running the CPU-bound decoding & encoding steps of the requests (e.g. the images & the features),
+    so that the event loop keeps serving the other requests meanwhile. The steps run in worker threads (the codecs of
+    PIL, tifffile & NumPy release the GIL for most of their work), and optionally in worker processes for very large
+    payloads, whose function & arguments should then be picklable
+    """
+
+    def __init__(self, max_workers: int = 4, process_workers: int = 0, process_threshold: int = 0):
+        """
+        Args:
+            max_workers: Number of worker threads
+            process_workers: Number of worker processes (0 to only use the threads)
+            process_threshold: Size in bytes of the payloads from which the steps run in the worker processes
+        """
+        self.max_workers = max_workers
+        self.process_workers = process_workers
+        self.process_threshold = process_threshold
+        self._threads = None
+        self._processes = None
+        self._lock = threading.Lock()
+
+    async def run(self, fn: Callable, *args, size: int or None = None):
+        """
+        Run fn(*args) in a worker and return its result. The step runs in a worker process if its payload size is
+        given and above the process threshold, otherwise in a worker thread in the context of the caller (so that the
+        timings of the request are recorded)
+        """
+        loop = asyncio.get_running_loop()
+        if self.process_workers > 0 and size is not None and size >= self.process_threshold:
+            return await loop.run_in_executor(self._get_processes(), fn, *args)
+        return await loop.run_in_executor(self._get_threads(), contextvars.copy_context().run, fn, *args)
+
+    async def iterate(self, iterator: Iterator):
+        """ Iterate over a synchronous iterator (e.g. the chunks of a streamed response) in the worker threads """
+        try:
+            while (item := await self.run(next, iterator, _END)) is not _END:
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def shutdown(self):
+        """ Stop the workers """
+        with self._lock:
+            for executor in (self._threads, self._processes):
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+            self._threads = self._processes = None
+
+    def _get_threads(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="codec")
+            return self._threads
+
+    def _get_processes(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                # Spawn (instead of fork) the workers since the server process may hold threads & TensorFlow state
+                self._processes = ProcessPoolExecutor(max_workers=self.process_workers,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+            return self._processes
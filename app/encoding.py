@@ -1,18 +1,106 @@
 import base64
 import io
+import json
+import tempfile
 
 import numpy as np
+import tifffile
 from PIL import Image
+from scipy import ndimage
+
+from algos.labels import minimal_label_dtype
+from algos.timing import timed
+from app.axes import default_axes, to_canonical
 
 # Remove the limit of the image size (for trusted data)
 Image.MAX_IMAGE_PIXELS = None
 
+# Size of the chunks of the streamed binary images
+CHUNK_SIZE = 1024 ** 2
+# Size above which the encoded images are written to a temporary file on disk instead of memory
+SPOOL_MAX_SIZE = 64 * 1024 ** 2
+# Number of features serialized at once by the streaming GeoJSON serializer
+FEATURES_CHUNK_SIZE = 1000
+# TIFF compressions available for the binary images ("zstd" requires the imagecodecs package)
+TIFF_COMPRESSIONS = {"none": None, "deflate": "zlib", "zstd": "zstd"}
+# First bytes of the TIFF & BigTIFF files
+TIFF_SIGNATURES = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+# Compact encodings of the label images (see encode_labels_rle & encode_labels_sparse)
+LABEL_ENCODINGS = ("rle", "sparse")
+
 
 def decode_image_bytes(data: bytes) -> np.ndarray or None:
     """
-    Decode an encoded image as bytes into a np.ndarray
+    Decode an encoded image as bytes into a np.ndarray (see read_image_stack)
+    """
+    return read_image_stack(io.BytesIO(data))[0]
+
+
+def read_image_stack(fp, depth: int or None = None, frames: int or None = None) -> (np.ndarray, str):
+    """
+    Decode an encoded image (e.g. TIFF or PNG) from the file-like fp into a np.ndarray, returned with its axes
+    (see app.axes). A multi-page TIFF file is decoded into a stack with the axes of its metadata (its pages being
+    split into frames x depth planes if they have no axes metadata, see app.axes.to_canonical)
+    """
+    signature = fp.read(4)
+    fp.seek(0)
+    if signature in TIFF_SIGNATURES:
+        # the spooled & temporary files have no name, which is required by tifffile
+        with tifffile.TiffFile(tifffile.FileHandle(fp, name="image.tif")) as tiff:
+            if len(tiff.pages) > 1:
+                series = tiff.series[0]
+                return to_canonical(series.asarray(), series.axes, depth=depth, frames=frames)
+        fp.seek(0)
+    data = np.array(Image.open(fp))
+    return data, default_axes(data.ndim)
+
+
+class UploadTooLarge(Exception):
+    """ Raised when an uploaded image exceeds the maximum upload size """
+
+
+async def spool_stream(stream, max_size: int = 0):
+    """
+    Write the chunks of bytes of the async iterator stream (e.g. the body of a request) to a file-like object,
+    which is kept in memory up to SPOOL_MAX_SIZE bytes and written to a temporary file on disk above.
+    Raises UploadTooLarge as soon as more than max_size bytes are received (if max_size > 0).
+    Returns the file-like object (positioned at its start) and the number of bytes received
+    """
+    fp = io.BytesIO()
+    size = 0
+    async for chunk in stream:
+        size += len(chunk)
+        if 0 < max_size < size:
+            fp.close()
+            raise UploadTooLarge(f"Upload exceeds the maximum size of {max_size} bytes")
+        if isinstance(fp, io.BytesIO) and size > SPOOL_MAX_SIZE:
+            file = tempfile.TemporaryFile()
+            file.write(fp.getbuffer())
+            fp.close()
+            fp = file
+        fp.write(chunk)
+    fp.seek(0)
+    return fp, size
+
+
+def decode_image_file(fp, dtype: str or None = None, shape: tuple or None = None) -> np.ndarray:
+    """
+    Decode an image from the file-like fp returned by spool_stream. If the dtype & shape are given, the data are
+    the raw bytes of the array in C order, which are used without copy (from the memory buffer, or memory-mapped
+    copy-on-write from the temporary file). Otherwise the data are an encoded image (e.g. TIFF or PNG)
     """
-    return np.array(Image.open(io.BytesIO(data)))
+    if dtype is None:
+        return read_image_stack(fp)[0]
+    dtype = np.dtype(dtype)
+    shape = tuple(shape)
+    expected_size = dtype.itemsize * int(np.prod(shape))
+    size = fp.seek(0, io.SEEK_END)
+    fp.seek(0)
+    if size != expected_size:
+        raise ValueError(f"Unexpected data size {size} for an array of dtype {dtype} and shape {shape}")
+    if isinstance(fp, io.BytesIO):
+        return np.frombuffer(fp.getbuffer(), dtype=dtype).reshape(shape)
+    return np.memmap(fp, dtype=dtype, mode="c", shape=shape)
 
 
 def decode_image(b64data: str) -> np.ndarray or None:
@@ -25,13 +113,231 @@ def decode_image(b64data: str) -> np.ndarray or None:
     return decode_image_bytes(base64.b64decode(b64data))
 
 
-def encode_image(data: np.ndarray) -> str:
+def decode_image_stack(b64data: str, depth: int or None = None, frames: int or None = None) -> (np.ndarray, str):
     """
-    Encode a np.ndarray into a Base64 encoded string (using the TIFF format)
+    Decode a Base64 encoded string into a np.ndarray, returned with its axes (see read_image_stack)
+    """
+    return read_image_stack(io.BytesIO(base64.b64decode(b64data)), depth=depth, frames=frames)
+
+
+def encode_image(data: np.ndarray, axes: str or None = None) -> str:
+    """
+    Encode a np.ndarray into a Base64 encoded string (using the TIFF format, a stack with the given axes being
+    encoded as a multi-page TIFF)
     """
     if data is None:
         return ''
-    img = Image.fromarray(data)
     img_byte_arr = io.BytesIO()
-    img.save(img_byte_arr, "TIFF")
+    if axes and axes not in ("YX", "YXC"):
+        _write_tiff_stack(img_byte_arr, data, axes)
+    else:
+        img = Image.fromarray(data)
+        img.save(img_byte_arr, "TIFF")
     return base64.b64encode(img_byte_arr.getvalue()).decode()
+
+
+def _write_tiff_stack(fp, data: np.ndarray, axes: str, compression: str or None = None):
+    """ Write a stack with the given axes as a multi-page TIFF, with a 2D plane in each page (the channels being
+    moved before the height & width) and the axes in the metadata """
+    order = sorted(range(len(axes)), key=lambda index: "TZCYX".index(axes[index]))
+    # the in-memory files have no name, which is required by tifffile
+    tifffile.imwrite(tifffile.FileHandle(fp, mode="wb", name="image.tif"), data.transpose(order),
+                     photometric="minisblack", metadata={"axes": "".join(axes[index] for index in order)},
+                     compression=compression)
+
+
+def iter_array_bytes(data: np.ndarray, chunk_size: int = CHUNK_SIZE):
+    """
+    Iterate over the raw bytes of a np.ndarray (in C order) in chunks of chunk_size bytes,
+    without copying the whole array if it is C-contiguous (only one chunk at a time is copied)
+    """
+    data = np.ascontiguousarray(data)
+    buffer = memoryview(data.reshape(-1).view(np.uint8))
+    for start in range(0, len(buffer), chunk_size):
+        yield buffer[start:start + chunk_size].tobytes()
+
+
+def encode_tiff_file(data: np.ndarray, compression: str = "none", axes: str or None = None) -> \
+        tempfile.SpooledTemporaryFile:
+    """
+    Encode a np.ndarray in the TIFF format with the given compression ("none", "deflate" or "zstd") into a temporary
+    file, which is kept in memory up to SPOOL_MAX_SIZE bytes and written to disk above (a stack with the given axes
+    being encoded as a multi-page TIFF)
+    """
+    if compression not in TIFF_COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression}, expecting one of {list(TIFF_COMPRESSIONS)}")
+    fp = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        if axes and axes not in ("YX", "YXC"):
+            _write_tiff_stack(fp, data, axes, TIFF_COMPRESSIONS[compression])
+        else:
+            # the in-memory spooled file has no name, which is required by tifffile
+            tifffile.imwrite(tifffile.FileHandle(fp, mode="wb", name="image.tif"), data,
+                             compression=TIFF_COMPRESSIONS[compression])
+    except KeyError as e:
+        # tifffile raises a KeyError when the codec of the compression is not installed
+        fp.close()
+        raise ValueError(f"Unsupported compression {compression}: {e}")
+    fp.seek(0)
+    return fp
+
+
+def iter_file_bytes(fp, chunk_size: int = CHUNK_SIZE):
+    """ Iterate over the bytes of the file-like fp in chunks of chunk_size bytes, then close it """
+    try:
+        while chunk := fp.read(chunk_size):
+            yield chunk
+    finally:
+        fp.close()
+
+
+def iter_geojson_features(features: [], chunk_size: int = FEATURES_CHUNK_SIZE, **members):
+    """
+    Serialize the features (geojson.Feature or dict) as the bytes of a {"features": [...]} JSON object,
+    by chunks of chunk_size features (the other members of the object, e.g. a pagination cursor, are added after
+    the features)
+    """
+    yield b'{"features": ['
+    for start in range(0, len(features), chunk_size):
+        with timed("serialize"):
+            chunk = json.dumps(features[start:start + chunk_size])[1:-1]
+        yield (chunk if start == 0 else ", " + chunk).encode()
+    yield b"]"
+    for name, value in members.items():
+        yield f", {json.dumps(name)}: {json.dumps(value)}".encode()
+    yield b"}"
+
+
+def encode_features_columnar(features: []) -> bytes:
+    """
+    Encode the features (with Polygon or MultiPolygon geometries) in a compact columnar format, as the bytes of a
+    NumPy .npz archive containing (following the GeoArrow MultiPolygon layout):
+     - "coordinates": the (x, y) coordinates of all the vertices, as a float64 array of shape (n_vertices, 2)
+     - "ring_offsets": the index of the first vertex of each ring in "coordinates" (plus the total number of vertices)
+     - "polygon_offsets": the index of the first ring of each polygon in "ring_offsets" (plus the number of rings)
+     - "geometry_offsets": the index of the first polygon of each feature in "polygon_offsets" (plus the number of
+       polygons)
+     - "properties/<name>": a column for each property of the features (float64 for numbers with missing values as
+       NaN, int64, bool or str)
+    """
+    coordinates, ring_offsets, polygon_offsets, geometry_offsets = [], [0], [0], [0]
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            raise ValueError(f"Unsupported geometry type {geometry.get('type')} for the columnar format")
+        for polygon in polygons:
+            for ring in polygon:
+                coordinates.extend(ring)
+                ring_offsets.append(len(coordinates))
+            polygon_offsets.append(len(ring_offsets) - 1)
+        geometry_offsets.append(len(polygon_offsets) - 1)
+    arrays = {"coordinates": np.asarray(coordinates, dtype=np.float64).reshape(-1, 2),
+              "ring_offsets": np.asarray(ring_offsets, dtype=np.int64),
+              "polygon_offsets": np.asarray(polygon_offsets, dtype=np.int64),
+              "geometry_offsets": np.asarray(geometry_offsets, dtype=np.int64)}
+    names = dict.fromkeys(name for feature in features for name in (feature.get("properties") or {}))
+    for name in names:
+        values = [(feature.get("properties") or {}).get(name) for feature in features]
+        arrays["properties/" + name] = _to_column(values)
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _to_column(values: []) -> np.ndarray:
+    """ Convert the values of a property to a typed column """
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, bool) for value in present) and len(present) == len(values):
+        return np.asarray(values, dtype=bool)
+    if present and all(isinstance(value, int) and not isinstance(value, bool) for value in present) and \
+            len(present) == len(values):
+        return np.asarray(values, dtype=np.int64)
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return np.asarray([np.nan if value is None else value for value in values], dtype=np.float64)
+    return np.asarray(["" if value is None else str(value) for value in values], dtype=str)
+
+
+def encode_labels(labels: np.ndarray, encoding: str) -> bytes:
+    """ Encode a label image with the given compact encoding ("rle" or "sparse") """
+    if encoding not in LABEL_ENCODINGS:
+        raise ValueError(f"Unknown label encoding {encoding}, expecting one of {list(LABEL_ENCODINGS)}")
+    if labels.dtype.kind not in "biu":
+        raise ValueError(f"Unexpected dtype {labels.dtype} for a label image, expecting integers")
+    if labels.dtype.kind == "b":
+        labels = labels.view(np.uint8)
+    return encode_labels_rle(labels) if encoding == "rle" else encode_labels_sparse(labels)
+
+
+def encode_labels_rle(labels: np.ndarray) -> bytes:
+    """
+    Encode a label image (or any integer image) as runs of equal values in C order, as the bytes of a NumPy .npz
+    archive containing:
+     - "shape": the shape of the label image
+     - "values": the label of each run (with the dtype of the label image)
+     - "lengths": the number of pixels of each run (with the smallest unsigned dtype holding them)
+    The label images being mostly background with long runs of the same object, the runs are a small fraction of
+    the pixels
+    """
+    flat = np.ravel(labels)
+    starts = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    starts = np.concatenate([[0], starts]) if flat.size else starts
+    lengths = np.diff(np.append(starts, flat.size))
+    buffer = io.BytesIO()
+    np.savez(buffer, shape=np.asarray(labels.shape, dtype=np.int64), values=flat[starts],
+             lengths=lengths.astype(minimal_label_dtype(lengths)))
+    return buffer.getvalue()
+
+
+def decode_labels_rle(data: bytes) -> np.ndarray:
+    """ Decode a label image encoded by encode_labels_rle """
+    with np.load(io.BytesIO(data)) as arrays:
+        return np.repeat(arrays["values"], arrays["lengths"]).reshape(tuple(arrays["shape"]))
+
+
+def encode_labels_sparse(labels: np.ndarray) -> bytes:
+    """
+    Encode a label image (with non-negative labels, 0 being the background) as the masks of its objects within their
+    bounding boxes, as the bytes of a NumPy .npz archive containing:
+     - "shape": the shape of the label image
+     - "labels": the label of each object (with the dtype of the label image)
+     - "bboxes": the bounding box of each object, as its start indices followed by its stop indices along each
+       dimension (with the smallest unsigned dtype holding them)
+     - "masks": the masks of the objects within their bounding boxes in C order, packed as bits (see numpy.packbits)
+       and concatenated
+     - "mask_offsets": the index of the first byte of the mask of each object in "masks" (plus the number of bytes)
+    """
+    if labels.size and labels.min() < 0:
+        raise ValueError("Unexpected negative labels for the sparse encoding")
+    object_labels, bboxes, masks = [], [], []
+    for index, bbox in enumerate(ndimage.find_objects(labels) if labels.size else [], start=1):
+        if bbox is None:
+            continue
+        object_labels.append(index)
+        bboxes.append([s.start for s in bbox] + [s.stop for s in bbox])
+        masks.append(np.packbits(labels[bbox] == index))
+    mask_offsets = np.cumsum([0] + [len(mask) for mask in masks], dtype=np.int64)
+    bboxes = np.asarray(bboxes, dtype=np.int64).reshape(-1, 2 * labels.ndim)
+    buffer = io.BytesIO()
+    np.savez(buffer, shape=np.asarray(labels.shape, dtype=np.int64),
+             labels=np.asarray(object_labels, dtype=labels.dtype), bboxes=bboxes.astype(minimal_label_dtype(bboxes)),
+             masks=np.concatenate(masks) if masks else np.zeros(0, dtype=np.uint8), mask_offsets=mask_offsets)
+    return buffer.getvalue()
+
+
+def decode_labels_sparse(data: bytes) -> np.ndarray:
+    """ Decode a label image encoded by encode_labels_sparse """
+    with np.load(io.BytesIO(data)) as arrays:
+        object_labels, bboxes, masks, offsets = (arrays["labels"], arrays["bboxes"].astype(np.int64), arrays["masks"],
+                                                 arrays["mask_offsets"])
+        labels = np.zeros(tuple(arrays["shape"]), dtype=object_labels.dtype)
+    ndim = labels.ndim
+    for label, bbox, start, stop in zip(object_labels, bboxes, offsets[:-1], offsets[1:]):
+        region = tuple(slice(bbox[axis], bbox[ndim + axis]) for axis in range(ndim))
+        shape = tuple(bbox[ndim:] - bbox[:ndim])
+        mask = np.unpackbits(masks[start:stop], count=int(np.prod(shape))).reshape(shape).astype(bool)
+        labels[region][mask] = label
+    return labels
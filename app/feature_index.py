@@ -0,0 +1,221 @@
+import operator
+import re
+import uuid
+from itertools import chain
+
+import numpy as np
+
+# Comparison operators of the property filters
+FILTER_OPERATORS = {">=": operator.ge, "<=": operator.le, "==": operator.eq, "!=": operator.ne, ">": operator.gt,
+                    "<": operator.lt}
+_FILTER_PATTERN = re.compile(r"^\s*(.+?)\s*(>=|<=|==|!=|>|<)\s*(.*?)\s*$")
+
+
+class StaleCursor(ValueError):
+    """ Raised when a cursor was returned by the index of another result """
+
+
+class FeatureIndex:
+    """
+    Index of the features of a result, to query them by bounding box and/or property filters with a cost proportional
+    to the number of hits (instead of the number of features):
+     - the bounding boxes of the features are indexed by a uniform grid, whose cells are about the size of a few
+       features, so that a bbox query only scans the features of the cells it covers
+     - the numeric properties are sorted on first use, so that a range filter is a binary search
+    The hits are returned in the order of the features, by pages of limit features following a cursor
+    """
+
+    def __init__(self, features: [], cell_size: float or None = None):
+        """
+        Args:
+            features: Features (geojson.Feature or dict)
+            cell_size: Size of the cells of the grid (None to use 4 times the median size of the features)
+        """
+        self.features = features
+        # Token of the index in the cursors, to detect the cursors of a previous result
+        self.token = uuid.uuid4().hex[:8]
+        self.bounds = _features_bounds(features)
+        valid = ~np.isnan(self.bounds).any(axis=1)
+        if cell_size is None:
+            sizes = np.max(self.bounds[valid, 2:] - self.bounds[valid, :2], axis=1)
+            cell_size = 4 * float(np.median(sizes)) if len(sizes) else 1
+        self.cell_size = max(cell_size, 1)
+        self._cells = self._build_grid(valid)
+        self._sorted_properties = {}
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def _build_grid(self, valid: np.ndarray) -> {}:
+        """ Map each cell (column, row) of the grid to the sorted indices of the features intersecting it """
+        indices = np.flatnonzero(valid)
+        if not len(indices):
+            # no feature with a geometry
+            return {}
+        first = np.floor(self.bounds[indices, :2] / self.cell_size).astype(np.int64)
+        last = np.floor(self.bounds[indices, 2:] / self.cell_size).astype(np.int64)
+        counts = (last[:, 0] - first[:, 0] + 1) * (last[:, 1] - first[:, 1] + 1)
+        # one entry per (feature, covered cell)
+        feature = np.repeat(np.arange(len(indices)), counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        widths = (last[:, 0] - first[:, 0] + 1)[feature]
+        columns = first[feature, 0] + offset % widths
+        rows = first[feature, 1] + offset // widths
+        order = np.lexsort((indices[feature], rows, columns))
+        columns, rows, entries = columns[order], rows[order], indices[feature][order]
+        starts = np.flatnonzero(np.r_[True, (columns[1:] != columns[:-1]) | (rows[1:] != rows[:-1])])
+        ends = np.r_[starts[1:], len(entries)]
+        return {(int(columns[start]), int(rows[start])): entries[start:end] for start, end in zip(starts, ends)}
+
+    def query(self, bbox: (float, float, float, float) or None = None, filters: [str] = (), limit: int or None = None,
+              cursor: str or None = None) -> ([], str or None):
+        """
+        Get the features intersecting the (x, y, width, height) bbox and matching all the property filters
+        (e.g. "Detection probability >= 0.8", see parse_filter), by pages of limit features starting at the cursor.
+        Returns the features and the cursor of the next page (None for the last page)
+        """
+        start = self._parse_cursor(cursor)
+        conditions = [parse_filter(value) for value in filters]
+        candidates = None
+        if bbox is not None:
+            candidates = self._query_bbox(bbox)
+        # The range filters select their hits by binary search, the other filters are checked on the candidates
+        for name, compare, value in conditions:
+            if compare in (operator.eq, operator.ne) or not isinstance(value, float):
+                continue
+            hits = self._query_range(name, compare, value)
+            candidates = hits if candidates is None else np.intersect1d(candidates, hits, assume_unique=True)
+        if candidates is None:
+            candidates = np.arange(len(self.features))
+        candidates = candidates[candidates >= start]
+        others = [(name, compare, value) for name, compare, value in conditions
+                  if compare in (operator.eq, operator.ne) or not isinstance(value, float)]
+        if not others:
+            hits = candidates[:None if limit is None else limit + 1].tolist()
+        else:
+            hits = []
+            for index in candidates:
+                properties = self.features[index].get("properties") or {}
+                if all(_matches(properties.get(name), compare, value) for name, compare, value in others):
+                    hits.append(int(index))
+                    if limit is not None and len(hits) > limit:
+                        break
+        next_cursor = None
+        if limit is not None and len(hits) > limit:
+            next_cursor = f"{self.token}:{hits[limit]}"
+            hits = hits[:limit]
+        return [self.features[index] for index in hits], next_cursor
+
+    def _query_bbox(self, bbox: (float, float, float, float)) -> np.ndarray:
+        """ Get the sorted indices of the features whose bounds intersect the (x, y, width, height) bbox """
+        x, y, width, height = bbox
+        x_min, y_min, x_max, y_max = x, y, x + width, y + height
+        first = np.floor(np.array([x_min, y_min]) / self.cell_size).astype(np.int64)
+        last = np.floor(np.array([x_max, y_max]) / self.cell_size).astype(np.int64)
+        n_cells = (last[0] - first[0] + 1) * (last[1] - first[1] + 1)
+        if n_cells > len(self._cells):
+            # a bbox larger than the indexed area: scan the non-empty cells
+            cells = [entries for (column, row), entries in self._cells.items()
+                     if first[0] <= column <= last[0] and first[1] <= row <= last[1]]
+        else:
+            cells = [self._cells[(column, row)] for column in range(first[0], last[0] + 1)
+                     for row in range(first[1], last[1] + 1) if (column, row) in self._cells]
+        if not cells:
+            return np.zeros(0, dtype=np.int64)
+        candidates = np.unique(np.concatenate(cells))
+        bounds = self.bounds[candidates]
+        inside = (bounds[:, 0] <= x_max) & (bounds[:, 2] >= x_min) & (bounds[:, 1] <= y_max) & (bounds[:, 3] >= y_min)
+        return candidates[inside]
+
+    def _query_range(self, name: str, compare, value: float) -> np.ndarray:
+        """ Get the sorted indices of the features whose numeric property compares to the value """
+        if name not in self._sorted_properties:
+            values = np.array([_to_float((feature.get("properties") or {}).get(name)) for feature in self.features],
+                              dtype=np.float64)
+            order = np.argsort(values, kind="stable")
+            # the missing values (NaN) are sorted last and excluded
+            n_values = int(np.count_nonzero(~np.isnan(values)))
+            self._sorted_properties[name] = (values[order[:n_values]], order[:n_values])
+        values, order = self._sorted_properties[name]
+        if compare is operator.ge:
+            selected = order[np.searchsorted(values, value, side="left"):]
+        elif compare is operator.gt:
+            selected = order[np.searchsorted(values, value, side="right"):]
+        elif compare is operator.le:
+            selected = order[:np.searchsorted(values, value, side="right")]
+        else:
+            selected = order[:np.searchsorted(values, value, side="left")]
+        return np.sort(selected)
+
+    def _parse_cursor(self, cursor: str or None) -> int:
+        if not cursor:
+            return 0
+        token, _, position = cursor.partition(":")
+        if token != self.token:
+            raise StaleCursor(f"The cursor {cursor} does not belong to the current result")
+        try:
+            return int(position)
+        except ValueError:
+            raise ValueError(f"Unexpected cursor {cursor}")
+
+
+def parse_filter(value: str) -> (str, callable, float or str):
+    """ Parse a property filter "<property name> <operator> <value>" (operators ">=", "<=", "==", "!=", ">" & "<"),
+    e.g. "Detection probability >= 0.8" or "Classification == Positive". Returns the property name, the comparison
+    operator and the value (as a float if it is a number) """
+    match = _FILTER_PATTERN.match(value)
+    if match is None:
+        raise ValueError(f"Unexpected filter {value}, expecting '<property name> <operator> <value>' with an operator "
+                         f"among {list(FILTER_OPERATORS)}")
+    name, operator_name, filter_value = match.groups()
+    number = _to_float(filter_value)
+    return name, FILTER_OPERATORS[operator_name], filter_value if np.isnan(number) else number
+
+
+def _matches(property_value, compare, value: float or str) -> bool:
+    if isinstance(value, float):
+        number = _to_float(property_value)
+        return not np.isnan(number) and compare(number, value)
+    return compare(str(property_value), value) if property_value is not None else compare is operator.ne
+
+
+def _to_float(value) -> float:
+    """ Convert a property value to a float (NaN for a missing or non-numeric value) """
+    if isinstance(value, bool) or value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _features_bounds(features: []) -> np.ndarray:
+    """ Get the (x min, y min, x max, y max) bounds of the geometries of the features (NaN without geometry),
+    from the positions of all the features converted at once """
+    positions, counts = [], []
+    for feature in features:
+        coordinates = (feature.get("geometry") or {}).get("coordinates")
+        feature_positions = _flatten_positions(coordinates) if coordinates else []
+        if feature_positions and len(feature_positions[0]) != 2:
+            feature_positions = [position[:2] for position in feature_positions]
+        positions.extend(feature_positions)
+        counts.append(len(feature_positions))
+    bounds = np.full((len(features), 4), np.nan)
+    counts = np.array(counts, dtype=np.int64)
+    if len(positions):
+        positions = np.fromiter(chain.from_iterable(positions), dtype=np.float64, count=2 * len(positions))
+        positions = positions.reshape(-1, 2)
+        with_positions = counts > 0
+        starts = (np.cumsum(counts) - counts)[with_positions]
+        bounds[with_positions, :2] = np.minimum.reduceat(positions, starts)
+        bounds[with_positions, 2:] = np.maximum.reduceat(positions, starts)
+    return bounds
+
+
+def _flatten_positions(coordinates: []) -> []:
+    """ Flatten the nested coordinates of a geometry into a list of positions """
+    if not isinstance(coordinates[0], (list, tuple)):
+        return [coordinates]
+    if not isinstance(coordinates[0][0], (list, tuple)):
+        return coordinates
+    return [position for item in coordinates for position in _flatten_positions(item)]
@@ -0,0 +1,220 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMEOUT = "timeout"
+FINAL_STATUSES = (DONE, FAILED, CANCELLED, TIMEOUT)
+
+
+class JobQueueFull(Exception):
+    """ Raised when a job is submitted while the queue of the JobManager is full """
+
+
+class Job:
+    """ Class containing the state of a job submitted to the JobManager """
+
+    def __init__(self, job_id: str, future: Future, timeout: float, info: {}):
+        self.id = job_id
+        self.info = info
+        self.timeout = timeout
+        self.submitted = time.time()
+        self.finished = None
+        self.error = None
+        self.output_endpoints = []
+        self._future = future
+        self._status = QUEUED
+        # Call of the job (method, args, kwargs & on_done callback), to submit it again if its workers are recycled
+        self._call = None
+
+    @property
+    def status(self) -> str:
+        if self._status in FINAL_STATUSES:
+            return self._status
+        if 0 < self.timeout < time.time() - self.submitted:
+            # The JobManager recycles the worker of a running job when its timeout expires
+            self._future.cancel()
+            self._finish(TIMEOUT, f"Job exceeded the timeout of {self.timeout} s")
+        elif self._future.running():
+            self._status = RUNNING
+        return self._status
+
+    @property
+    def elapsed(self) -> float:
+        """ Time in seconds since the job was submitted (until it finished) """
+        return (self.finished or time.time()) - self.submitted
+
+    def to_dict(self) -> {}:
+        return {"job_id": self.id, **self.info, "status": self.status, "error": self.error,
+                "elapsed": self.elapsed, "output_endpoints": self.output_endpoints}
+
+    def _finish(self, status: str, error: str or None = None):
+        self._status = status
+        self.error = error
+        self.finished = time.time()
+
+
+class JobManager:
+    """
+    Queue of jobs executed by a pool of workers. By default the workers are processes, so that CPU-bound algorithms
+    do not hold the GIL of the server process: the job method & arguments should then be picklable.
+    When the timeout of a running job expires, the worker processes are terminated and replaced, so that a hung job
+    does not keep its worker (the other jobs of the pool are submitted again to the new workers). A job running in a
+    worker thread cannot be interrupted: its result is discarded.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queued: int = 0, timeout: float = 0, worker_type: str = "process",
+                 history: int = 1000, initializer: Callable or None = None, initargs: tuple = ()):
+        """
+        Args:
+            max_workers: Number of jobs executed concurrently
+            max_queued: Maximum number of jobs waiting for a worker (0 for no limit)
+            timeout: Maximum time in seconds from the submission to the end of a job (0 for no limit)
+            worker_type: "process" or "thread"
+            history: Number of finished jobs whose status is kept
+            initializer: Function called with the initargs at the start of each worker process, e.g. to import the
+                modules of the job methods which are not importable by name
+        """
+        if worker_type not in ("process", "thread"):
+            raise ValueError(f"Unknown worker type {worker_type}")
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.worker_type = worker_type
+        self.history = history
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.RLock()
+
+    def submit(self, fn: Callable, args: tuple = (), kwargs: {} = None, on_done: Callable = None,
+               info: {} = None) -> Job:
+        """
+        Submit the job fn(*args, **kwargs) and return it immediately. When the job is done, on_done is called with
+        its result (in a thread of the server process) unless the job was cancelled or timed out in the meantime.
+        The result of on_done is used as the list of output endpoints of the job.
+        """
+        with self._lock:
+            pending = self._count(QUEUED) + self._count(RUNNING)
+            if 0 < self.max_queued and pending >= self.max_workers + self.max_queued:
+                raise JobQueueFull(f"Too many jobs in the queue ({self.max_queued})")
+            job = Job(uuid.uuid4().hex, None, self.timeout, info or {})
+            self._start(job, fn, args, kwargs or {}, on_done)
+            self._jobs[job.id] = job
+            self._prune()
+        if self.timeout > 0:
+            timer = threading.Timer(self.timeout, self._expire, args=(job,))
+            timer.daemon = True
+            timer.start()
+        return job
+
+    def complete(self, result, on_done: Callable = None, info: {} = None) -> Job:
+        """ Add a job whose result is already available (e.g. from a cache), calling on_done with it """
+        future = Future()
+        future.set_result(result)
+        job = Job(uuid.uuid4().hex, future, 0, info or {})
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._on_future_done(job, future, on_done)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """ Get the job with the given job_id """
+        with self._lock:
+            return self._jobs[job_id]
+
+    def cancel(self, job_id: str) -> Job:
+        """ Cancel the job with the given job_id (a running job continues in its worker but its result is
+        discarded) """
+        job = self.get(job_id)
+        if job.status not in FINAL_STATUSES:
+            job._future.cancel()
+            job._finish(CANCELLED)
+        return job
+
+    def shutdown(self):
+        """ Cancel the queued jobs and stop the workers """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.worker_type == "process":
+                # Spawn (instead of fork) the workers since the server process may hold threads & TensorFlow state
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=self.initializer, initargs=self.initargs)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        return self._executor
+
+    def _start(self, job: Job, fn: Callable, args: tuple, kwargs: {}, on_done: Callable or None):
+        """ Submit the call of the job to the workers """
+        job._call = (fn, args, kwargs, on_done)
+        job._future = self._get_executor().submit(fn, *args, **kwargs)
+        job._status = QUEUED
+        job._future.add_done_callback(lambda f: self._on_future_done(job, f, on_done))
+
+    def _expire(self, job: Job):
+        """ Time out the job if it is not finished: a queued job is cancelled, and the worker processes of a running
+        job are recycled """
+        with self._lock:
+            future = job._future
+            if future.done():
+                return
+            if not future.cancel() and self.worker_type == "process" and self._executor is not None:
+                self._recycle_workers(job)
+            if job._status not in FINAL_STATUSES:
+                job._finish(TIMEOUT, f"Job exceeded the timeout of {self.timeout} s")
+
+    def _recycle_workers(self, expired: Job):
+        """ Terminate the worker processes (running the expired job) and submit the other unfinished jobs again to new
+        workers """
+        executor, self._executor = self._executor, None
+        # Submit the other jobs again before terminating the processes: the broken pool then fails futures which are
+        # no longer the futures of the jobs (ignored by _on_future_done)
+        for job in list(self._jobs.values()):
+            if job is not expired and job._status not in FINAL_STATUSES and job._call is not None:
+                self._start(job, *job._call)
+        # the processes of the pool are not exposed by the executor
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, status: str) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def _prune(self):
+        """ Forget the oldest finished jobs beyond the history size """
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINAL_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _on_future_done(job: Job, future: Future, on_done: Callable or None):
+        # the future of a job submitted again to new workers is ignored
+        if future is not job._future or job.status in FINAL_STATUSES or future.cancelled():
+            return
+        exception = future.exception()
+        if exception is not None:
+            job._finish(FAILED, str(exception) or type(exception).__name__)
+            return
+        try:
+            if on_done is not None:
+                job.output_endpoints = on_done(future.result()) or []
+        except Exception as e:
+            job._finish(FAILED, str(e))
+            return
+        job._finish(DONE)
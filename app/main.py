@@ -1,14 +1,65 @@
-import warnings
+import asyncio
+import contextvars
+import io
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable
 
 import numpy as np
-from fastapi import FastAPI, HTTPException, status, Request
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, status, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from scipy.spatial import QhullError
+
+from algos import (registry, get_algo_names, get_required_algo_params, get_algo_info, get_algo_method, model_cache,
+                   get_preload_models, get_prewarm_algos, prewarm_algos, discover_plugin_dirs)
+from algos.compute_features import (translate_features, geometry_options, get_feature_centroids,
+                                   get_triangulation_geojson, get_triangulation)
+from algos.planes import get_plane_axes
+from algos.timing import timed, record
+from app import settings
+from app.array_store import ArrayStore
+from app.axes import default_axes, parse_axes, to_canonical
+from app.codec_executor import CodecExecutor
+from app.encoding import (encode_image, decode_image_file, spool_stream, UploadTooLarge, iter_array_bytes,
+                          encode_tiff_file, iter_file_bytes, iter_geojson_features, encode_labels,
+                          encode_features_columnar, decode_image_stack, read_image_stack, LABEL_ENCODINGS)
+from app.feature_index import FeatureIndex, StaleCursor
+from app.jobs import JobManager, JobQueueFull
+from app.metrics import Metrics, MetricsMiddleware
+from app.pyramid import ImagePyramid, parse_bbox
+from app.result_cache import ResultCache
+from app.sessions import SessionStore, DEFAULT_SESSION_ID
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Import the algorithms listed in PYALGOS_PREWARM_ALGOS in the background, without delaying the first requests
+    prewarm_names = get_prewarm_algos()
+    if prewarm_names:
+        asyncio.get_running_loop().run_in_executor(None, prewarm_algos, prewarm_names)
+    # Load the models listed in PYALGOS_PRELOAD_MODELS before serving the first requests
+    preload_models = get_preload_models()
+    for algo_name, _ in preload_models:
+        get_algo_method(algo_name)  # make sure the algorithm registered its model loader
+    await run_in_threadpool(model_cache.preload, preload_models)
+    yield
+    jobs.shutdown()
+    codecs.shutdown()
+    array_store.close()
 
-from algos import (AVAILABLE_ALGOS, get_required_algo_params, get_algo_info, get_algo_method)
-from app.encoding import encode_image, decode_image, decode_image_bytes
 
 app = FastAPI(title="Python algos app",
-              version="0.1.0")
+              version="0.1.0",
+              lifespan=lifespan)
+
+# Durations, stages timings & measured values of the requests, exported on /metrics
+metrics = Metrics()
+app.add_middleware(MetricsMiddleware, metrics=metrics, server_timing=settings.SERVER_TIMING)
 
 
 class Message(BaseModel):
@@ -32,6 +83,11 @@ class ImageData(BaseModel):
     dimensions: Dimensions or None = None
 
 
+class BatchData(BaseModel):
+    images: list[ImageData]
+    parameters: dict or None = None
+
+
 class ServerData:
     """ Class containing the data on the server side """
 
@@ -39,7 +95,12 @@ class ServerData:
         self._selected_algo = None
         self._algo_params = {}
         self._image_array = None
+        self._image_digest = None
+        self.axes = None
+        self._pyramid = None
         self._result = {}
+        self._result_pyramids = {}
+        self._feature_index = None
 
     @property
     def selected_algo_name(self) -> str or None:
@@ -47,7 +108,7 @@ class ServerData:
 
     @selected_algo_name.setter
     def selected_algo_name(self, algo: str):
-        if algo in available_algo_names:
+        if algo in registry:
             self._selected_algo = algo
         else:
             self._selected_algo = None
@@ -59,11 +120,8 @@ class ServerData:
 
     @algo_params.setter
     def algo_params(self, params: {}):
-        if _check_algo_params(self.selected_algo_name, params):
-            self._algo_params = params
-        else:
-            self._algo_params = {}
-            raise ValueError(params)
+        """ The params should be validated by _validate_algo_params """
+        self._algo_params = params
 
     @property
     def image_array(self) -> np.ndarray or None:
@@ -71,7 +129,40 @@ class ServerData:
 
     @image_array.setter
     def image_array(self, data: np.ndarray):
-        self._image_array = data
+        # A large image is spilled to a memory-mapped file, which the algorithms use as any np.ndarray
+        if data is not self._image_array:
+            array_store.release(self._image_array)
+        self._image_array = array_store.spill(data)
+        # The axes of a stack should be set after its data
+        self.axes = default_axes(data.ndim) if data is not None else None
+        self._pyramid = None
+        self._image_digest = None
+
+    @property
+    def image_digest(self) -> str or None:
+        """ Digest of the content of the image for the keys of the result cache, computed once per image (instead of
+        reading the whole image for each request, e.g. of a region or a pyramid level) """
+        if self._image_digest is None and self._image_array is not None:
+            self._image_digest = ResultCache.image_digest(self._image_array)
+        return self._image_digest
+
+    @property
+    def plane_axes(self) -> str:
+        """ Plane axes (time & depth) of the image, empty for a 2D image """
+        return get_plane_axes(self.axes)
+
+    def get_result_axes(self, data: np.ndarray) -> str or None:
+        """ Axes of an image output of the algorithm (with the plane axes of the image) """
+        plane_axes = self.plane_axes
+        spatial_axes = default_axes(data.ndim - len(plane_axes))
+        return plane_axes + spatial_axes if spatial_axes else None
+
+    @property
+    def pyramid(self) -> ImagePyramid or None:
+        """ Multiscale pyramid of the image, whose levels are computed on first use """
+        if self._pyramid is None and self._image_array is not None:
+            self._pyramid = ImagePyramid(self._image_array)
+        return self._pyramid
 
     @property
     def result(self) -> {}:
@@ -79,19 +170,81 @@ class ServerData:
 
     @result.setter
     def result(self, res: {}):
-        self._result = res
+        # The large result images (e.g. label images) are spilled to memory-mapped files (the res of the result cache
+        # is left unchanged)
+        for value in self._result.values():
+            if not any(value is new_value for new_value in res.values()):
+                array_store.release(value)
+        self._result = {key: array_store.spill(value) for key, value in res.items()}
+        self._result_pyramids = {}
+        self._feature_index = None
+
+    @property
+    def feature_index(self) -> FeatureIndex or None:
+        """ Index of the result features for the queries by bbox & properties, built on the first query """
+        features = self._result.get("features")
+        if self._feature_index is None and features is not None:
+            self._feature_index = FeatureIndex(list(features))
+        return self._feature_index
+
+    def query_features(self, bbox: (float, float, float, float) or None = None, filters: [str] = (),
+                       limit: int or None = None, cursor: str or None = None) -> ([], str or None):
+        """ Query the result features with the feature_index (built by the first query, e.g. in a codec worker rather
+        than on the event loop), see FeatureIndex.query """
+        return self.feature_index.query(bbox, filters, limit, cursor)
+
+    def get_result_pyramid(self, key: str) -> ImagePyramid:
+        """ Multiscale pyramid of the result image with the given key, whose levels are computed on first use """
+        if key not in self._result_pyramids:
+            labels = key in get_algo_info(self._selected_algo).get("label_outputs", [])
+            self._result_pyramids[key] = ImagePyramid(self._result[key], labels=labels)
+        return self._result_pyramids[key]
+
+    @property
+    def nbytes(self) -> int:
+        """ Memory in bytes used by the image & the result image (excluding the memory-mapped arrays) """
+        arrays = [self._image_array, self._result.get("image")]
+        nbytes = sum(array.nbytes for array in arrays if isinstance(array, np.ndarray) and
+                     not isinstance(array, np.memmap))
+        pyramids = [self._pyramid] + list(self._result_pyramids.values())
+        return nbytes + sum(pyramid.nbytes for pyramid in pyramids if pyramid is not None)
 
     def clear_all(self):
         self._selected_algo = None
         self._algo_params = {}
-        self._image_array = None
+        self.image_array = None
         self.result = {}
 
 
-# Available algos names & required parameters
-available_algo_names = [algo["name"] for algo in AVAILABLE_ALGOS]
+# Store spilling the large images & results of the sessions to memory-mapped files
+array_store = ArrayStore(directory=settings.STORE_DIR, threshold=settings.STORE_THRESHOLD)
+
+# Data of each client session, the clients which do not specify a session id share the default session
+# (the data of the deleted sessions is cleared to delete their memory-mapped files)
+sessions = SessionStore(ServerData, ttl=settings.SESSION_TTL, max_memory=settings.SESSION_MAX_MEMORY,
+                        on_delete=ServerData.clear_all)
+
+
+def _get_server_data(session_id: str) -> ServerData:
+    """ Get the ServerData of the given session_id """
+    try:
+        return sessions.get(session_id)
+    except KeyError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail=f"Session {session_id} not found")
+
+
+# Cache of the results of the algorithms
+result_cache = ResultCache(max_entries=settings.RESULT_CACHE_SIZE, max_memory=settings.RESULT_CACHE_MEMORY,
+                           directory=settings.RESULT_CACHE_DIR, max_disk_entries=settings.RESULT_CACHE_DISK_SIZE)
 
-server_data = ServerData()
+# Queue of the jobs running the algorithms asynchronously (the worker processes discover the plugin directories to
+# import the methods of their algorithms)
+jobs = JobManager(max_workers=settings.JOB_WORKERS, max_queued=settings.JOB_MAX_QUEUED, timeout=settings.JOB_TIMEOUT,
+                  worker_type=settings.JOB_WORKER_TYPE, initializer=discover_plugin_dirs)
+
+# Workers decoding & encoding the images & features of the async endpoints out of the event loop
+codecs = CodecExecutor(max_workers=settings.CODEC_WORKERS, process_workers=settings.CODEC_PROCESS_WORKERS,
+                       process_threshold=settings.CODEC_PROCESS_THRESHOLD)
 
 
 @app.get("/")
@@ -100,63 +253,129 @@ def welcome() -> {}:
 
 
 @app.get("/image/{algo_name}/parameters")
-def get_selected_algo_params(algo_name: str):
+def get_selected_algo_params(algo_name: str, session_id: str = DEFAULT_SESSION_ID):
     """ Get the algorithm parameters by the user for the given algo_name """
+    server_data = _get_server_data(session_id)
     if server_data.selected_algo_name != algo_name:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
     return server_data.algo_params
 
 
 @app.post("/image/{algo_name}/parameters", status_code=status.HTTP_201_CREATED)
-def set_algo_params(algo_name: str, params: Parameters) -> {}:
+def set_algo_params(algo_name: str, params: Parameters, session_id: str = DEFAULT_SESSION_ID) -> {}:
     """ Set the parameters for the algo_name """
+    server_data = _get_server_data(session_id)
     try:
         server_data.selected_algo_name = algo_name
     except ValueError:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Unknown algorithm {algo_name}")
-    try:
-        server_data.algo_params = params.parameters
-    except ValueError:
-        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Unexpected algorithm parameters for {algo_name}")
+    server_data.algo_params = {}
+    server_data.algo_params = _validate_algo_params(algo_name, params.parameters, loc=("body", "parameters"))
     return server_data.algo_params
 
 
-def _check_algo_params(algo_name: str, input_algo_params: {}) -> bool:
-    """ Check that the input_algo_params contain all the required algo parameters for the given algo_name
-    Returns True if all the required parameters are set """
-    if algo_name not in available_algo_names:
-        warnings.warn(f"Unknown algorithm {algo_name}")
-        return False
+def _validate_algo_params(algo_name: str, input_algo_params: {} or None, loc: tuple = ("parameters",)) -> {}:
+    """ Validate the input_algo_params with the compiled parameters model of the given algo_name (types, ranges,
+    choices), and return them converted & completed with the default values. The validation errors are returned
+    to the client as a 422 response listing the errors, located in the request by loc """
+    plugin = registry.get(algo_name)
+    if plugin is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Algorithm {algo_name} not found")
+    with timed("validate"):
+        try:
+            return plugin.validate_parameters(input_algo_params)
+        except ValidationError as e:
+            raise RequestValidationError([{**error, "loc": loc + error["loc"]}
+                                          for error in e.errors(include_url=False)])
 
-    # Check that each required parameter is contained in the input parameters
-    rqd_algo_params = get_required_algo_params(algo_name)
-    if not rqd_algo_params:
-        return True
-    rqd_algo_params_names = [param.get("name") for param in rqd_algo_params]
-    if not input_algo_params:
-        return False
-    input_algo_params_names = list(input_algo_params.keys())
-    for param_name in rqd_algo_params_names:
-        if param_name not in input_algo_params_names:
-            return False
-    return True
+
+def _get_algo_method_to_run(algo_name: str, server_data: ServerData):
+    """ Select the given algo_name for the server_data and return its method, after checking the algo parameters """
+    if algo_name not in registry:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Algorithm {algo_name} not found")
+    server_data.selected_algo_name = algo_name
+    # The parameters are validated before importing the algorithm
+    server_data.algo_params = _validate_algo_params(algo_name, server_data.algo_params)
+    algo_method = get_algo_method(server_data.selected_algo_name, server_data.axes)
+    if algo_method is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Algorithm implementation for {algo_name} not found")
+    return algo_method
+
+
+def _get_cache_key(algo_name: str, server_data: ServerData, roi: {} or None = None,
+                   geometry: {} or None = None) -> str or None:
+    """ Get the key of the result of the algo_name for the server_data (or for its given roi, with the given geometry
+    options of the features) in the result cache (None if the cache is disabled or there is no image) """
+    if not result_cache.enabled or server_data.image_array is None:
+        return None
+    algo_params = dict(server_data.algo_params)
+    if server_data.plane_axes:
+        algo_params["_axes"] = server_data.axes
+    if roi:
+        algo_params["_roi"] = roi
+    if geometry:
+        algo_params["_geometry"] = geometry
+    return result_cache.key(server_data.image_digest, algo_name, algo_params)
+
+
+def _get_geometry_options(tolerance: float, decimals: int or None, holes: bool) -> {} or None:
+    """ Get the options of the geometries of the features (None for the default full-precision contours) """
+    if tolerance == 0 and decimals is None and not holes:
+        return None
+    return {"tolerance": tolerance, "decimals": decimals, "holes": holes}
+
+
+def _read_input_image(server_data: ServerData, bbox: str or None, level: int) -> (np.ndarray, {} or None):
+    """ Read the region within the "x,y,width,height" bbox (in the coordinates of the image) of the given pyramid
+    level of the image of the server_data. Returns the region, and its position {"x", "y", "width", "height",
+    "level"} in the coordinates of the level (None for the whole image) """
+    if not bbox and level == 0:
+        return server_data.image_array, None
+    if server_data.image_array is None:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="No image data")
+    if server_data.plane_axes:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Regions & levels are only available for 2D images")
+    try:
+        with timed("read_roi"):
+            data, (x, y) = server_data.pyramid.read(parse_bbox(bbox), level)
+    except ValueError as ve:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    return data, {"x": x, "y": y, "width": data.shape[1], "height": data.shape[0], "level": level}
+
+
+def _locate_result(result: {}, roi: {} or None, geometry: {} or None = None) -> {}:
+    """ Translate & scale the features of the result of the algorithm for a roi to the coordinates of the image
+    (keeping the number of decimals of the geometry options) """
+    if roi and result.get("features"):
+        scale = 2 ** roi["level"]
+        # the pixel at index i of the level covers the pixels from i * scale to (i + 1) * scale - 1 of the image
+        translate_features(result["features"], (roi["x"] * scale + (scale - 1) / 2, roi["y"] * scale + (scale - 1) / 2),
+                           scale, decimals=(geometry or {}).get("decimals"))
+    return result
 
 
-def _run_algo(algo_method, data: np.ndarray, **algo_parameters) -> {}:
-    """ Run the given algo_method for the data with the algo_parameters """
-    return algo_method(data, **algo_parameters)
+def _run_algo(algo_method, data: np.ndarray, *, _geometry: {} or None = None, **algo_parameters) -> {}:
+    """ Run the given algo_method for the data with the algo_parameters, the features being extracted with the
+    given _geometry options (keyword-only & private so as not to conflict with the parameters of the algorithm) """
+    record("input_array_bytes", data.nbytes if isinstance(data, np.ndarray) else 0)
+    with timed("run_algo"), geometry_options(**(_geometry or {})):
+        result = algo_method(data, **algo_parameters)
+    if result.get("features") is not None:
+        record("result_objects", len(result["features"]))
+    return result
 
 
 @app.get("/algos_names/")
 def get_available_algos() -> {}:
     """ Get the available algo names"""
-    return {'algos_names': available_algo_names}
+    return {'algos_names': get_algo_names()}
 
 
 @app.get("/algos/{algo_name}/")
 def read_algo_info(algo_name: str):
     """ Get all the information for the given algo_name """
-    if algo_name not in available_algo_names:
+    if algo_name not in registry:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Algorithm {algo_name} not found")
     algo_info = get_algo_info(algo_name)
     return algo_info
@@ -165,45 +384,159 @@ def read_algo_info(algo_name: str):
 @app.get("/algos/{algo_name}/required_parameters")
 def read_algo_params(algo_name: str):
     """ Get the required parameters for the given algo_name """
-    if algo_name not in available_algo_names:
+    if algo_name not in registry:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Algorithm {algo_name} not found")
     rqd_algo_params = get_required_algo_params(algo_name)
     return {"parameters": rqd_algo_params}
 
 
+@app.get("/models/")
+def get_loaded_models() -> {}:
+    """ Get the models currently loaded in memory by the algorithms and their memory usage """
+    return model_cache.info()
+
+
+@app.get("/cache/")
+def get_result_cache_info() -> {}:
+    """ Get the hit/miss counters and the usage of the result cache """
+    return result_cache.info()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """ Get the metrics of the requests (counts, durations, stages timings, measured values) and the usage of the
+    caches & sessions in the Prometheus text format """
+    cache_info = result_cache.info()
+    gauges = {
+        "pyalgos_sessions": ("Number of client sessions", len(sessions)),
+        "pyalgos_sessions_memory_bytes": ("Memory used by the images & results of the sessions", sessions.memory),
+        "pyalgos_models_memory_bytes": ("Memory used by the models loaded by the algorithms", model_cache.memory),
+        "pyalgos_result_cache_hits": ("Number of hits of the result cache (in memory or on disk)",
+                                      cache_info["hits"] + cache_info["disk_hits"]),
+        "pyalgos_result_cache_misses": ("Number of misses of the result cache", cache_info["misses"]),
+        "pyalgos_result_cache_memory_bytes": ("Memory used by the results kept in the result cache",
+                                              cache_info["memory_bytes"]),
+        "pyalgos_store_disk_bytes": ("Size of the arrays spilled to memory-mapped files",
+                                     array_store.info()["disk_bytes"]),
+    }
+    return PlainTextResponse(metrics.to_prometheus(gauges), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/image/{algo_name}/result", status_code=status.HTTP_201_CREATED)
-def process_data(algo_name: str):
+def process_data(algo_name: str, session_id: str = DEFAULT_SESSION_ID, bbox: str or None = None, level: int = 0,
+                 tolerance: float = Query(0.0, ge=0), decimals: int or None = Query(None, ge=0), holes: bool = False):
     """ Process the image data with the given algo_name (the image data should be set &
-    the algo parameters should be set) """
-    if algo_name not in available_algo_names:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Algorithm {algo_name} not found")
-    server_data.selected_algo_name = algo_name
-    algo_method = get_algo_method(server_data.selected_algo_name)
-    if algo_method is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail=f"Algorithm implementation for {algo_name} not found")
-    if not _check_algo_params(algo_name, server_data.algo_params):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail=f"Incorrect algorithm parameters for {algo_name}")
+    the algo parameters should be set). Only the region of the image within the "x,y,width,height" bbox, and/or
+    a downsampled level of the image pyramid (each level halving the size of the previous one) can be processed:
+    the result image is then the size of the processed region, and the features are in the coordinates of the
+    image. The position of the processed region in the level is returned as "roi".
+    The contours of the features can be simplified within a tolerance in pixels, their coordinates rounded to a
+    number of decimals, and the holes of the objects added as interior rings """
+    server_data = _get_server_data(session_id)
+    algo_method = _get_algo_method_to_run(algo_name, server_data)
+    data, roi = _read_input_image(server_data, bbox, level)
+    geometry = _get_geometry_options(tolerance, decimals, holes)
+    cache_key = _get_cache_key(algo_name, server_data, roi, geometry)
+    cached_result = result_cache.get(cache_key) if cache_key else None
+    if cached_result is not None:
+        server_data.result = cached_result
+    else:
+        try:
+            result = _run_algo(algo_method, data, _geometry=geometry, **server_data.algo_params)
+            server_data.result = _locate_result(result, roi, geometry)
+        except Exception as e:
+            raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, str(e))
+        if cache_key:
+            result_cache.put(cache_key, server_data.result)
+    sessions.evict(keep=session_id)
+    response = {"output_endpoints": list(server_data.result.keys())}
+    if roi:
+        response["roi"] = roi
+    return response
+
+
+@app.post("/image/{algo_name}/jobs", status_code=status.HTTP_202_ACCEPTED)
+def submit_job(algo_name: str, session_id: str = DEFAULT_SESSION_ID, bbox: str or None = None, level: int = 0,
+               tolerance: float = Query(0.0, ge=0), decimals: int or None = Query(None, ge=0), holes: bool = False):
+    """ Submit a job processing the image data with the given algo_name (the image data should be set &
+    the algo parameters should be set) and return its job_id immediately. The status of the job is then available
+    on /jobs/{job_id}, and once it is done its result is available on the result endpoints of the session.
+    As for /image/{algo_name}/result, a bbox and/or a pyramid level of the image can be processed, and the geometry
+    of the features can be set """
+    server_data = _get_server_data(session_id)
+    algo_method = _get_algo_method_to_run(algo_name, server_data)
+    if server_data.image_array is None:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="No image data")
+    data, roi = _read_input_image(server_data, bbox, level)
+    geometry = _get_geometry_options(tolerance, decimals, holes)
+
+    cache_key = _get_cache_key(algo_name, server_data, roi, geometry)
+    cached_result = result_cache.get(cache_key) if cache_key else None
+
+    def set_result(result: {}) -> [str]:
+        server_data.selected_algo_name = algo_name
+        if cached_result is None:
+            _locate_result(result, roi, geometry)
+        server_data.result = result
+        if cache_key and cached_result is None:
+            result_cache.put(cache_key, result)
+        return list(result.keys())
+
+    info = {"algo_name": algo_name, "session_id": session_id}
+    if roi:
+        info["roi"] = roi
+    if cached_result is not None:
+        return jobs.complete(cached_result, on_done=set_result, info=info).to_dict()
     try:
-        server_data.result = _run_algo(algo_method, server_data.image_array, **server_data.algo_params)
-    except Exception as e:
-        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, str(e))
-    return {"output_endpoints": list(server_data.result.keys())}
+        job = jobs.submit(_run_algo, args=(algo_method, data),
+                          kwargs={**server_data.algo_params, "_geometry": geometry}, on_done=set_result, info=info)
+    except JobQueueFull as e:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str) -> {}:
+    """ Get the status of the given job_id """
+    try:
+        return jobs.get(job_id).to_dict()
+    except KeyError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str) -> {}:
+    """ Cancel the given job_id """
+    try:
+        return jobs.cancel(job_id).to_dict()
+    except KeyError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
 
 
 @app.delete("/image", status_code=status.HTTP_204_NO_CONTENT)
-def delete_data():
-    """ Delete all the information related to the image & result on the server """
-    server_data.clear_all()
+def delete_data(session_id: str = DEFAULT_SESSION_ID):
+    """ Delete all the information related to the image & result of the session on the server """
+    _get_server_data(session_id).clear_all()
+    if session_id != DEFAULT_SESSION_ID:
+        sessions.delete(session_id)
     return
 
 
 @app.post("/image", status_code=status.HTTP_201_CREATED)
-async def send_image(image: ImageData):
-    """ Send the image as a Base64 encoded string & save the decoded np.ndarray to the ServerData """
+async def send_image(image: ImageData, session_id: str = DEFAULT_SESSION_ID, new_session: bool = False):
+    """ Send the image as a Base64 encoded string & save the decoded np.ndarray to the ServerData of the session
+    (or of a new session if new_session is True). The returned session_id should then be used by the client
+    for the next requests related to this image. A multi-page TIFF is decoded as a stack (time-lapse and/or
+    Z-stack) with the axes of its metadata, or with the frames & depth of the dimensions, and its axes are returned """
+    if new_session:
+        session_id = sessions.create()
+    server_data = _get_server_data(session_id)
+    depth, frames = (image.dimensions.depth, image.dimensions.frames) if image.dimensions else (None, None)
     try:
-        server_data.image_array = decode_image(image.data)
+        with timed("decode"):
+            data, axes = await codecs.run(decode_image_stack, image.data, depth, frames, size=len(image.data))
+        server_data.image_array = data
+        server_data.axes = axes
     except ValueError as ve:
         raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(ve))
     except Exception as e:
@@ -211,14 +544,45 @@ async def send_image(image: ImageData):
         # with the exception in the body of the response
         print(str(e))
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-    return {"image_data_size": image.data.__sizeof__()}
+    sessions.evict(keep=session_id)
+    return {"image_data_size": image.data.__sizeof__(), "session_id": session_id, "axes": server_data.axes}
 
 
 @app.post("/image_bytes", status_code=status.HTTP_201_CREATED)
-async def send_image_bytes(request: Request):
-    data = await request.body()
+async def send_image_bytes(request: Request, session_id: str = DEFAULT_SESSION_ID, new_session: bool = False,
+                           depth: int or None = None, frames: int or None = None):
+    """ Send the image as bytes & save the decoded np.ndarray to the ServerData of the session
+    (or of a new session if new_session is True). The body is either an encoded image (e.g. TIFF or PNG), or the raw
+    bytes of the array in C order with its dtype & shape in the X-Image-Dtype & X-Image-Shape headers (and the axes
+    of a stack in the X-Image-Axes header, e.g. "TZYX"). A multi-page TIFF is decoded as a stack with the axes of its
+    metadata, or with the given frames & depth. The axes of the image are returned.
+    The body is streamed to memory, or to a temporary file for large images, and decoded without further copy """
+    if new_session:
+        session_id = sessions.create()
+    server_data = _get_server_data(session_id)
+    # Reject too large uploads before receiving their body when their size is known
+    content_length = request.headers.get("content-length")
+    if content_length and 0 < settings.MAX_UPLOAD_SIZE < int(content_length):
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Upload exceeds the maximum size of {settings.MAX_UPLOAD_SIZE} bytes")
     try:
-        server_data.image_array = decode_image_bytes(data)
+        with timed("receive"):
+            fp, data_size = await spool_stream(request.stream(), max_size=settings.MAX_UPLOAD_SIZE)
+    except UploadTooLarge as e:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    try:
+        dtype, shape = _get_raw_image_format(request)
+        with timed("decode"):
+            if dtype is None:
+                data, axes = await codecs.run(read_image_stack, fp, depth, frames)
+            else:
+                data = await codecs.run(decode_image_file, fp, dtype, shape)
+                axes = request.headers.get("x-image-axes")
+                # the raw stacks are reordered to the canonical axes (as a view of the received data)
+                data, axes = to_canonical(data, parse_axes(axes, data.ndim)) if axes else \
+                    (data, default_axes(data.ndim))
+        server_data.image_array = data
+        server_data.axes = axes
     except ValueError as ve:
         raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(ve))
     except Exception as e:
@@ -226,26 +590,273 @@ async def send_image_bytes(request: Request):
         # with the exception in the body of the response
         print(str(e))
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-    return {"data_size": data.__sizeof__()}
+    sessions.evict(keep=session_id)
+    return {"data_size": data_size, "session_id": session_id, "axes": server_data.axes}
+
+
+def _get_raw_image_format(request: Request) -> (str or None, tuple or None):
+    """ Get the dtype & shape of a raw image from the X-Image-Dtype & X-Image-Shape headers of the request
+    (None, None) is returned for an encoded image """
+    dtype = request.headers.get("x-image-dtype")
+    shape = request.headers.get("x-image-shape")
+    if dtype is None and shape is None:
+        return None, None
+    if dtype is None or shape is None:
+        raise ValueError("Expecting both X-Image-Dtype and X-Image-Shape headers for a raw image")
+    return dtype, tuple(int(size) for size in shape.split(","))
+
+
+@app.post("/batch/{algo_name}")
+async def process_batch(request: Request, algo_name: str, outputs: str or None = None,
+                        tolerance: float = Query(0.0, ge=0), decimals: int or None = Query(None, ge=0),
+                        holes: bool = False):
+    """ Process a batch of images with the given algo_name and the same parameters, and stream the result of each
+    image as a line of JSON (NDJSON) as soon as it is available, in completion order.
+    The body is either a JSON object {"images": [{"data": <Base64 encoded image>}, ...], "parameters": {...}},
+    or a ZIP archive (Content-Type: application/zip) of encoded images with an optional "parameters.json" file.
+    Each line contains the "index" & "name" of the image in the batch, and its "output_endpoints" with their values
+    (the image as a Base64 encoded string), or an "error". The outputs can be restricted to a comma-separated list,
+    and the geometry of the features set as for /image/{algo_name}/result """
+    if algo_name not in registry:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Algorithm {algo_name} not found")
+    if not registry.get(algo_name).batchable:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=f"Algorithm {algo_name} does not support batches")
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/zip"):
+            items, algo_params = await codecs.run(_read_batch_archive, body)
+            decode = _decode_batch_image_bytes
+        else:
+            batch = await codecs.run(BatchData.model_validate_json, body)
+            items = [(str(index), image.data) for index, image in enumerate(batch.images)]
+            algo_params = batch.parameters or {}
+            decode = decode_image_stack
+    except (ValueError, ValidationError, zipfile.BadZipFile) as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+    algo_params = _validate_algo_params(algo_name, algo_params, loc=("body", "parameters"))
+    algo_method = get_algo_method(algo_name)
+    if algo_method is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Algorithm implementation for {algo_name} not found")
+    selected_outputs = outputs.split(",") if outputs else None
+    geometry = _get_geometry_options(tolerance, decimals, holes)
+    return StreamingResponse(_iter_batch_results(items, decode, algo_name, algo_method, algo_params, selected_outputs,
+                                                 geometry),
+                             media_type="application/x-ndjson")
+
+
+def _decode_batch_image_bytes(data: bytes) -> (np.ndarray, str):
+    """ Decode an encoded image of a batch archive, returned with its axes (see app.encoding.read_image_stack) """
+    return read_image_stack(io.BytesIO(data))
+
+
+def _read_batch_archive(body: bytes) -> ([(str, bytes)], {}):
+    """ Read the encoded images & the optional "parameters.json" of a ZIP archive """
+    items, algo_params = [], {}
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        for name in archive.namelist():
+            if name.endswith("/"):
+                continue
+            if name == "parameters.json":
+                algo_params = json.loads(archive.read(name))
+            else:
+                items.append((name, archive.read(name)))
+    return items, algo_params
+
+
+async def _iter_batch_results(items: [(str, bytes or str)], decode: Callable, algo_name: str, algo_method,
+                              algo_params: {}, outputs: [str] or None, geometry: {} or None = None):
+    """ Process the items of a batch in parallel and yield their results as lines of JSON as they complete """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=settings.BATCH_WORKERS, thread_name_prefix="batch")
+    try:
+        # the items are processed in the context of the request so that their timings are recorded
+        tasks = [loop.run_in_executor(executor, contextvars.copy_context().run, _process_batch_item, index, name, data,
+                                      decode, algo_name, algo_method, algo_params, outputs, geometry)
+                 for index, (name, data) in enumerate(items)]
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _process_batch_item(index: int, name: str, data: bytes or str, decode: Callable, algo_name: str, algo_method,
+                        algo_params: {}, outputs: [str] or None, geometry: {} or None = None) -> bytes:
+    """ Decode & process an image of a batch (using the result cache), and return its result as a line of JSON
+    (a stack being processed plane by plane as for /image/{algo_name}/result) """
+    try:
+        image_array, axes = decode(data)
+        plane_axes = get_plane_axes(axes)
+        cache_params = dict(algo_params)
+        if plane_axes:
+            algo_method = get_algo_method(algo_name, axes)
+            cache_params["_axes"] = axes
+        if geometry:
+            cache_params["_geometry"] = geometry
+        cache_key = result_cache.key(image_array, algo_name, cache_params) if result_cache.enabled else None
+        result = result_cache.get(cache_key) if cache_key else None
+        if result is None:
+            result = _run_algo(algo_method, image_array, _geometry=geometry, **algo_params)
+            if cache_key:
+                result_cache.put(cache_key, result)
+        line = {"index": index, "name": name, "output_endpoints": list(result.keys())}
+        for key, value in result.items():
+            if outputs is not None and key not in outputs:
+                continue
+            if key == "image":
+                spatial_axes = default_axes(value.ndim - len(plane_axes))
+                line[key] = encode_image(value, plane_axes + spatial_axes if spatial_axes else None)
+            else:
+                line[key] = value
+    except Exception as e:
+        line = {"index": index, "name": name, "error": str(e)}
+    return (json.dumps(line) + "\n").encode()
 
 
 @app.get("/image/{algo_name}/result/image")
-async def get_result_image(algo_name: str) -> {}:
+async def get_result_image(algo_name: str, session_id: str = DEFAULT_SESSION_ID, bbox: str or None = None,
+                           level: int = 0) -> {}:
     """ Get the computed result of the image processing with the given algo_name
-    as an image in a Base64 encoded string """
+    as an image in a Base64 encoded string (optionally only the region within the "x,y,width,height" bbox and/or
+    a downsampled level of the result image) """
+    server_data = _get_server_data(session_id)
     if server_data.selected_algo_name != algo_name:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
     if not server_data.result or server_data.result.get("image") is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
-    return {"image": encode_image(server_data.result.get("image"))}
+    result_image = await codecs.run(_read_result_image, server_data, bbox, level)
+    with timed("encode"):
+        return {"image": await codecs.run(encode_image, result_image, server_data.get_result_axes(result_image),
+                                          size=result_image.nbytes)}
+
+
+def _read_result_image(server_data: ServerData, bbox: str or None, level: int) -> np.ndarray:
+    """ Read the region within the "x,y,width,height" bbox (in the coordinates of the result image) of the given
+    pyramid level of the result image of the server_data """
+    if not bbox and level == 0:
+        return server_data.result.get("image")
+    if server_data.plane_axes:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Regions & levels are only available for 2D images")
+    try:
+        with timed("read_roi"):
+            return server_data.get_result_pyramid("image").read(parse_bbox(bbox), level)[0]
+    except ValueError as ve:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@app.get("/image/{algo_name}/result/image_bytes")
+async def get_result_image_bytes(request: Request, algo_name: str, session_id: str = DEFAULT_SESSION_ID,
+                                 format: str or None = None, compression: str = "none", bbox: str or None = None,
+                                 level: int = 0):
+    """ Get the computed result of the image processing with the given algo_name as a binary stream, either as
+    the raw bytes of the array ("raw" format, with its dtype & shape in the X-Image-Dtype & X-Image-Shape headers)
+    or as a TIFF file ("tiff" format, with an optional "deflate" or "zstd" compression). A label image can also be
+    returned in a compact encoding, as runs of labels ("rle" format) or as the masks of its objects within their
+    bounding boxes ("sparse" format), see app.encoding.encode_labels. Without format query parameter, the format is
+    selected from the Accept header ("image/tiff" or "application/octet-stream").
+    As for /image/{algo_name}/result/image, a bbox and/or a pyramid level of the result image can be selected """
+    server_data = _get_server_data(session_id)
+    if server_data.selected_algo_name != algo_name:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    if not server_data.result or server_data.result.get("image") is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    if format is None:
+        format = "tiff" if "image/tiff" in request.headers.get("accept", "") else "raw"
+    result_image = await codecs.run(_read_result_image, server_data, bbox, level)
+    axes = server_data.get_result_axes(result_image)
+    headers = {"X-Image-Dtype": result_image.dtype.str,
+               "X-Image-Shape": ",".join(str(size) for size in result_image.shape)}
+    if axes:
+        headers["X-Image-Axes"] = axes
+    if format == "raw":
+        return StreamingResponse(codecs.iterate(iter_array_bytes(result_image)), media_type="application/octet-stream",
+                                 headers=headers)
+    if format == "tiff":
+        try:
+            with timed("encode"):
+                fp = await codecs.run(encode_tiff_file, result_image, compression, axes)
+        except ValueError as ve:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ve))
+        return StreamingResponse(codecs.iterate(iter_file_bytes(fp)), media_type="image/tiff", headers=headers)
+    if format in LABEL_ENCODINGS:
+        try:
+            with timed("encode"):
+                data = await codecs.run(encode_labels, result_image, format, size=result_image.nbytes)
+        except ValueError as ve:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ve))
+        return Response(data, media_type="application/octet-stream", headers=headers)
+    raise HTTPException(status.HTTP_400_BAD_REQUEST,
+                        detail=f"Unknown format {format}, expecting one of {['raw', 'tiff', *LABEL_ENCODINGS]}")
 
 
 @app.get("/image/{algo_name}/result/features")
-async def get_result_features(algo_name: str) -> {}:
+async def get_result_features(algo_name: str, session_id: str = DEFAULT_SESSION_ID, format: str = "geojson",
+                              bbox: str or None = None, filter: list[str] = Query([]),
+                              limit: int or None = Query(None, ge=1), cursor: str or None = None):
     """ Get the computed result of the image processing with the given algo_name
-    as a list of geojson.Feature """
+    as a list of geojson.Feature ("geojson" format, streamed as JSON), or in a compact columnar format
+    ("npz" format, see app.encoding.encode_features_columnar).
+    The features can be restricted to those intersecting the "x,y,width,height" bbox and matching the property
+    filters (e.g. "Detection probability >= 0.8", see app.feature_index.parse_filter), and returned by pages of
+    limit features: the cursor of the next page is then returned as "next_cursor" (and in a X-Next-Cursor header) """
+    server_data = _get_server_data(session_id)
     if server_data.selected_algo_name != algo_name:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
     if not server_data.result or server_data.result.get("features") is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
-    return {"features": server_data.result.get("features")}
+    features = server_data.result.get("features")
+    next_cursor, headers = None, {}
+    if bbox or filter or limit or cursor:
+        try:
+            with timed("query"):
+                features, next_cursor = await codecs.run(server_data.query_features, parse_bbox(bbox), filter, limit,
+                                                         cursor)
+        except StaleCursor as e:
+            raise HTTPException(status.HTTP_409_CONFLICT, detail=str(e))
+        except ValueError as ve:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ve))
+        record("query_hits", len(features))
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+    if format == "geojson":
+        members = {"next_cursor": next_cursor} if limit else {}
+        return StreamingResponse(codecs.iterate(iter_geojson_features(features, **members)),
+                                 media_type="application/json", headers=headers)
+    if format == "npz":
+        try:
+            with timed("encode"):
+                data = await codecs.run(encode_features_columnar, features)
+        except ValueError as ve:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ve))
+        return Response(data, media_type="application/octet-stream", headers=headers)
+    raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=f"Unknown format {format}, expecting 'geojson' or 'npz'")
+
+
+@app.get("/image/{algo_name}/result/triangulation")
+async def get_result_triangulation(algo_name: str, session_id: str = DEFAULT_SESSION_ID, format: str = "geojson"):
+    """ Get the Delaunay triangulation of the centroids of the result features of the algo_name, as a GeoJSON
+    FeatureCollection of triangles ("geojson" format) or in a compact form with the vertices and the triangles as
+    triplets of indices of vertices ("compact" format) """
+    server_data = _get_server_data(session_id)
+    if server_data.selected_algo_name != algo_name:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    if not server_data.result or server_data.result.get("features") is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    if format not in ("geojson", "compact"):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unknown format {format}, expecting 'geojson' or 'compact'")
+    triangulate = get_triangulation_geojson if format == "geojson" else get_triangulation
+    try:
+        with timed("triangulation"):
+            triangulation = await codecs.run(_triangulate_features, server_data.result.get("features"), triangulate)
+    except (ValueError, QhullError) as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=f"Cannot triangulate the features: {e}")
+    if format == "geojson":
+        return Response(triangulation, media_type="application/json")
+    return triangulation
+
+
+def _triangulate_features(features: [], triangulate: Callable):
+    """ Triangulate the centroids of the features with the triangulate method (both steps being run off the event
+    loop) """
+    return triangulate(get_feature_centroids(features))
@@ -0,0 +1,144 @@
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from algos.timing import record_measurements
+
+# Upper bounds in seconds of the buckets of the durations histograms
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class Histogram:
+    """ Prometheus-like histogram of observed values """
+
+    def __init__(self, buckets: tuple = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Metrics:
+    """ Metrics of the requests served by the app, exported in the Prometheus text format """
+
+    def __init__(self):
+        self.requests = defaultdict(int)  # (method, route, status) -> count
+        self.durations = defaultdict(Histogram)  # route -> durations of the requests
+        self.stages = defaultdict(Histogram)  # stage -> durations of the stage
+        self.values = defaultdict(lambda: Histogram(buckets=()))  # name -> sum & count of the recorded values
+        self.last_values = {}  # name -> last recorded value
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, duration: float, measurements):
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            self.durations[route].observe(duration)
+            for stage, stage_duration in measurements.timings.items():
+                self.stages[stage].observe(stage_duration)
+            for name, value in measurements.values.items():
+                self.values[name].observe(value)
+                self.last_values[name] = value
+
+    def to_prometheus(self, gauges: {} = None) -> str:
+        """ Export the metrics, and the additional gauges {name: (help, value)}, in the Prometheus text format """
+        lines = []
+        with self._lock:
+            _add_metric(lines, "pyalgos_requests_total", "counter", "Number of HTTP requests",
+                        [({"method": method, "route": route, "status": str(status)}, count)
+                         for (method, route, status), count in sorted(self.requests.items())])
+            _add_histogram(lines, "pyalgos_request_duration_seconds", "Duration of the HTTP requests",
+                           "route", self.durations)
+            _add_histogram(lines, "pyalgos_stage_duration_seconds",
+                           "Duration of the stages of the requests (decoding, algorithm, encoding...)",
+                           "stage", self.stages)
+            _add_metric(lines, "pyalgos_recorded_value_sum", "counter",
+                        "Sum of the values recorded by the requests (array sizes, number of objects...)",
+                        [({"name": name}, histogram.sum) for name, histogram in sorted(self.values.items())])
+            _add_metric(lines, "pyalgos_recorded_value_count", "counter", "Number of values recorded by the requests",
+                        [({"name": name}, histogram.count) for name, histogram in sorted(self.values.items())])
+            _add_metric(lines, "pyalgos_recorded_value_last", "gauge", "Last value recorded by the requests",
+                        [({"name": name}, value) for name, value in sorted(self.last_values.items())])
+        _add_metric(lines, "pyalgos_process_peak_rss_bytes", "gauge", "Peak resident memory of the server process",
+                    [({}, peak_rss())])
+        for name, (help_text, value) in (gauges or {}).items():
+            _add_metric(lines, name, "gauge", help_text, [({}, value)])
+        return "\n".join(lines) + "\n"
+
+
+def peak_rss() -> int:
+    """ Peak resident memory in bytes of the current process """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # in bytes on macOS, in kilobytes on Linux
+
+
+def _add_metric(lines: [str], name: str, metric_type: str, help_text: str, samples: [({}, float)]):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+
+def _add_histogram(lines: [str], name: str, help_text: str, label: str, histograms: {}):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f"{name}_bucket{_format_labels({label: key, 'le': str(bound)})} {count}")
+        lines.append(f"{name}_bucket{_format_labels({label: key, 'le': '+Inf'})} {histogram.count}")
+        lines.append(f"{name}_sum{_format_labels({label: key})} {histogram.sum}")
+        lines.append(f"{name}_count{_format_labels({label: key})} {histogram.count}")
+
+
+def _format_labels(labels: {}) -> str:
+    if not labels:
+        return ""
+    escaped = {key: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for key, value in labels.items()}
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the duration, the stages timings & the values measured by each HTTP request into the
+    metrics, and optionally adding the stages timings to the Server-Timing header of the responses
+    """
+
+    def __init__(self, app, metrics: Metrics, server_timing: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = [500]
+
+        with record_measurements() as measurements:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    status_code[0] = message["status"]
+                    if self.server_timing:
+                        timings = ", ".join(f"{stage};dur={duration * 1e3:.1f}"
+                                            for stage, duration in measurements.timings.items())
+                        timings += f"{', ' if timings else ''}app;dur={(time.perf_counter() - start) * 1e3:.1f}"
+                        message["headers"] = list(message.get("headers", [])) + \
+                            [(b"server-timing", timings.encode("latin-1"))]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                route = scope.get("route")
+                self.metrics.observe_request(scope["method"], getattr(route, "path", "unmatched"), status_code[0],
+                                             time.perf_counter() - start, measurements)
@@ -0,0 +1,85 @@
+import threading
+
+import numpy as np
+
+
+class ImagePyramid:
+    """
+    Multiscale pyramid of an image, whose levels are computed lazily on first read and kept for the next reads.
+    Level 0 is the image, and each level is downsampled by a factor 2 along the height & width of the previous one
+    (by averaging the 2x2 blocks of pixels, or by keeping their top-left pixel for label images)
+    """
+
+    def __init__(self, image: np.ndarray, labels: bool = False):
+        """
+        Args:
+            image: Image with the height & width as first dimensions
+            labels: Whether the image is a label image, whose values should not be averaged
+        """
+        self.labels = labels
+        self._levels = [image]
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self) -> tuple:
+        return self._levels[0].shape
+
+    @property
+    def max_level(self) -> int:
+        """ Highest level, at which the image is a single pixel along its smallest dimension """
+        return int(np.ceil(np.log2(max(1, min(self.shape[:2])))))
+
+    @property
+    def nbytes(self) -> int:
+        """ Memory in bytes used by the downsampled levels """
+        return sum(level.nbytes for level in self._levels[1:])
+
+    def get_level(self, level: int) -> np.ndarray:
+        """ Get the image at the given level, computing the missing levels """
+        if not 0 <= level <= self.max_level:
+            raise ValueError(f"Unexpected pyramid level {level}, expecting a level between 0 and {self.max_level}")
+        with self._lock:
+            while len(self._levels) <= level:
+                self._levels.append(downsample(self._levels[-1], self.labels))
+            return self._levels[level]
+
+    def read(self, bbox: (int, int, int, int) or None = None, level: int = 0) -> (np.ndarray, (int, int)):
+        """
+        Read the region of the image at the given level within the (x, y, width, height) bbox, given in the
+        coordinates of the level 0 (the bbox is extended to the pixels of the level it intersects).
+        Returns the region (a view of the level) and its (x, y) position in the coordinates of the level
+        """
+        image = self.get_level(level)
+        if bbox is None:
+            return image, (0, 0)
+        x, y, width, height = bbox
+        scale = 2 ** level
+        rows = (max(0, y // scale), min(image.shape[0], -(-(y + height) // scale)))
+        cols = (max(0, x // scale), min(image.shape[1], -(-(x + width) // scale)))
+        if width <= 0 or height <= 0 or rows[0] >= rows[1] or cols[0] >= cols[1]:
+            raise ValueError(f"The bounding box {bbox} does not intersect the image of shape {self.shape}")
+        return image[rows[0]:rows[1], cols[0]:cols[1]], (cols[0], rows[0])
+
+
+def downsample(image: np.ndarray, labels: bool = False) -> np.ndarray:
+    """ Downsample the image by a factor 2 along its height & width (the last row/column of an odd size is
+    repeated to complete the blocks of pixels) """
+    if labels:
+        return np.ascontiguousarray(image[::2, ::2])
+    padding = [(0, image.shape[0] % 2), (0, image.shape[1] % 2)] + [(0, 0)] * (image.ndim - 2)
+    padded = np.pad(image, padding, mode="edge") if image.shape[0] % 2 or image.shape[1] % 2 else image
+    blocks = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2, *padded.shape[2:])
+    mean = blocks.mean(axis=(1, 3), dtype=np.float64)
+    if np.issubdtype(image.dtype, np.integer) or image.dtype == bool:
+        mean = np.rint(mean)
+    return mean.astype(image.dtype)
+
+
+def parse_bbox(bbox: str or None) -> (int, int, int, int) or None:
+    """ Parse a "x,y,width,height" bounding box """
+    if not bbox:
+        return None
+    values = bbox.split(",")
+    if len(values) != 4:
+        raise ValueError(f"Unexpected bounding box {bbox}, expecting 'x,y,width,height'")
+    return tuple(int(value) for value in values)
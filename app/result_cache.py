@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ResultCache:
+    """
+    Cache of the results of the algorithms, keyed by the hash of the content of the image, the algorithm name and
+    its parameters. The results are kept in memory with an LRU eviction, and optionally in a directory on disk
+    """
+
+    def __init__(self, max_entries: int = 8, max_memory: int = 0, directory: str or None = None,
+                 max_disk_entries: int = 100):
+        """
+        Args:
+            max_entries: Maximum number of results kept in memory (0 to disable the cache)
+            max_memory: Maximum memory in bytes used by the result images kept in memory (0 for no limit)
+            directory: Directory where the results are also stored on disk (None to disable the disk cache)
+            max_disk_entries: Maximum number of results stored on disk
+        """
+        self.max_entries = max_entries
+        self.max_memory = max_memory
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._results = OrderedDict()  # key -> (result, memory in bytes)
+        self._lock = threading.RLock()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def image_digest(data: np.ndarray) -> str:
+        """ Compute the digest of the content of the image data (its dtype, shape & bytes) """
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(json.dumps([data.dtype.str, data.shape]).encode())
+        digest.update(memoryview(np.ascontiguousarray(data).reshape(-1).view(np.uint8)))
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(data: np.ndarray or str, algo_name: str, algo_params: {}) -> str:
+        """ Compute the cache key of the result of the algo_name with the algo_params for the image data, given as an
+        array or as its image_digest (e.g. computed once for an image processed by several requests) """
+        image_digest = data if isinstance(data, str) else ResultCache.image_digest(data)
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(json.dumps([algo_name, algo_params, image_digest], sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> {} or None:
+        """ Get the result for the given key, or None if it is not in the cache """
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key][0]
+        result = self._load(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._add(key, result)
+        return result
+
+    def put(self, key: str, result: {}):
+        """ Store the result for the given key """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._add(key, result)
+        self._store(key, result)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def info(self) -> {}:
+        """ Get the hit/miss counters and the usage of the cache """
+        with self._lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "entries": len(self._results), "memory_bytes": sum(nbytes for _, nbytes in self._results.values()),
+                    "max_entries": self.max_entries, "max_memory_bytes": self.max_memory,
+                    "directory": self.directory}
+
+    def _add(self, key: str, result: {}):
+        nbytes = sum(value.nbytes for value in result.values() if isinstance(value, np.ndarray))
+        self._results[key] = (result, nbytes)
+        self._results.move_to_end(key)
+        memory = sum(nbytes for _, nbytes in self._results.values())
+        while len(self._results) > 1 and (len(self._results) > self.max_entries or 0 < self.max_memory < memory):
+            _, (_, nbytes) = self._results.popitem(last=False)
+            memory -= nbytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pkl")
+
+    def _load(self, key: str) -> {} or None:
+        if not self.directory or not self.enabled or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with open(self._path(key), "rb") as file:
+                result = pickle.load(file)
+            os.utime(self._path(key))  # the modification time is used for the LRU eviction on disk
+            return result
+        except Exception as e:
+            warnings.warn(f"Could not load cached result {key}: {e}")
+            return None
+
+    def _store(self, key: str, result: {}):
+        if not self.directory:
+            return
+        try:
+            with open(self._path(key) + ".tmp", "wb") as file:
+                pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(self._path(key) + ".tmp", self._path(key))
+            paths = sorted((os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                            if name.endswith(".pkl")), key=os.path.getmtime)
+            for path in paths[:max(0, len(paths) - self.max_disk_entries)]:
+                os.remove(path)
+        except Exception as e:
+            warnings.warn(f"Could not store cached result {key}: {e}")
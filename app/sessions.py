@@ -0,0 +1,88 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable
+
+# Session used by the clients which do not specify a session id
+DEFAULT_SESSION_ID = "default"
+
+
+class SessionStore:
+    """
+    In-memory store of the data of each client session, with a time-to-live for unused sessions and a memory cap
+    on the data of all the sessions (the least recently used sessions are evicted first)
+    """
+
+    def __init__(self, factory: Callable, ttl: float = 0, max_memory: int = 0, on_delete: Callable or None = None):
+        """
+        Args:
+            factory: Method creating the data of a new session, which should have an nbytes property
+            ttl: Time in seconds after which an unused session is deleted (0 for no expiry)
+            max_memory: Maximum memory in bytes used by the data of all the sessions (0 for no limit)
+            on_delete: Method called with the data of each deleted or evicted session (e.g. to release its resources)
+        """
+        self.factory = factory
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.on_delete = on_delete
+        self._sessions = OrderedDict()  # session_id -> (data, last access time)
+        self._lock = threading.RLock()
+
+    def create(self) -> str:
+        """ Create a new session and return its id """
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = (self.factory(), time.monotonic())
+        return session_id
+
+    def get(self, session_id: str = DEFAULT_SESSION_ID):
+        """ Get the data of the given session_id (the default session is created if needed) """
+        with self._lock:
+            self.evict(keep=session_id)
+            if session_id not in self._sessions:
+                if session_id != DEFAULT_SESSION_ID:
+                    raise KeyError(session_id)
+                self._sessions[session_id] = (self.factory(), time.monotonic())
+            data, _ = self._sessions.pop(session_id)
+            self._sessions[session_id] = (data, time.monotonic())
+            return data
+
+    def delete(self, session_id: str):
+        """ Delete the given session_id and its data """
+        with self._lock:
+            data, _ = self._sessions.pop(session_id, (None, None))
+        if data is not None and self.on_delete is not None:
+            self.on_delete(data)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    @property
+    def memory(self) -> int:
+        """ Memory in bytes used by the data of all the sessions """
+        with self._lock:
+            return sum(data.nbytes for data, _ in self._sessions.values())
+
+    def evict(self, keep: str or None = None):
+        """ Delete the expired sessions, then the least recently used ones until the memory cap is satisfied
+        (the keep session is never evicted) """
+        with self._lock:
+            if self.ttl > 0:
+                expiry = time.monotonic() - self.ttl
+                for session_id, (_, last_access) in list(self._sessions.items()):
+                    if last_access < expiry and session_id != keep:
+                        self.delete(session_id)
+            if self.max_memory > 0:
+                memory = self.memory
+                for session_id, (data, _) in list(self._sessions.items()):
+                    if memory <= self.max_memory:
+                        break
+                    if session_id != keep:
+                        memory -= data.nbytes
+                        self.delete(session_id)
@@ -0,0 +1,60 @@
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.environ.get(name) or default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    return value.lower() in ("1", "true", "yes", "on") if value else default
+
+
+# Sessions: time in seconds after which an unused session is deleted (0 for no expiry) and maximum memory
+# used by the images & results of all the sessions (0 for no limit)
+SESSION_TTL = _env_float("PYALGOS_SESSION_TTL", 3600)
+SESSION_MAX_MEMORY = _env_int("PYALGOS_SESSION_MAX_MEMORY_MB", 4096) * 1024 ** 2
+
+# Jobs: number of workers executing the algorithms concurrently, type of workers ("process" or "thread"),
+# maximum number of jobs waiting for a worker (0 for no limit) and maximum duration of a job in seconds (0 for no limit)
+JOB_WORKERS = _env_int("PYALGOS_JOB_WORKERS", 1)
+JOB_WORKER_TYPE = _env_str("PYALGOS_JOB_WORKER_TYPE", "process")
+JOB_MAX_QUEUED = _env_int("PYALGOS_JOB_MAX_QUEUED", 16)
+JOB_TIMEOUT = _env_float("PYALGOS_JOB_TIMEOUT", 0)
+
+# Array store: scratch directory where the images & result images larger than the threshold are spilled to
+# memory-mapped files (default: no spilling)
+STORE_DIR = _env_str("PYALGOS_STORE_DIR", "") or None
+STORE_THRESHOLD = _env_int("PYALGOS_STORE_THRESHOLD_MB", 256) * 1024 ** 2
+
+# Maximum size in bytes of an uploaded image (0 for no limit)
+MAX_UPLOAD_SIZE = _env_int("PYALGOS_MAX_UPLOAD_SIZE_MB", 0) * 1024 ** 2
+
+# Result cache: maximum number of results & memory used by the result images kept in memory (0 to disable the cache
+# or for no memory limit), and optional directory & maximum number of results stored on disk
+RESULT_CACHE_SIZE = _env_int("PYALGOS_RESULT_CACHE_SIZE", 8)
+RESULT_CACHE_MEMORY = _env_int("PYALGOS_RESULT_CACHE_MEMORY_MB", 1024) * 1024 ** 2
+RESULT_CACHE_DIR = _env_str("PYALGOS_RESULT_CACHE_DIR", "") or None
+RESULT_CACHE_DISK_SIZE = _env_int("PYALGOS_RESULT_CACHE_DISK_SIZE", 100)
+
+# Codecs: number of threads decoding & encoding the images & features out of the event loop, and optional number of
+# processes used for the payloads larger than the threshold (default: threads only)
+CODEC_WORKERS = _env_int("PYALGOS_CODEC_WORKERS", 4)
+CODEC_PROCESS_WORKERS = _env_int("PYALGOS_CODEC_PROCESS_WORKERS", 0)
+CODEC_PROCESS_THRESHOLD = _env_int("PYALGOS_CODEC_PROCESS_THRESHOLD_MB", 64) * 1024 ** 2
+
+# Number of images of a batch processed in parallel
+BATCH_WORKERS = _env_int("PYALGOS_BATCH_WORKERS", 4)
+
+# Add the timings of the stages of each request (decoding, algorithm, encoding...) to a Server-Timing response header
+SERVER_TIMING = _env_bool("PYALGOS_SERVER_TIMING", False)
@@ -0,0 +1,86 @@
+"""
+Benchmarks of the hot paths of the API: image encoding & decoding, features computation and end-to-end round trips.
+
+Usage (from the root of the repository):
+    python -m benchmarks [--quick] [--filter NAME] [--repeat N] [--save results.json] [--compare baseline.json]
+
+Each benchmark is run repeat times after a warm-up run, and its minimum & median times are reported.
+With --compare, the times are compared to the ones of a previous run saved with --save, and the benchmarks slower
+than the baseline by more than the --threshold ratio are reported as regressions (with a non-zero exit code).
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+from . import bench_app, bench_encoding, bench_features
+
+SUITES = {"encoding": bench_encoding, "features": bench_features, "app": bench_app}
+
+
+def run_benchmark(setup, repeat: int) -> {}:
+    """ Time the function returned by setup: one warm-up run, then repeat timed runs """
+    function = setup()
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+def main(argv: [str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="run only the small sizes")
+    parser.add_argument("--suite", choices=list(SUITES), action="append", help="suite(s) to run (default: all)")
+    parser.add_argument("--filter", default="", help="run only the benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs of each benchmark")
+    parser.add_argument("--save", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare the results to the ones saved in this JSON file")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="ratio to the baseline above which a benchmark is reported as a regression")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<60} {'min (ms)':>10} {'median (ms)':>12} {'vs baseline':>12}")
+    for suite_name in args.suite or SUITES:
+        for name, setup in SUITES[suite_name].benchmarks(quick=args.quick):
+            name = f"{suite_name}.{name}"
+            if args.filter not in name:
+                continue
+            result = run_benchmark(setup, args.repeat)
+            results[name] = result
+            comparison = ""
+            if name in baseline:
+                ratio = result["min"] / baseline[name]["min"]
+                comparison = f"{ratio:.2f}x"
+                if ratio > args.threshold:
+                    regressions.append(name)
+                    comparison += " !"
+            print(f"{name:<60} {result['min'] * 1e3:>10.2f} {result['median'] * 1e3:>12.2f} {comparison:>12}",
+                  flush=True)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, file, indent=2)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold}x the baseline:")
+        for name in regressions:
+            print(f" - {name}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+
+from app.encoding import encode_image
+from .synthetic import random_image
+
+EXAMPLE_PARAMS = {"integer_value": 1, "float_value": 0.5, "string_value": "value", "boolean_value": False,
+                  "choices": "Option A"}
+
+
+def _client() -> TestClient:
+    from app.main import app
+    return TestClient(app)
+
+
+@contextmanager
+def _no_result_cache():
+    """ Disable the result cache of the app so that each round trip runs the algorithm, restoring it afterwards """
+    import app.main
+    from app.result_cache import ResultCache
+    result_cache = app.main.result_cache
+    app.main.result_cache = ResultCache(max_entries=0)
+    try:
+        yield
+    finally:
+        app.main.result_cache = result_cache
+
+
+def benchmarks(quick: bool = False):
+    """ Yield the (name, setup) of the end-to-end benchmarks of the API with the example algorithm, where setup
+    returns the function to time """
+    for size in ([256, 1024] if quick else [256, 1024, 4096]):
+        def round_trip(size=size):
+            client = _client()
+            image = encode_image(random_image((size, size), "uint8"))
+
+            def run():
+                with _no_result_cache():
+                    session_id = client.post("/image", params={"new_session": True}, json={"data": image}).json()
+                    session_id = session_id["session_id"]
+                    client.post("/image/example/parameters", params={"session_id": session_id},
+                                json={"parameters": EXAMPLE_PARAMS})
+                    client.post("/image/example/result", params={"session_id": session_id})
+                    client.get("/image/example/result/image", params={"session_id": session_id})
+                    client.get("/image/example/result/features", params={"session_id": session_id})
+                    client.delete("/image", params={"session_id": session_id})
+            return run
+
+        def raw_round_trip(size=size):
+            client = _client()
+            image = random_image((size, size), "uint8")
+
+            def run():
+                with _no_result_cache():
+                    session_id = client.post("/image_bytes", params={"new_session": True}, content=image.tobytes(),
+                                             headers={"X-Image-Dtype": image.dtype.str,
+                                                      "X-Image-Shape": f"{size},{size}"}).json()["session_id"]
+                    client.post("/image/example/parameters", params={"session_id": session_id},
+                                json={"parameters": EXAMPLE_PARAMS})
+                    client.post("/image/example/result", params={"session_id": session_id})
+                    client.get("/image/example/result/image_bytes", params={"session_id": session_id})
+                    client.get("/image/example/result/features", params={"session_id": session_id, "format": "npz"})
+                    client.delete("/image", params={"session_id": session_id})
+            return run
+
+        yield f"example_round_trip_base64[{size}x{size}]", round_trip
+        yield f"example_round_trip_binary[{size}x{size}]", raw_round_trip
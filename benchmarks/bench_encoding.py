@@ -0,0 +1,60 @@
+import asyncio
+import base64
+
+from app.encoding import (encode_image, decode_image, decode_image_bytes, iter_array_bytes, encode_tiff_file,
+                          spool_stream, decode_image_file)
+from .synthetic import random_image
+
+
+def _sizes(quick: bool) -> [int]:
+    return [256, 1024] if quick else [256, 1024, 4096]
+
+
+async def _stream(data: bytes, chunk_size: int = 64 * 1024):
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def benchmarks(quick: bool = False):
+    """ Yield the (name, setup) of the benchmarks of the image encoding & decoding, where setup returns the
+    function to time """
+    for size in _sizes(quick):
+        for dtype, channels in [("uint8", 1), ("uint16", 1), ("float32", 1), ("uint8", 3)]:
+            shape = (size, size) if channels == 1 else (size, size, channels)
+            label = f"{size}x{size}{'x3' if channels == 3 else ''}-{dtype}"
+
+            def encode(shape=shape, dtype=dtype):
+                image = random_image(shape, dtype)
+                return lambda: encode_image(image)
+
+            def decode(shape=shape, dtype=dtype):
+                encoded = encode_image(random_image(shape, dtype))
+                return lambda: decode_image(encoded)
+
+            def decode_bytes(shape=shape, dtype=dtype):
+                data = base64.b64decode(encode_image(random_image(shape, dtype)))
+                return lambda: decode_image_bytes(data)
+
+            def raw_bytes(shape=shape, dtype=dtype):
+                image = random_image(shape, dtype)
+                return lambda: sum(len(chunk) for chunk in iter_array_bytes(image))
+
+            def tiff_deflate(shape=shape, dtype=dtype):
+                image = random_image(shape, dtype)
+                return lambda: encode_tiff_file(image, "deflate").close()
+
+            def raw_upload(shape=shape, dtype=dtype):
+                image = random_image(shape, dtype)
+                data = image.tobytes()
+
+                def run():
+                    fp, _ = asyncio.run(spool_stream(_stream(data)))
+                    return decode_image_file(fp, dtype=image.dtype.str, shape=image.shape)
+                return run
+
+            yield f"encode_image[{label}]", encode
+            yield f"decode_image[{label}]", decode
+            yield f"decode_image_bytes[{label}]", decode_bytes
+            yield f"iter_array_bytes[{label}]", raw_bytes
+            yield f"encode_tiff_file_deflate[{label}]", tiff_deflate
+            yield f"spool_stream_raw_upload[{label}]", raw_upload
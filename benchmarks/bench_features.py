@@ -0,0 +1,40 @@
+from algos.compute_features import (get_features_from_segm_mask, get_triangulation_features,
+                                    get_triangulation_geojson, get_triangulation, measure_objects)
+from algos.normalization import sample_percentiles
+from .synthetic import synthetic_labels, random_image, random_points
+
+
+def benchmarks(quick: bool = False):
+    """ Yield the (name, setup) of the benchmarks of the features computation, where setup returns the
+    function to time """
+    cases = [(512, 100), (2048, 1000)] if quick else [(512, 100), (2048, 1000), (2048, 10000), (8192, 10000)]
+    for size, n_objects in cases:
+        def segm_mask_features(size=size, n_objects=n_objects):
+            labels = synthetic_labels((size, size), n_objects)
+            return lambda: get_features_from_segm_mask(labels)
+
+        yield f"get_features_from_segm_mask[{size}x{size}-{n_objects}objects]", segm_mask_features
+
+        def segm_mask_measurements(size=size, n_objects=n_objects):
+            labels = synthetic_labels((size, size), n_objects)
+            image = random_image((size, size, 3), "uint8")
+            return lambda: measure_objects(labels, image)
+
+        yield f"measure_objects[{size}x{size}x3-{n_objects}objects]", segm_mask_measurements
+
+    for size in ([2048] if quick else [2048, 8192]):
+        def percentiles(size=size):
+            image = random_image((size, size, 3), "uint8")
+            return lambda: sample_percentiles(image)
+
+        yield f"sample_percentiles[{size}x{size}x3]", percentiles
+
+    for n_points in ([1000, 10000] if quick else [1000, 10000, 100000]):
+        for name, method in [("get_triangulation_features", get_triangulation_features),
+                             ("get_triangulation_geojson", get_triangulation_geojson),
+                             ("get_triangulation", get_triangulation)]:
+            def triangulation(n_points=n_points, method=method):
+                points = random_points(n_points)
+                return lambda: method(points)
+
+            yield f"{name}[{n_points}points]", triangulation
@@ -0,0 +1,41 @@
+import numpy as np
+
+
+def random_image(shape: tuple, dtype: str = "uint8", seed: int = 0) -> np.ndarray:
+    """ Random image of the given shape & dtype """
+    rng = np.random.default_rng(seed)
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.integer):
+        return rng.integers(0, np.iinfo(dtype).max, size=shape, dtype=dtype, endpoint=True)
+    return rng.random(shape).astype(dtype)
+
+
+def synthetic_labels(shape: (int, int), n_objects: int, radius: int = 8, seed: int = 0) -> np.ndarray:
+    """
+    Segmentation mask of the given shape with (at most) n_objects non-overlapping disk-like objects,
+    labelled from 1, in the style of a nuclei segmentation
+    """
+    rng = np.random.default_rng(seed)
+    labels = np.zeros(shape, dtype=np.int32)
+    # Objects centers on a jittered grid so that they do not overlap
+    spacing = max(2 * radius + 2, int(np.sqrt(shape[0] * shape[1] / max(n_objects, 1))))
+    rows, cols = np.meshgrid(np.arange(radius + 1, shape[0] - radius - 1, spacing),
+                             np.arange(radius + 1, shape[1] - radius - 1, spacing), indexing="ij")
+    centers = np.stack([rows.ravel(), cols.ravel()], axis=1)[:n_objects]
+    jitter = (spacing - 2 * radius - 2) // 2
+    if jitter > 0:
+        centers = centers + rng.integers(-jitter, jitter + 1, size=centers.shape)
+        centers = np.clip(centers, radius, np.array(shape) - radius - 1)
+    yy, xx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    for label, (row, col) in enumerate(centers, start=1):
+        # Elliptic objects with random axes
+        a, b = rng.uniform(0.6, 1.0, size=2) * radius
+        disk = (yy / a) ** 2 + (xx / b) ** 2 <= 1
+        window = labels[row - radius:row + radius + 1, col - radius:col + radius + 1]
+        window[disk] = label
+    return labels
+
+
+def random_points(n_points: int, extent: float = 10000, seed: int = 0) -> np.ndarray:
+    """ Random (x, y) points, e.g. centroids of detected cells """
+    return np.random.default_rng(seed).random((n_points, 2)) * extent
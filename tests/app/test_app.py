@@ -1,6 +1,18 @@
+import base64
+import io
+import json
+import threading
+import time
+import zipfile
+
 import pytest
+import tifffile
 from fastapi.testclient import TestClient
+from scipy import ndimage
 
+import app.main as main_module
+from algos.compute_features import get_features_from_segm_mask
+from app.encoding import decode_image, decode_image_bytes, decode_image_stack, decode_labels_rle, decode_labels_sparse
 from app.main import *
 
 client = TestClient(app)
@@ -34,4 +46,437 @@ def test_unknown_algo_raises_exc():
         read_algo_info("ghost")
     assert exc_info.value.status_code == 404
 
+
+def test_loaded_models():
+    response = client.get("/models/")
+    assert response.status_code == 200
+    assert "models" in response.json(), "Missing 'models' key from JSON response of loaded models"
+
+
+@pytest.fixture()
+def example_params() -> {}:
+    return {"integer_value": 1, "float_value": 0.5, "string_value": "value", "boolean_value": False,
+            "choices": "Option A"}
+
+
+def test_sessions_are_isolated(selected_algo_name, example_params):
+    session_ids = []
+    for value in [10, 20]:
+        image = encode_image(np.full((40, 60), value, dtype=np.uint8))
+        response = client.post("/image", params={"new_session": True}, json={"data": image})
+        assert response.status_code == 201
+        session_ids.append(response.json().get("session_id"))
+    assert session_ids[0] != session_ids[1], "Expecting a new session for each image"
+    for session_id in session_ids:
+        response = client.post(f"/image/{selected_algo_name}/parameters", params={"session_id": session_id},
+                               json={"parameters": example_params})
+        assert response.status_code == 201
+        response = client.post(f"/image/{selected_algo_name}/result", params={"session_id": session_id})
+        assert response.status_code == 201
+    for session_id, value in zip(session_ids, [10, 20]):
+        response = client.get(f"/image/{selected_algo_name}/result/image", params={"session_id": session_id})
+        assert response.status_code == 200
+        result_image = decode_image(response.json().get("image"))
+        assert result_image.max() == value, "Unexpected result image for the session"
+        assert client.delete("/image", params={"session_id": session_id}).status_code == 204
+    assert client.get(f"/image/{selected_algo_name}/parameters",
+                      params={"session_id": session_ids[0]}).status_code == 404, "Session should be deleted"
+
+
+@pytest.fixture()
+def no_result_cache(monkeypatch):
+    """ Disable the result cache so that the algorithm runs whatever the results of the previous tests """
+    monkeypatch.setattr(main_module, "result_cache", ResultCache(max_entries=0))
+
+
+def test_job_with_example_algo(selected_algo_name, example_params, no_result_cache):
+    session_id = client.post("/image", params={"new_session": True},
+                             json={"data": encode_image(np.full((40, 60), 10, dtype=np.uint8))}).json()["session_id"]
+    client.post(f"/image/{selected_algo_name}/parameters", params={"session_id": session_id},
+                json={"parameters": example_params})
+    response = client.post(f"/image/{selected_algo_name}/jobs", params={"session_id": session_id})
+    assert response.status_code == 202
+    job_id = response.json().get("job_id")
+    start = time.time()
+    while client.get(f"/jobs/{job_id}").json().get("status") in ("queued", "running") and time.time() - start < 60:
+        time.sleep(0.1)
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job.get("status") == "done", f"Unexpected job status: {job}"
+    assert job.get("output_endpoints") == ["image", "features"]
+    response = client.get(f"/image/{selected_algo_name}/result/features", params={"session_id": session_id})
+    assert response.status_code == 200
+    assert len(response.json().get("features")) == 3
+
+
+def test_result_image_bytes(selected_algo_name, example_params):
+    image = np.full((40, 60), 10, dtype=np.uint8)
+    session_id = client.post("/image", params={"new_session": True}, json={"data": encode_image(image)}).json()
+    session_id = session_id["session_id"]
+    client.post(f"/image/{selected_algo_name}/parameters", params={"session_id": session_id},
+                json={"parameters": example_params})
+    client.post(f"/image/{selected_algo_name}/result", params={"session_id": session_id})
+    result_image = decode_image(client.get(f"/image/{selected_algo_name}/result/image",
+                                           params={"session_id": session_id}).json()["image"])
+    response = client.get(f"/image/{selected_algo_name}/result/image_bytes", params={"session_id": session_id})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    shape = tuple(int(size) for size in response.headers["x-image-shape"].split(","))
+    raw_image = np.frombuffer(response.content, dtype=response.headers["x-image-dtype"]).reshape(shape)
+    assert np.array_equal(raw_image, result_image), "Unexpected result for raw image bytes"
+    response = client.get(f"/image/{selected_algo_name}/result/image_bytes", params={"session_id": session_id,
+                                                                                    "compression": "deflate"},
+                          headers={"Accept": "image/tiff"})
+    assert response.status_code == 200
+    assert np.array_equal(decode_image_bytes(response.content), result_image), "Unexpected result for TIFF bytes"
+    for encoding, decode in [("rle", decode_labels_rle), ("sparse", decode_labels_sparse)]:
+        response = client.get(f"/image/{selected_algo_name}/result/image_bytes", params={"session_id": session_id,
+                                                                                        "format": encoding})
+        assert response.status_code == 200
+        assert np.array_equal(decode(response.content), result_image), f"Unexpected result for {encoding} bytes"
+    response = client.get(f"/image/{selected_algo_name}/result/image_bytes", params={"session_id": session_id,
+                                                                                    "format": "png"})
+    assert response.status_code == 400
+
+
+def test_send_raw_image_bytes():
+    image = np.arange(12, dtype=np.uint16).reshape(3, 4)
+    response = client.post("/image_bytes", params={"new_session": True}, content=image.tobytes(),
+                           headers={"X-Image-Dtype": image.dtype.str, "X-Image-Shape": "3,4"})
+    assert response.status_code == 201
+    assert response.json().get("data_size") == image.nbytes
+    server_data = sessions.get(response.json().get("session_id"))
+    assert np.array_equal(server_data.image_array, image), "Unexpected decoded raw image"
+    response = client.post("/image_bytes", content=image.tobytes(),
+                           headers={"X-Image-Dtype": image.dtype.str, "X-Image-Shape": "5,4"})
+    assert response.status_code == 415
+
+
+def test_result_cache(selected_algo_name, example_params):
+    client.post("/image", json={"data": encode_image(np.full((40, 60), 40, dtype=np.uint8))})
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    cache_info = client.get("/cache/").json()
+    assert client.post(f"/image/{selected_algo_name}/result").status_code == 201
+    assert client.get("/cache/").json()["misses"] == cache_info["misses"] + 1
+    assert client.post(f"/image/{selected_algo_name}/result").status_code == 201
+    assert client.get("/cache/").json()["hits"] == cache_info["hits"] + 1, "Expecting the result from the cache"
+
+
+def test_image_digest_computed_once(selected_algo_name, example_params, monkeypatch):
+    digests = []
+
+    def image_digest(data):
+        digests.append(data.shape)
+        return "digest"
+
+    monkeypatch.setattr(ResultCache, "image_digest", staticmethod(image_digest))
+    client.post("/image", json={"data": encode_image(np.full((40, 60), 42, dtype=np.uint8))})
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    for params in [{}, {"level": 1}, {"bbox": "0,0,30,20"}]:
+        assert client.post(f"/image/{selected_algo_name}/result", params=params).status_code == 201
+    assert digests == [(40, 60)], "Expecting the digest of the image computed once for all the requests"
+
+
+def test_result_triangulation(selected_algo_name, example_params):
+    client.post("/image", json={"data": encode_image(np.full((40, 60), 45, dtype=np.uint8))})
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    assert client.post(f"/image/{selected_algo_name}/result").status_code == 201
+    features = client.get(f"/image/{selected_algo_name}/result/features").json()["features"]
+    response = client.get(f"/image/{selected_algo_name}/result/triangulation")
+    assert response.status_code == 200
+    assert len(response.json()["features"]) == len(features) - 2, "Expecting one triangle for the 3 objects"
+    response = client.get(f"/image/{selected_algo_name}/result/triangulation", params={"format": "compact"})
+    assert response.status_code == 200
+    assert response.json()["vertices"] == [[feature["properties"]["Centroid X"], feature["properties"]["Centroid Y"]]
+                                           for feature in features], "Expecting the centroids of the features"
+    response = client.get(f"/image/{selected_algo_name}/result/triangulation", params={"format": "unknown"})
+    assert response.status_code == 400
+
+
+def test_result_triangulation_off_event_loop(selected_algo_name, example_params, monkeypatch):
+    threads = []
+
+    def get_centroids(features):
+        threads.append(threading.current_thread().name)
+        return get_feature_centroids(features)
+
+    monkeypatch.setattr(main_module, "get_feature_centroids", get_centroids)
+    client.post("/image", json={"data": encode_image(np.full((40, 60), 45, dtype=np.uint8))})
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    client.post(f"/image/{selected_algo_name}/result")
+    assert client.get(f"/image/{selected_algo_name}/result/triangulation").status_code == 200
+    assert len(threads) == 1 and threads[0].startswith("codec"), "Expecting the centroids computed in a codec worker"
+
+
+def test_batch_json(selected_algo_name, example_params):
+    images = [encode_image(np.full((40, 60), value, dtype=np.uint8)) for value in [50, 60, 70]]
+    response = client.post(f"/batch/{selected_algo_name}", params={"outputs": "features"},
+                           json={"images": [{"data": image} for image in images], "parameters": example_params})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    for line in lines:
+        assert line["output_endpoints"] == ["image", "features"]
+        assert "image" not in line and len(line["features"]) == 3
+
+
+def test_batch_archive(selected_algo_name, example_params):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("parameters.json", json.dumps(example_params))
+        zip_file.writestr("tile_0.tif", base64.b64decode(encode_image(np.full((40, 60), 80, dtype=np.uint8))))
+        zip_file.writestr("tile_1.tif", b"not an image")
+    response = client.post(f"/batch/{selected_algo_name}", content=archive.getvalue(),
+                           headers={"Content-Type": "application/zip"})
+    assert response.status_code == 200
+    lines = {line["name"]: line for line in map(json.loads, response.text.splitlines())}
+    assert decode_image(lines["tile_0.tif"]["image"]).max() == 80
+    assert "error" in lines["tile_1.tif"], "Expecting an error for the invalid image"
+
+
+def test_batch_stack(selected_algo_name, example_params):
+    stack = io.BytesIO()
+    tifffile.imwrite(stack, np.full((3, 40, 60), 90, dtype=np.uint8), photometric="minisblack", metadata={"axes": "ZYX"})
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("parameters.json", json.dumps(example_params))
+        zip_file.writestr("stack.tif", stack.getvalue())
+    response = client.post(f"/batch/{selected_algo_name}", content=archive.getvalue(),
+                           headers={"Content-Type": "application/zip"})
+    line = json.loads(response.text)
+    assert decode_image_stack(line["image"])[0].shape == (3, 40, 60), "Expecting the stack processed plane by plane"
+    assert sorted({feature["properties"]["Z index"] for feature in line["features"]}) == [0, 1, 2]
+    response = client.post(f"/batch/{selected_algo_name}", json={"images": [{"data": base64.b64encode(
+        stack.getvalue()).decode()}], "parameters": example_params})
+    assert decode_image_stack(json.loads(response.text)["image"])[1] == "ZYX"
+
+
+def test_metrics(selected_algo_name, example_params):
+    client.post("/image", json={"data": encode_image(np.full((40, 60), 90, dtype=np.uint8))})
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    client.post(f"/image/{selected_algo_name}/result")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'pyalgos_requests_total{method="POST",route="/image/{algo_name}/result",status="201"}' in response.text
+    for stage in ["decode", "validate", "run_algo", "features"]:
+        assert f'pyalgos_stage_duration_seconds_count{{stage="{stage}"}}' in response.text
+    assert 'pyalgos_recorded_value_last{name="result_objects"} 3' in response.text
+    assert "pyalgos_process_peak_rss_bytes" in response.text
+
+
+def test_parameters_validation(selected_algo_name):
+    response = client.post(f"/image/{selected_algo_name}/parameters",
+                           json={"parameters": {"float_value": "0.25", "choices": "Option B"}})
+    assert response.status_code == 201
+    assert response.json() == {"integer_value": 122, "float_value": 0.25, "string_value": "this_value",
+                               "boolean_value": True, "choices": "Option B"}, "Expecting converted & default values"
+
+    response = client.post(f"/image/{selected_algo_name}/parameters",
+                           json={"parameters": {"integer_value": "a", "choices": "Option C", "unknown": 1}})
+    assert response.status_code == 422
+    errors = {error["loc"][-1]: error["type"] for error in response.json()["detail"]}
+    assert errors == {"integer_value": "int_parsing", "choices": "literal_error", "unknown": "extra_forbidden"}
+    assert client.get(f"/image/{selected_algo_name}/parameters").json() == {}
+
+    response = client.post("/image/stardist/parameters",
+                           json={"parameters": {"model_name": "2D_versatile_fluo", "norm_pmin": 99.9}})
+    assert response.status_code == 422, "Expecting the normalization percentiles to be checked before the processing"
+
+
+def test_array_store(selected_algo_name, example_params, tmp_path, monkeypatch):
+    store = ArrayStore(directory=str(tmp_path), threshold=1)
+    monkeypatch.setattr(main_module, "array_store", store)
+    response = client.post("/image", params={"new_session": True},
+                           json={"data": encode_image(np.full((40, 60), 100, dtype=np.uint8))})
+    session_id = response.json()["session_id"]
+    client.post(f"/image/{selected_algo_name}/parameters", params={"session_id": session_id},
+                json={"parameters": example_params})
+    assert client.post(f"/image/{selected_algo_name}/result", params={"session_id": session_id}).status_code == 201
+    server_data = sessions.get(session_id)
+    assert store.is_spilled(server_data.image_array) and store.is_spilled(server_data.result["image"])
+    assert server_data.nbytes == 0 and store.info()["arrays"] == 2
+    response = client.get(f"/image/{selected_algo_name}/result/image", params={"session_id": session_id})
+    assert decode_image(response.json()["image"]).max() == 100
+    client.delete("/image", params={"session_id": session_id})
+    assert store.info()["arrays"] == 0, "Expecting the files to be deleted with the session"
+
+
+def test_roi_and_level(selected_algo_name, example_params):
+    client.post("/image", json={"data": encode_image(np.full((40, 60), 110, dtype=np.uint8))})
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    response = client.post(f"/image/{selected_algo_name}/result", params={"bbox": "20,10,40,20"})
+    assert response.status_code == 201
+    assert response.json()["roi"] == {"x": 20, "y": 10, "width": 40, "height": 20, "level": 0}
+    features = client.get(f"/image/{selected_algo_name}/result/features").json()["features"]
+    xs = [x for feature in features for x, _ in feature["geometry"]["coordinates"][0]]
+    assert min(xs) >= 20, "Expecting the features in the coordinates of the image"
+    result_image = decode_image(client.get(f"/image/{selected_algo_name}/result/image").json()["image"])
+    assert result_image.shape == (20, 40)
+
+    response = client.post(f"/image/{selected_algo_name}/result", params={"level": 1})
+    assert response.json()["roi"] == {"x": 0, "y": 0, "width": 30, "height": 20, "level": 1}
+    response = client.get(f"/image/{selected_algo_name}/result/image", params={"level": 1, "bbox": "0,0,10,10"})
+    assert decode_image(response.json()["image"]).shape == (5, 5)
+    assert client.post(f"/image/{selected_algo_name}/result", params={"level": 10}).status_code == 400
+
+
+def test_geometry_options(selected_algo_name, example_params):
+    image = np.zeros((40, 60), dtype=np.uint8)
+    image[5:35, 10:50] = 200
+    client.post("/image", json={"data": encode_image(image)})
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    client.post(f"/image/{selected_algo_name}/result")
+    ring = client.get(f"/image/{selected_algo_name}/result/features").json()["features"][0]["geometry"]["coordinates"][0]
+    response = client.post(f"/image/{selected_algo_name}/result", params={"tolerance": 1, "decimals": 0})
+    assert response.status_code == 201
+    features = client.get(f"/image/{selected_algo_name}/result/features").json()["features"]
+    simplified_ring = features[0]["geometry"]["coordinates"][0]
+    assert len(simplified_ring) < len(ring), "Expecting fewer vertices for the simplified contour"
+    assert all(isinstance(value, int) for vertex in simplified_ring for value in vertex)
+    assert client.post(f"/image/{selected_algo_name}/result", params={"tolerance": -1}).status_code == 422
+    result = main_module._run_algo(lambda data, **kwargs: {"parameters": kwargs}, image, _geometry={"decimals": 0},
+                                   geometry="convex")
+    assert result["parameters"] == {"geometry": "convex"}, "Expecting the algorithm parameters to be passed unchanged"
+
+
+def test_stack(selected_algo_name, example_params):
+    stack = np.full((3, 40, 60), 110, dtype=np.uint8)
+    response = client.post("/image_bytes", content=stack.tobytes(),
+                           headers={"X-Image-Dtype": "|u1", "X-Image-Shape": "40,60,3", "X-Image-Axes": "YXZ"})
+    assert response.status_code == 201
+    assert response.json()["axes"] == "ZYX"
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    assert client.post(f"/image/{selected_algo_name}/result").status_code == 201
+    features = client.get(f"/image/{selected_algo_name}/result/features").json()["features"]
+    assert sorted({feature["properties"]["Z index"] for feature in features}) == [0, 1, 2]
+    response = client.get(f"/image/{selected_algo_name}/result/image_bytes", params={"format": "raw"})
+    assert response.headers["X-Image-Shape"] == "3,40,60"
+    assert response.headers["X-Image-Axes"] == "ZYX"
+    result_image = decode_image(client.get(f"/image/{selected_algo_name}/result/image").json()["image"])
+    assert result_image.shape == (3, 40, 60)
+    assert client.post(f"/image/{selected_algo_name}/result", params={"level": 1}).status_code == 400
+
+    # Multi-page TIFF without axes metadata, whose pages are split into frames x depth planes
+    fp = io.BytesIO()
+    tifffile.imwrite(fp, np.full((6, 40, 60), 110, dtype=np.uint8), photometric="minisblack", metadata=None)
+    data = base64.b64encode(fp.getvalue()).decode()
+    response = client.post("/image", json={"data": data, "dimensions": {"width": 60, "height": 40, "depth": 3,
+                                                                        "frames": 2}})
+    assert response.json()["axes"] == "TZYX"
+
+
+def test_query_features(selected_algo_name, example_params):
+    stack = np.full((3, 40, 60), 110, dtype=np.uint8)
+    client.post("/image_bytes", content=stack.tobytes(),
+                headers={"X-Image-Dtype": "|u1", "X-Image-Shape": "3,40,60", "X-Image-Axes": "ZYX"})
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    client.post(f"/image/{selected_algo_name}/result")
+    endpoint = f"/image/{selected_algo_name}/result/features"
+    features = client.get(endpoint).json()["features"]
+    selected = client.get(endpoint, params={"filter": ["Z index >= 1"], "bbox": "0,0,60,40"}).json()["features"]
+    assert selected == [feature for feature in features if feature["properties"]["Z index"] >= 1]
+    pages, cursor = [], None
+    while True:
+        response = client.get(endpoint, params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        cursor = response.json()["next_cursor"]
+        assert response.headers.get("X-Next-Cursor") == cursor
+        pages.extend(response.json()["features"])
+        if cursor is None:
+            break
+    assert pages == features
+    first_cursor = client.get(endpoint, params={"limit": 2}).json()["next_cursor"]
+    assert client.get(endpoint, params={"filter": ["Z index"]}).status_code == 400
+    assert client.get(endpoint, params={"bbox": "0,0"}).status_code == 400
+    client.post(f"/image/{selected_algo_name}/result", params={"tolerance": 1})
+    assert client.get(endpoint, params={"limit": 2, "cursor": first_cursor}).status_code == 409
+
+
+def test_feature_index_built_off_event_loop(selected_algo_name, example_params, monkeypatch):
+    threads = []
+
+    class RecordingFeatureIndex(FeatureIndex):
+        def __init__(self, features):
+            threads.append(threading.current_thread().name)
+            super().__init__(features)
+
+    monkeypatch.setattr(main_module, "FeatureIndex", RecordingFeatureIndex)
+    client.post("/image", json={"data": encode_image(np.full((40, 60), 115, dtype=np.uint8))})
+    client.post(f"/image/{selected_algo_name}/parameters", json={"parameters": example_params})
+    client.post(f"/image/{selected_algo_name}/result")
+    response = client.get(f"/image/{selected_algo_name}/result/features", params={"bbox": "0,0,60,40"})
+    assert response.status_code == 200
+    assert len(threads) == 1 and threads[0].startswith("codec"), "Expecting the index built in a codec worker"
+
+
+def test_empty_result_features():
+    server_data = ServerData()
+    server_data.result = {"image": np.zeros((40, 60), dtype=np.uint8), "features": []}
+    assert server_data.feature_index.query(bbox=(0, 0, 60, 40)) == ([], None)
+    server_data.result = {"image": np.zeros((40, 60), dtype=np.uint8)}
+    assert server_data.feature_index is None
+
+
+def test_job_with_directory_plugin(tmp_path, monkeypatch):
+    (tmp_path / "invert_plugin.py").write_text(
+        "def run_invert(data, **kwargs):\n"
+        "    return {'image': 255 - data}\n\n"
+        "ALGORITHMS = [{'name': 'invert', 'output_endpoints': ['image'], 'method': run_invert}]\n")
+    discover_plugin_dirs([str(tmp_path)])
+    process_jobs = JobManager(worker_type="process", initializer=discover_plugin_dirs, initargs=([str(tmp_path)],))
+    monkeypatch.setattr(main_module, "jobs", process_jobs)
+    try:
+        image = encode_image(np.full((40, 60), 5, dtype=np.uint8))
+        session_id = client.post("/image", params={"new_session": True}, json={"data": image}).json()["session_id"]
+        client.post("/image/invert/parameters", params={"session_id": session_id}, json={"parameters": {}})
+        job_id = client.post("/image/invert/jobs", params={"session_id": session_id}).json()["job_id"]
+        start = time.time()
+        while client.get(f"/jobs/{job_id}").json().get("status") in ("queued", "running") and time.time() - start < 60:
+            time.sleep(0.1)
+        job = client.get(f"/jobs/{job_id}").json()
+        assert job.get("status") == "done", f"Unexpected job status: {job}"
+        response = client.get("/image/invert/result/image", params={"session_id": session_id})
+        assert np.all(decode_image(response.json()["image"]) == 250)
+    finally:
+        process_jobs.shutdown()
+        registry.unregister("invert")
+
+
+def run_labelled_blobs(data: np.ndarray, **kwargs) -> {}:
+    labels, _ = ndimage.label(data > 0)
+    return {"image": labels, "features": get_features_from_segm_mask(labels)}
+
+
+def test_tiled_plugin():
+    # the tiling engine processes the images by tiles for the algorithms with a "tiling" definition
+    shapes = []
+
+    def run_tile(data: np.ndarray, **kwargs) -> {}:
+        shapes.append(data.shape)
+        return run_labelled_blobs(data, **kwargs)
+
+    registry.register({"name": "tiled_blobs", "output_endpoints": ["image", "features"], "label_outputs": ["image"],
+                       "tiling": {"tile_size": 64, "overlap": 16}, "method": run_tile})
+    try:
+        image = np.zeros((40, 300), dtype=np.uint8)
+        for col in range(5, 290, 23):
+            image[10 + col % 17:18 + col % 17, col:col + 9] = 200
+        client.post("/image", json={"data": encode_image(image)})
+        client.post("/image/tiled_blobs/parameters", json={"parameters": {}})
+        assert client.post("/image/tiled_blobs/result").status_code == 201
+        assert len(shapes) > 1 and max(width for _, width in shapes) <= 64 + 2 * 16, "Expecting the image by tiles"
+        expected = run_labelled_blobs(image)
+        result_image = decode_image(client.get("/image/tiled_blobs/result/image").json()["image"])
+        assert np.array_equal(result_image > 0, expected["image"] > 0), "Unexpected stitched objects"
+        features = client.get("/image/tiled_blobs/result/features").json()["features"]
+        assert len(features) == len(expected["features"]), "Objects on the tiles borders should not be duplicated"
+        assert sorted(feature["properties"]["Detection ID"] for feature in features) == \
+               list(range(1, len(features) + 1)), "Expecting the objects to be relabelled across the tiles"
+        assert sorted(feature["geometry"]["coordinates"][0][0] for feature in features) == \
+               sorted(feature.geometry["coordinates"][0][0] for feature in expected["features"]), \
+               "Expecting the features in the coordinates of the image"
+    finally:
+        registry.unregister("tiled_blobs")
+
+
 # TODO: Add tests with example algorithm
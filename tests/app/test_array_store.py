@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+
+from app.array_store import ArrayStore
+
+
+def test_spill_large_arrays(tmp_path):
+    store = ArrayStore(directory=str(tmp_path), threshold=1000)
+    small, large = np.zeros(10, dtype=np.uint8), np.arange(1000, dtype=np.uint16).reshape(20, 50)
+    assert store.spill(small) is small
+    spilled = store.spill(large)
+    assert isinstance(spilled, np.memmap) and store.is_spilled(spilled)
+    np.testing.assert_array_equal(spilled, large)
+    spilled[0, 0] = 7  # copy-on-write: the file is not modified
+    np.testing.assert_array_equal(store.spill(large), large)
+    assert store.info()["arrays"] == 2
+
+    store.release(spilled)
+    assert not os.path.exists(spilled.filename)
+    store.close()
+    assert not os.path.exists(store.directory)
+
+
+def test_disabled_store():
+    store = ArrayStore()
+    data = np.zeros((100, 100))
+    assert not store.enabled and store.spill(data) is data
+    assert store.info()["arrays"] == 0
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from app.axes import default_axes, parse_axes, to_canonical
+
+
+def test_default_axes():
+    assert default_axes(2) == "YX"
+    assert default_axes(3) == "YXC"
+    assert default_axes(4) is None
+
+
+def test_parse_axes():
+    assert parse_axes("tzyx", 4) == "TZYX"
+    for axes in ["ZYX", "ZZYX", "TZYW", "TZCY"]:
+        with pytest.raises(ValueError):
+            parse_axes(axes, 4)
+
+
+@pytest.mark.parametrize("axes, shape, depth, frames, expected_axes, expected_shape", [
+    ("TZCYX", (2, 3, 4, 8, 9), None, None, "TZYXC", (2, 3, 8, 9, 4)),
+    ("ZYXS", (3, 8, 9, 3), None, None, "ZYXC", (3, 8, 9, 3)),
+    ("IYX", (6, 8, 9), None, None, "ZYX", (6, 8, 9)),
+    ("IYX", (6, 8, 9), None, 6, "TYX", (6, 8, 9)),
+    ("IYX", (6, 8, 9), 3, 2, "TZYX", (2, 3, 8, 9)),
+    ("TZYX", (1, 4, 8, 9), None, None, "ZYX", (4, 8, 9)),
+    ("ZYX", (1, 8, 9), None, None, "YX", (8, 9)),
+])
+def test_to_canonical(axes, shape, depth, frames, expected_axes, expected_shape):
+    data = np.arange(np.prod(shape)).reshape(shape)
+    canonical, canonical_axes = to_canonical(data, axes, depth=depth, frames=frames)
+    assert canonical_axes == expected_axes
+    assert canonical.shape == expected_shape
+    assert np.shares_memory(canonical, data), "Expecting a view of the data"
+
+
+def test_to_canonical_channels():
+    data = np.arange(2 * 3 * 8 * 9).reshape(2, 3, 8, 9)
+    canonical, _ = to_canonical(data, "ZCYX")
+    assert np.array_equal(canonical[1, :, :, 2], data[1, 2])
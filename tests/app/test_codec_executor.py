@@ -0,0 +1,70 @@
+import asyncio
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from algos.timing import record_measurements, timed
+from app.codec_executor import CodecExecutor
+from app.encoding import decode_image, encode_image
+
+
+@pytest.fixture()
+def codecs() -> CodecExecutor:
+    codecs = CodecExecutor(max_workers=2)
+    yield codecs
+    codecs.shutdown()
+
+
+def _timed_thread_id() -> int:
+    with timed("codec"):
+        return threading.get_ident()
+
+
+def test_run_in_thread(codecs):
+    async def run():
+        with record_measurements() as measurements:
+            thread_id = await codecs.run(_timed_thread_id)
+        return thread_id, measurements
+
+    thread_id, measurements = asyncio.run(run())
+    assert thread_id != threading.get_ident(), "Expecting the step to run in a worker thread"
+    assert "codec" in measurements.timings, "Expecting the timings of the step in the context of the caller"
+
+
+def test_event_loop_not_blocked(codecs):
+    async def run():
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        await codecs.run(time.sleep, 0.3)
+        ticker.cancel()
+        return ticks
+
+    assert len(asyncio.run(run())) > 5, "Expecting the event loop to run during the step"
+
+
+def test_iterate(codecs):
+    async def run():
+        return [item async for item in codecs.iterate(iter(range(5)))]
+
+    assert asyncio.run(run()) == list(range(5))
+
+
+def test_run_in_process():
+    codecs = CodecExecutor(max_workers=1, process_workers=1, process_threshold=100)
+    image = np.arange(100, dtype=np.uint8).reshape(10, 10)
+    data = encode_image(image)
+    try:
+        assert asyncio.run(codecs.run(os.getpid, size=10)) == os.getpid(), "Expecting small payloads in a thread"
+        assert asyncio.run(codecs.run(os.getpid, size=100)) != os.getpid(), "Expecting large payloads in a process"
+        np.testing.assert_array_equal(asyncio.run(codecs.run(decode_image, data, size=len(data))), image)
+    finally:
+        codecs.shutdown()
@@ -1,7 +1,17 @@
+import asyncio
+import base64
+import io
+import json
+
 import numpy as np
 import pytest
+import tifffile
 
-from app.encoding import encode_image, decode_image
+import app.encoding
+from app.encoding import (encode_image, decode_image, iter_array_bytes, encode_tiff_file, spool_stream,
+                          decode_image_file, UploadTooLarge, iter_geojson_features, encode_features_columnar,
+                          decode_image_stack, read_image_stack, encode_labels, decode_labels_rle,
+                          decode_labels_sparse)
 
 
 @pytest.fixture()
@@ -30,3 +40,120 @@ def test_decode_image(image, encoded_image_ref):
     decoded_image = decode_image(encoded_image_ref)
     assert np.shape(image) == np.shape(decoded_image), "Unexpected dimensions for decoded image"
     assert np.array_equal(decoded_image, image), "Unexpected result for decoded image"
+
+
+def test_iter_array_bytes(image):
+    data = b"".join(iter_array_bytes(image, chunk_size=16))
+    assert np.array_equal(np.frombuffer(data, dtype=image.dtype).reshape(image.shape), image), \
+        "Unexpected result for raw image bytes"
+
+
+@pytest.mark.parametrize("compression", ["none", "deflate"])
+def test_encode_tiff_file(image, compression):
+    with encode_tiff_file(image, compression) as fp:
+        assert np.array_equal(tifffile.imread(io.BytesIO(fp.read())), image), "Unexpected result for TIFF encoded image"
+
+
+def test_encode_tiff_file_unknown_compression(image):
+    with pytest.raises(ValueError):
+        encode_tiff_file(image, "ghost")
+
+
+async def _stream(data: bytes, chunk_size: int = 16):
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+@pytest.mark.parametrize("spool_max_size", [1024 ** 2, 32])
+def test_decode_raw_image_file(image, monkeypatch, spool_max_size):
+    monkeypatch.setattr(app.encoding, "SPOOL_MAX_SIZE", spool_max_size)
+    fp, size = asyncio.run(spool_stream(_stream(image.tobytes())))
+    assert size == image.nbytes
+    decoded_image = decode_image_file(fp, dtype=image.dtype.str, shape=image.shape)
+    assert np.array_equal(decoded_image, image), "Unexpected result for decoded raw image"
+
+
+def test_decode_encoded_image_file(image, encoded_image_ref):
+    fp, _ = asyncio.run(spool_stream(_stream(base64.b64decode(encoded_image_ref))))
+    assert np.array_equal(decode_image_file(fp), image), "Unexpected result for decoded image file"
+
+
+def test_encode_decode_image_stack(image):
+    stack = np.stack([image + i for i in range(6)]).reshape(2, 3, *image.shape)
+    decoded, axes = decode_image_stack(encode_image(stack, "TZYX"))
+    assert axes == "TZYX"
+    np.testing.assert_array_equal(decoded, stack)
+    fp = encode_tiff_file(stack[0], compression="deflate", axes="ZYX")
+    decoded, axes = read_image_stack(fp)
+    assert axes == "ZYX"
+    np.testing.assert_array_equal(decoded, stack[0])
+
+
+def test_decode_multi_page_tiff(image):
+    fp = io.BytesIO()
+    tifffile.imwrite(fp, np.stack([image] * 6), photometric="minisblack", metadata=None)
+    assert decode_image_stack(base64.b64encode(fp.getvalue()))[1] == "ZYX", "Expecting the pages as Z planes"
+    decoded, axes = decode_image_stack(base64.b64encode(fp.getvalue()), depth=3, frames=2)
+    assert axes == "TZYX"
+    assert decoded.shape == (2, 3) + image.shape
+
+
+def test_spool_stream_max_size(image):
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_stream(_stream(image.tobytes()), max_size=100))
+
+
+@pytest.fixture()
+def features() -> [{}]:
+    return [{"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 0]]]},
+             "properties": {"Detection ID": 1, "Detection probability": 0.5, "Classification": "Positive"}},
+            {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [[[2, 2], [4, 2], [4, 4], [2, 2]],
+                                                                               [[3, 2.5], [3.5, 3], [3, 2.5]]]},
+             "properties": {"Detection ID": 2}}]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1000])
+def test_iter_geojson_features(features, chunk_size):
+    data = b"".join(iter_geojson_features(features, chunk_size=chunk_size))
+    assert json.loads(data) == {"features": features}, "Unexpected result for GeoJSON features"
+
+
+def test_encode_features_columnar(features):
+    columns = np.load(io.BytesIO(encode_features_columnar(features)))
+    assert columns["coordinates"].shape == (11, 2)
+    assert columns["ring_offsets"].tolist() == [0, 4, 8, 11]
+    assert columns["polygon_offsets"].tolist() == [0, 1, 3]
+    assert columns["geometry_offsets"].tolist() == [0, 1, 2]
+    assert columns["properties/Detection ID"].tolist() == [1, 2]
+    assert np.isnan(columns["properties/Detection probability"][1])
+    assert columns["properties/Classification"].tolist() == ["Positive", ""]
+
+
+@pytest.fixture()
+def labels() -> np.ndarray:
+    labels = np.zeros((2, 60, 80), dtype=np.uint16)
+    labels[0, 5:20, 10:30] = 1
+    labels[0, 12:40, 25:50] = 7
+    labels[1, 30:55, 60:75] = 300
+    labels[1, 50:52, 0:2] = 7
+    return labels
+
+
+@pytest.mark.parametrize("encoding, decode", [("rle", decode_labels_rle), ("sparse", decode_labels_sparse)])
+def test_encode_labels(labels, encoding, decode):
+    data = encode_labels(labels, encoding)
+    assert len(data) < labels.nbytes / 4, "Expecting a compact encoding"
+    decoded = decode(data)
+    assert decoded.dtype == labels.dtype
+    np.testing.assert_array_equal(decoded, labels)
+    np.testing.assert_array_equal(decode(encode_labels(labels[:, :0], encoding)), labels[:, :0])
+    np.testing.assert_array_equal(decode(encode_labels(labels[0] > 0, encoding)), labels[0] > 0)
+
+
+def test_encode_labels_errors(labels):
+    with pytest.raises(ValueError):
+        encode_labels(labels, "png")
+    with pytest.raises(ValueError):
+        encode_labels(labels.astype(np.float32), "rle")
+    with pytest.raises(ValueError):
+        encode_labels(labels.astype(np.int16) - 1, "sparse")
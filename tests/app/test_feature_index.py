@@ -0,0 +1,74 @@
+import operator
+
+import numpy as np
+import pytest
+
+from app.feature_index import FeatureIndex, StaleCursor, parse_filter
+
+
+def _square(x: float, y: float, size: float, **properties) -> {}:
+    ring = [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+    return {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [ring]}, "properties": properties}
+
+
+@pytest.fixture()
+def features() -> [{}]:
+    rng = np.random.default_rng(0)
+    return [_square(*rng.uniform(0, 1000, 2), rng.uniform(5, 20), **{"Detection probability": float(rng.random()),
+                                                                       "Classification": str(rng.choice(["A", "B"]))})
+            for _ in range(2000)]
+
+
+def _intersects(feature: {}, bbox: (float, float, float, float)) -> bool:
+    coordinates = np.asarray(feature["geometry"]["coordinates"][0])
+    x, y, width, height = bbox
+    return coordinates[:, 0].min() <= x + width and coordinates[:, 0].max() >= x and \
+        coordinates[:, 1].min() <= y + height and coordinates[:, 1].max() >= y
+
+
+def test_parse_filter():
+    assert parse_filter("Detection probability >= 0.8") == ("Detection probability", operator.ge, 0.8)
+    assert parse_filter("Classification==Positive") == ("Classification", operator.eq, "Positive")
+    with pytest.raises(ValueError):
+        parse_filter("Detection probability")
+
+
+@pytest.mark.parametrize("bbox", [(100, 200, 50, 80), (0, 0, 1000, 1000), (-50, -50, 10, 10), (990, 500, 100, 1)])
+def test_query_bbox(features, bbox):
+    index = FeatureIndex(features)
+    hits, next_cursor = index.query(bbox=bbox)
+    assert hits == [feature for feature in features if _intersects(feature, bbox)]
+    assert next_cursor is None
+
+
+def test_query_filters(features):
+    index = FeatureIndex(features)
+    hits, _ = index.query(filters=["Detection probability > 0.9", "Classification == A"])
+    assert hits == [feature for feature in features if feature["properties"]["Detection probability"] > 0.9 and
+                    feature["properties"]["Classification"] == "A"]
+    hits, _ = index.query(bbox=(0, 0, 500, 500), filters=["Detection probability <= 0.2"])
+    assert hits == [feature for feature in features if _intersects(feature, (0, 0, 500, 500)) and
+                    feature["properties"]["Detection probability"] <= 0.2]
+    assert index.query(filters=["Missing property >= 0"])[0] == []
+
+
+def test_query_pages(features):
+    index = FeatureIndex(features)
+    expected, _ = index.query(filters=["Classification != B"])
+    hits, cursor = [], None
+    while True:
+        page, cursor = index.query(filters=["Classification != B"], limit=300, cursor=cursor)
+        assert len(page) <= 300
+        hits.extend(page)
+        if cursor is None:
+            break
+    assert hits == expected
+    with pytest.raises(StaleCursor):
+        FeatureIndex(features).query(limit=10, cursor=index.query(limit=10)[1])
+
+
+def test_query_empty():
+    for features in [[], [{"type": "Feature", "geometry": None, "properties": {"Classification": "A"}}]]:
+        index = FeatureIndex(features)
+        assert index.query(bbox=(0, 0, 10, 10)) == ([], None)
+        assert index.query(filters=["Classification == A"], limit=5) == (features, None)
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from app.jobs import JobManager, JobQueueFull, DONE, FAILED, CANCELLED, TIMEOUT
+
+
+def _wait(job, timeout: float = 5):
+    start = time.time()
+    while job.status not in (DONE, FAILED, CANCELLED, TIMEOUT) and time.time() - start < timeout:
+        time.sleep(0.01)
+    return job.status
+
+
+@pytest.fixture()
+def jobs() -> JobManager:
+    jobs = JobManager(max_workers=1, max_queued=1, worker_type="thread")
+    yield jobs
+    jobs.shutdown()
+
+
+def test_job_done(jobs):
+    results = []
+    job = jobs.submit(sum, args=([1, 2, 3],), on_done=lambda result: results.append(result) or ["value"])
+    assert _wait(job) == DONE
+    assert results == [6]
+    assert jobs.get(job.id).to_dict()["output_endpoints"] == ["value"]
+
+
+def test_job_failed(jobs):
+    job = jobs.submit(int, args=("not an int",))
+    assert _wait(job) == FAILED
+    assert job.error is not None
+
+
+def test_queue_full_and_cancel(jobs):
+    event = threading.Event()
+    running = jobs.submit(event.wait)
+    queued = jobs.submit(event.wait)
+    with pytest.raises(JobQueueFull):
+        jobs.submit(event.wait)
+    assert jobs.cancel(queued.id).status == CANCELLED
+    event.set()
+    assert _wait(running) == DONE
+
+
+def test_job_timeout():
+    jobs = JobManager(max_workers=1, timeout=0.05, worker_type="thread")
+    job = jobs.submit(time.sleep, args=(0.2,))
+    assert _wait(job) == TIMEOUT
+    jobs.shutdown()
+
+
+def test_job_timeout_recycles_worker():
+    jobs = JobManager(max_workers=1, timeout=2, worker_type="process")
+    try:
+        hung = jobs.submit(time.sleep, args=(60,))
+        assert _wait(hung, timeout=10) == TIMEOUT
+        # the job would time out while waiting for the hung worker if it was not recycled
+        assert _wait(jobs.submit(sum, args=([1, 2, 3],)), timeout=10) == DONE
+    finally:
+        jobs.shutdown()
+
+
+def test_job_timeout_resubmits_running_jobs():
+    jobs = JobManager(max_workers=2, timeout=4, worker_type="process")
+    try:
+        hung = jobs.submit(time.sleep, args=(60,))
+        time.sleep(3)
+        # the job is still running in the other worker when the workers are recycled
+        running = jobs.submit(time.sleep, args=(1.5,))
+        assert _wait(hung, timeout=10) == TIMEOUT
+        assert _wait(running, timeout=10) == DONE, f"Unexpected job error: {running.error}"
+    finally:
+        jobs.shutdown()
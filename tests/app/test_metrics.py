@@ -0,0 +1,52 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from algos.timing import timed, record, record_measurements
+from app.metrics import Histogram, Metrics, MetricsMiddleware
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(1, 10))
+    for value in [0.5, 5, 50]:
+        histogram.observe(value)
+    assert histogram.counts == [1, 2]
+    assert histogram.count == 3 and histogram.sum == 55.5
+
+
+def test_timed_outside_request():
+    # The stages are not recorded outside an instrumented request
+    with timed("stage"):
+        record("value", 1)
+    with record_measurements() as measurements:
+        with timed("stage"):
+            pass
+        with timed("stage"):
+            record("value", 2)
+    assert list(measurements.timings) == ["stage"]
+    assert measurements.values == {"value": 2}
+
+
+def test_middleware_server_timing():
+    app = FastAPI()
+    metrics = Metrics()
+    app.add_middleware(MetricsMiddleware, metrics=metrics, server_timing=True)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        with timed("lookup"):
+            record("item_id", item_id)
+        return {"item_id": item_id}
+
+    client = TestClient(app)
+    response = client.get("/items/3")
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("lookup;dur=")
+    assert "app;dur=" in response.headers["server-timing"]
+    assert client.get("/unknown").status_code == 404
+
+    text = metrics.to_prometheus({"pyalgos_test_gauge": ("Test gauge", 7)})
+    assert 'pyalgos_requests_total{method="GET",route="/items/{item_id}",status="200"} 1' in text
+    assert 'pyalgos_requests_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert 'pyalgos_stage_duration_seconds_count{stage="lookup"} 1' in text
+    assert 'pyalgos_recorded_value_last{name="item_id"} 3' in text
+    assert "# TYPE pyalgos_test_gauge gauge\npyalgos_test_gauge 7" in text
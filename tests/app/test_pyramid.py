@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from app.pyramid import ImagePyramid, downsample, parse_bbox
+
+
+def test_downsample():
+    image = np.arange(35, dtype=np.uint8).reshape(5, 7)
+    downsampled = downsample(image)
+    assert downsampled.shape == (3, 4) and downsampled.dtype == np.uint8
+    assert downsampled[0, 0] == 4  # mean of [[0, 1], [7, 8]]
+    assert downsampled[2, 3] == 34, "Expecting the last row & column to be repeated"
+    labels = np.array([[1, 1, 2], [1, 3, 2]])
+    np.testing.assert_array_equal(downsample(labels, labels=True), [[1, 2]])
+    assert downsample(np.ones((4, 6, 3))).shape == (2, 3, 3)
+
+
+def test_pyramid_read():
+    pyramid = ImagePyramid(np.ones((100, 60), dtype=np.float32))
+    assert pyramid.max_level == 6 and pyramid.nbytes == 0
+    assert pyramid.get_level(6).shape == (2, 1)
+    assert pyramid.nbytes > 0, "Expecting the levels to be kept"
+    region, offset = pyramid.read((10, 21, 20, 30), level=1)
+    assert region.shape == (16, 10) and offset == (5, 10)
+    with pytest.raises(ValueError):
+        pyramid.read(level=7)
+    with pytest.raises(ValueError):
+        pyramid.read((100, 0, 10, 10))
+
+
+def test_parse_bbox():
+    assert parse_bbox("1,2,3,4") == (1, 2, 3, 4)
+    assert parse_bbox(None) is None
+    with pytest.raises(ValueError):
+        parse_bbox("1,2,3")
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from app.result_cache import ResultCache
+
+
+@pytest.fixture()
+def image() -> np.ndarray:
+    return np.arange(100, dtype=np.uint16).reshape(10, 10)
+
+
+def test_key_depends_on_content_algo_and_params(image):
+    key = ResultCache.key(image, "algo", {"a": 1, "b": 2})
+    assert ResultCache.key(image.copy(), "algo", {"b": 2, "a": 1}) == key, "Key should depend on the content only"
+    assert ResultCache.key(image[:, ::-1], "algo", {"a": 1, "b": 2}) != key
+    assert ResultCache.key(image, "other", {"a": 1, "b": 2}) != key
+    assert ResultCache.key(image, "algo", {"a": 1, "b": 3}) != key
+    assert ResultCache.key(image.astype(np.int16), "algo", {"a": 1, "b": 2}) != key
+    assert ResultCache.key(ResultCache.image_digest(image), "algo", {"a": 1, "b": 2}) == key, \
+        "Expecting the same key for the image digest"
+
+
+def test_memory_lru(image):
+    cache = ResultCache(max_entries=2)
+    for key in ["a", "b", "c"]:
+        cache.put(key, {"image": image})
+    assert cache.get("a") is None
+    assert cache.get("c")["image"] is image
+    assert cache.info()["hits"] == 1 and cache.info()["misses"] == 1
+
+
+def test_disk_cache(image, tmp_path):
+    ResultCache(max_entries=1, directory=str(tmp_path)).put("a", {"image": image})
+    cache = ResultCache(max_entries=1, directory=str(tmp_path))
+    assert np.array_equal(cache.get("a")["image"], image), "Expecting the result from the disk cache"
+    assert cache.info()["disk_hits"] == 1
@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.sessions import SessionStore, DEFAULT_SESSION_ID
+
+
+class Data:
+    def __init__(self):
+        self.array = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes if self.array is not None else 0
+
+
+def test_default_session_is_created():
+    sessions = SessionStore(Data)
+    assert sessions.get() is sessions.get(DEFAULT_SESSION_ID)
+
+
+def test_unknown_session_raises_exc():
+    with pytest.raises(KeyError):
+        SessionStore(Data).get("ghost")
+
+
+def test_expired_session_is_evicted():
+    sessions = SessionStore(Data, ttl=0.01)
+    session_id = sessions.create()
+    time.sleep(0.02)
+    sessions.evict()
+    assert session_id not in sessions
+
+
+def test_memory_cap_evicts_least_recently_used():
+    sessions = SessionStore(Data, max_memory=150)
+    session_ids = [sessions.create() for _ in range(3)]
+    for session_id in session_ids:
+        sessions.get(session_id).array = np.zeros(100, dtype=np.uint8)
+    sessions.evict(keep=session_ids[-1])
+    assert [session_id in sessions for session_id in session_ids] == [False, False, True]
+    assert sessions.memory == 100
+
+
+def test_deleted_session_data_is_released():
+    deleted = []
+    sessions = SessionStore(Data, ttl=0.01, on_delete=deleted.append)
+    session_ids = [sessions.create(), sessions.create()]
+    sessions.delete(session_ids[0])
+    time.sleep(0.02)
+    sessions.evict()
+    assert len(deleted) == 2, "Expecting the data of the deleted & expired sessions to be released"
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+from algos import registry
+from algos.algo_map import get_algo_method, get_prewarm_algos, is_algo_loaded, prewarm_algos
+
+
+def test_metadata_without_heavy_imports():
+    # The app starts and serves the metadata of the algorithms without importing their dependencies
+    code = ("import sys\n"
+            "from fastapi.testclient import TestClient\n"
+            "from app.main import app\n"
+            "client = TestClient(app)\n"
+            "assert client.get('/algos_names/').status_code == 200\n"
+            "assert client.get('/algos/stardist/').json()['name'] == 'stardist'\n"
+            "assert client.get('/algos/stardist/required_parameters').status_code == 200\n"
+            "print(sorted(name for name in ('stardist', 'csbdeep', 'tensorflow') if name in sys.modules))\n")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_lazy_algo_method():
+    assert get_algo_method("unknown") is None
+    prewarm_algos(["example", "unknown"])
+    assert is_algo_loaded("example")
+    assert get_algo_method("example").__name__ == "run_example"
+
+
+def test_prewarm_algos_env(monkeypatch):
+    monkeypatch.setenv("PYALGOS_PREWARM_ALGOS", "stardist, example")
+    assert get_prewarm_algos() == ["stardist", "example"]
+    monkeypatch.setenv("PYALGOS_PREWARM_ALGOS", "all")
+    assert get_prewarm_algos() == registry.names
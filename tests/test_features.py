@@ -1,8 +1,15 @@
+import json
+
 import numpy as np
 import pytest
 from geojson import Feature
 
-from algos.compute_features import get_features_from_segm_mask
+from skimage import measure
+from skimage.measure import regionprops_table
+
+from algos.compute_features import (get_features_from_segm_mask, get_triangulation_features,
+                                    get_triangulation_geojson, get_triangulation, get_feature_centroids,
+                                    measure_objects, add_measurements, translate_features, geometry_options)
 
 
 @pytest.fixture()
@@ -111,3 +118,125 @@ def test_get_features_from_segm_mask(segm_mask: np.ndarray, features_ref: [Featu
         geom_ref = feature_ref.get("geometry")
         assert np.allclose(geom.get("coordinates"), geom_ref.get("coordinates")), \
             "Unequal coordinates values for the detected feature's geometry"
+
+
+def test_get_features_from_segm_mask_detection_ids(segm_mask: np.ndarray):
+    features = get_features_from_segm_mask(segm_mask)
+    assert [feature.properties.get("Detection ID") for feature in features] == [148, 240], \
+        "Unexpected 'Detection ID' for the detected features"
+    # Integer masks go through the bounding boxes of the labels directly and should give the same features
+    features_int = get_features_from_segm_mask(segm_mask.astype(np.uint16))
+    assert features_int == features, "Unexpected features for integer segmentation mask"
+
+
+def test_get_features_from_segm_mask_negative_labels():
+    segm_mask = np.zeros((10, 10), dtype=np.int32)
+    segm_mask[1:4, 1:4] = -1
+    segm_mask[6:9, 6:9] = 1
+    features = get_features_from_segm_mask(segm_mask)
+    assert [feature.properties.get("Detection ID") for feature in features] == [-1, 1], \
+        "The background should not be an object"
+    assert measure_objects(segm_mask)["Area"].tolist() == [9, 9]
+
+
+def test_get_features_from_empty_segm_mask():
+    assert get_features_from_segm_mask(np.zeros((10, 10), dtype=np.int32)) == []
+
+
+def test_get_features_geometry_options(segm_mask: np.ndarray):
+    features = get_features_from_segm_mask(segm_mask)
+    simplified = get_features_from_segm_mask(segm_mask, tolerance=1)
+    for feature, simplified_feature in zip(features, simplified):
+        ring, simplified_ring = feature.geometry["coordinates"][0], simplified_feature.geometry["coordinates"][0]
+        assert 4 <= len(simplified_ring) < len(ring), "Expecting fewer vertices for the simplified contours"
+        assert simplified_ring[0] == simplified_ring[-1], "Expecting closed simplified contours"
+        assert all(vertex in ring for vertex in simplified_ring), "Expecting the vertices of the original contours"
+    rounded = get_features_from_segm_mask(segm_mask, decimals=0)
+    coordinates = [value for feature in rounded for vertex in feature.geometry["coordinates"][0] for value in vertex]
+    assert all(isinstance(value, int) for value in coordinates), "Expecting integer coordinates"
+    # The options can also be set for the features extracted in a block (e.g. by an algorithm)
+    with geometry_options(tolerance=1):
+        assert get_features_from_segm_mask(segm_mask) == simplified
+    assert get_features_from_segm_mask(segm_mask) == features
+
+
+def test_get_features_with_holes():
+    segm_mask = np.zeros((20, 20), dtype=np.uint8)
+    segm_mask[2:18, 2:18] = 3
+    segm_mask[6:10, 6:10] = 0
+    assert len(get_features_from_segm_mask(segm_mask)[0].geometry["coordinates"]) == 1
+    rings = get_features_from_segm_mask(segm_mask, holes=True)[0].geometry["coordinates"]
+    assert len(rings) == 2, "Expecting the exterior ring & the ring of the hole"
+    hole = np.array(rings[1])
+    assert hole.min() > 5 and hole.max() < 10, "Unexpected position of the hole"
+
+
+def test_measure_objects(segm_mask: np.ndarray):
+    image = np.random.default_rng(0).random(segm_mask.shape + (2,))
+    measurements = measure_objects(segm_mask, image)
+    reference = regionprops_table(segm_mask.astype(int), image, properties=("label", "area", "centroid",
+                                                                           "eccentricity", "intensity_mean"))
+    np.testing.assert_array_equal(measurements["label"], [148, 240])
+    np.testing.assert_allclose(measurements["Area"], reference["area"])
+    np.testing.assert_allclose(measurements["Centroid X"], reference["centroid-1"])
+    np.testing.assert_allclose(measurements["Centroid Y"], reference["centroid-0"])
+    np.testing.assert_allclose(measurements["Eccentricity"], reference["eccentricity"], atol=1e-6)
+    np.testing.assert_allclose(measurements["Channel 2 mean"], reference["intensity_mean-1"])
+    # Same measurements by chunks of rows measured in parallel
+    large_mask = np.tile(segm_mask.astype(np.uint16), (40, 1))
+    large_measurements = measure_objects(large_mask, max_workers=4)
+    np.testing.assert_allclose(large_measurements["Area"], measurements["Area"] * 40)
+
+
+def test_add_measurements(segm_mask: np.ndarray):
+    features = add_measurements(get_features_from_segm_mask(segm_mask), segm_mask, np.ones(segm_mask.shape))
+    for feature in features:
+        properties = feature["properties"]
+        assert properties["Channel 1 mean"] == 1 and properties["Channel 1 std"] == 0
+        assert properties["Perimeter"] > 0 and properties["Area"] > 0
+    area, centroid_x = features[0]["properties"]["Area"], features[0]["properties"]["Centroid X"]
+    translate_features(features, (10, 20), scale=2)
+    assert features[0]["properties"]["Area"] == area * 4
+    assert features[0]["properties"]["Centroid X"] == centroid_x * 2 + 10
+
+
+def test_perimeter_independent_of_geometry_options():
+    rows, cols = np.mgrid[:200, :200]
+    disk = ((rows - 100) ** 2 + (cols - 100) ** 2 <= 60 ** 2).astype(np.uint8)
+    contour = measure.find_contours(np.pad(disk, 1), 0.5)[0]
+    expected = np.hypot(*np.diff(contour, axis=0).T).sum()
+    for options in [{}, {"tolerance": 2}, {"tolerance": 5, "decimals": 0}]:
+        with geometry_options(**options):
+            features = add_measurements(get_features_from_segm_mask(disk), disk)
+        assert features[0]["properties"]["Perimeter"] == pytest.approx(expected), f"Unexpected perimeter for {options}"
+    # Same perimeters by chunks of rows, including the contours of the holes
+    ring = disk.copy()
+    ring[90:110, 90:110] = 0
+    large_mask = np.tile(ring, (4, 1)) * np.repeat(np.arange(1, 5), 200)[:, None]
+    contours = measure.find_contours(np.pad(ring, 1), 0.5)
+    expected = sum(np.hypot(*np.diff(contour, axis=0).T).sum() for contour in contours)
+    np.testing.assert_allclose(measure_objects(large_mask, max_workers=4)["Perimeter"], [expected] * 4)
+
+
+def test_triangulation():
+    points = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0], [10.5, 10.25]])
+    features = get_triangulation_features(points)
+    assert len(features) == 2, "Unexpected number of triangles"
+    for feature in features:
+        ring = feature.geometry["coordinates"][0]
+        assert len(ring) == 4 and ring[0] == ring[-1], "Expecting closed triangles"
+    feature_collection = json.loads(get_triangulation_geojson(points))
+    assert feature_collection["features"] == json.loads(json.dumps(features)), "Unexpected GeoJSON triangulation"
+    triangulation = get_triangulation(points)
+    assert triangulation["vertices"] == points.tolist()
+    assert [[triangulation["vertices"][i] for i in triangle] for triangle in triangulation["triangles"]] == \
+           [feature.geometry["coordinates"][0][:3] for feature in features], "Unexpected compact triangulation"
+    with pytest.raises(ValueError):
+        get_triangulation_geojson(np.array([[0.0, 0.0], [10.0, 0.0], [0.0, np.nan], [np.inf, 10.0]]))
+
+
+def test_feature_centroids():
+    features = get_features_from_segm_mask(np.pad(np.ones((4, 6), dtype=np.uint8), 2))
+    assert get_feature_centroids(features).tolist() == [[4.5, 3.5]], "Expecting the mean of the contour vertices"
+    features[0]["properties"] = {"Centroid X": 1.0, "Centroid Y": 2.0}
+    assert get_feature_centroids(features).tolist() == [[1.0, 2.0]], "Expecting the centroid measurements"
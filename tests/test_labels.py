@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from algos.labels import compact_labels, minimal_label_dtype, run_compacted
+
+
+@pytest.mark.parametrize("max_label, dtype", [(0, np.uint8), (255, np.uint8), (256, np.uint16), (65535, np.uint16),
+                                              (65536, np.uint32)])
+def test_minimal_label_dtype(max_label, dtype):
+    labels = np.zeros((5, 4), dtype=np.int32)
+    labels[2, 1] = max_label
+    assert minimal_label_dtype(labels) == dtype
+    assert minimal_label_dtype(labels.astype(">i8")) == dtype
+
+
+def test_minimal_label_dtype_not_labels():
+    assert minimal_label_dtype(np.array([[-1, 2]], dtype=np.int16)) == np.int16
+    assert minimal_label_dtype(np.array([[0.5]], dtype=">f4")) == np.dtype("<f4").newbyteorder("=")
+
+
+def test_compact_labels():
+    labels = np.array([[0, 1], [300, 2]], dtype=">u4")
+    compacted = compact_labels(labels)
+    assert compacted.dtype == np.uint16 and compacted.dtype.isnative
+    np.testing.assert_array_equal(compacted, labels)
+    assert compact_labels(compacted) is compacted
+
+
+def test_run_compacted():
+    def algo_method(data, offset=0):
+        return {"image": data.astype(np.int32) + offset, "labels": data.astype(np.int32), "features": []}
+
+    result = run_compacted(algo_method, np.arange(6).reshape(2, 3), label_outputs=["labels"], offset=1)
+    assert result["labels"].dtype == np.uint8
+    assert result["image"].dtype == np.int32, "Expecting the other image outputs unchanged"
@@ -0,0 +1,45 @@
+import pytest
+
+from algos.model_cache import ModelCache
+
+
+@pytest.fixture()
+def cache() -> ModelCache:
+    cache = ModelCache(max_models=2)
+    cache.register_loader("algo", lambda model_name: {"name": model_name}, lambda model: 100)
+    return cache
+
+
+def test_model_loaded_once(cache):
+    model = cache.get("algo", "a")
+    assert cache.get("algo", "a") is model, "Model should be kept in the cache"
+
+
+def test_lru_eviction(cache):
+    cache.get("algo", "a")
+    cache.get("algo", "b")
+    cache.get("algo", "a")
+    cache.get("algo", "c")
+    assert [model["model_name"] for model in cache.info()["models"]] == ["a", "c"], \
+        "The least recently used model should be evicted"
+
+
+def test_memory_budget_eviction(cache):
+    cache.max_models = 0
+    cache.max_memory = 250
+    for model_name in ["a", "b", "c"]:
+        cache.get("algo", model_name)
+    assert cache.memory == 200, "Unexpected memory usage of the cache"
+
+
+def test_model_lock(cache):
+    lock = cache.lock("algo", "a")
+    assert cache.lock("algo", "a") is lock, "Expecting a single lock per model"
+    assert cache.lock("algo", "b") is not lock
+    with lock:
+        assert not cache.lock("algo", "a").acquire(blocking=False), "The model should be used by a single thread"
+
+
+def test_unknown_algo_raises_exc(cache):
+    with pytest.raises(KeyError):
+        cache.get("ghost", "a")
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from algos.normalization import sample_pixels, sample_percentiles, normalize_percentiles
+
+
+@pytest.fixture()
+def image() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.gamma(2, 500, size=(1000, 1200, 3)).astype(np.uint16)
+
+
+def test_sample_pixels(image):
+    sample = sample_pixels(image, max_samples=10000)
+    assert sample.shape[0] * sample.shape[1] <= 10000
+    assert sample.shape[2] == 3
+    assert np.shares_memory(sample, image), "Expecting a view of the image"
+    assert sample_pixels(image, max_samples=image.size).shape == image.shape
+
+
+def test_sample_percentiles(image):
+    expected = np.percentile(image, [3, 99.8])
+    low, high = sample_percentiles(image, 3, 99.8, max_samples=100000)
+    assert low == pytest.approx(expected[0], rel=0.05)
+    assert high == pytest.approx(expected[1], rel=0.05)
+    with pytest.raises(ValueError):
+        sample_percentiles(image, 99, 1)
+
+
+def test_normalize_percentiles(image):
+    low, high = sample_percentiles(image)
+    normalized = normalize_percentiles(image, low, high)
+    assert normalized.dtype == np.float32
+    np.testing.assert_allclose(normalized, (image.astype(np.float32) - low) / (high - low), rtol=1e-5)
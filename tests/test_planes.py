@@ -0,0 +1,42 @@
+import numpy as np
+from scipy import ndimage
+
+from algos.compute_features import get_features_from_segm_mask
+from algos.planes import get_plane_axes, run_planes
+
+
+def threshold_algo(data: np.ndarray, threshold: float = 0.5) -> {}:
+    assert data.ndim == 2, "Expecting a 2D plane"
+    labels, _ = ndimage.label(data > threshold)
+    return {"image": labels, "features": get_features_from_segm_mask(labels), "count": int(labels.max())}
+
+
+def test_get_plane_axes():
+    assert get_plane_axes("TZYXC") == "TZ"
+    assert get_plane_axes("ZYX") == "Z"
+    assert get_plane_axes("YXC") == ""
+    assert get_plane_axes(None) == ""
+
+
+def test_run_planes():
+    stack = np.zeros((2, 3, 20, 30))
+    for t in range(2):
+        for z in range(3):
+            stack[t, z, 2:8, 2 + 5 * z:6 + 5 * z] = 1
+            stack[t, z, 12:18, 20:28] = t
+    result = run_planes(threshold_algo, stack, "TZYX", max_workers=2)
+    assert result["image"].shape == stack.shape
+    for t in range(2):
+        for z in range(3):
+            assert np.array_equal(result["image"][t, z], threshold_algo(stack[t, z])["image"]), "Unexpected plane"
+    assert result["count"] == [1, 1, 1, 2, 2, 2], "Expecting the other outputs in the order of the planes"
+    planes = [(feature.properties["T index"], feature.properties["Z index"]) for feature in result["features"]]
+    assert planes == [(0, 0), (0, 1), (0, 2)] + [(1, z) for z in range(3) for _ in range(2)]
+
+
+def test_run_planes_2d():
+    image = np.zeros((20, 30))
+    image[2:8, 2:6] = 1
+    result = run_planes(threshold_algo, image, "YX")
+    assert result["image"].shape == image.shape
+    assert "Z index" not in result["features"][0].properties
@@ -0,0 +1,87 @@
+import pickle
+import sys
+
+import pytest
+from pydantic import ValidationError
+
+from algos.registry import AlgoRegistry
+
+DEFINITION = {"id": 10, "name": "identity", "description": "Identity",
+              "required_parameters": [{"name": "value", "type": "int", "default_value": 1}],
+              "output_endpoints": ["image"],
+              "tiling": {"tile_size": 256, "overlap": 16},
+              "method": "tests.test_registry:run_identity"}
+
+
+def run_identity(data, **kwargs):
+    return {"image": data}
+
+
+def test_register():
+    registry = AlgoRegistry([DEFINITION])
+    assert registry.names == ["identity"] and "identity" in registry and "unknown" not in registry
+    plugin = registry.get("identity")
+    assert "method" not in plugin.info, "The method reference should not be visible to the clients"
+    assert plugin.parameters == {"value": DEFINITION["required_parameters"][0]}
+    assert plugin.resources == {"cpus": 1, "memory_mb": 0, "gpu": False}
+    assert plugin.batchable and plugin.tileable
+    assert not plugin.loaded
+    assert plugin.load() is run_identity and plugin.loaded
+    with pytest.raises(ValueError):
+        registry.register(DEFINITION)
+    with pytest.raises(ValueError):
+        registry.register({"name": "no_method"})
+
+
+def test_validate_parameters():
+    plugin = AlgoRegistry([{**DEFINITION, "required_parameters": [
+        {"name": "model_name", "type": "list", "values": ["a", "b"]},
+        {"name": "threshold", "type": "float", "min": 0, "max": 1, "default_value": 0.5}]}]).get("identity")
+    assert plugin.validate_parameters({"model_name": "a", "threshold": "0.1"}) == {"model_name": "a", "threshold": 0.1}
+    assert plugin.validate_parameters({"model_name": "b"}) == {"model_name": "b", "threshold": 0.5}
+    with pytest.raises(ValidationError) as exc_info:
+        plugin.validate_parameters({"threshold": 2})
+    assert {error["loc"][0] for error in exc_info.value.errors()} == {"model_name", "threshold"}
+
+
+def test_validate_parameters_order():
+    plugin = AlgoRegistry([{**DEFINITION, "required_parameters": [
+        {"name": "pmin", "type": "float", "default_value": 3, "less_than": "pmax"},
+        {"name": "pmax", "type": "float", "default_value": 99.8}]}]).get("identity")
+    assert plugin.validate_parameters({"pmin": 50}) == {"pmin": 50, "pmax": 99.8}
+    with pytest.raises(ValidationError) as exc_info:
+        plugin.validate_parameters({"pmin": 50, "pmax": 50})
+    assert exc_info.value.errors()[0]["type"] == "less_than_parameter"
+    with pytest.raises(ValueError):
+        AlgoRegistry([{**DEFINITION, "required_parameters": [{"name": "pmin", "type": "float", "less_than": "pmax"}]}])
+
+
+def test_discover_directory(tmp_path):
+    (tmp_path / "my_plugin.py").write_text(
+        "def run_plugin(data, **kwargs):\n"
+        "    return {'image': data}\n\n"
+        "ALGORITHMS = [{'name': 'plugin', 'output_endpoints': ['image'], 'batchable': False,\n"
+        "               'resources': {'memory_mb': 512}, 'method': run_plugin}]\n")
+    (tmp_path / "broken.py").write_text("raise ImportError('missing dependency')\n")
+    registry = AlgoRegistry()
+    with pytest.warns(UserWarning, match="broken.py"):
+        registry.discover_directory(str(tmp_path))
+    plugin = registry.get("plugin")
+    assert registry.names == ["plugin"]
+    assert not plugin.batchable and plugin.resources["memory_mb"] == 512
+    assert plugin.loaded and plugin.load()(1) == {"image": 1}
+    assert pickle.loads(pickle.dumps(plugin.load())) is plugin.load(), "Expecting the method to be picklable"
+    registry.discover_directory(str(tmp_path))
+    assert registry.names == ["plugin"], "Expecting a directory to be discovered once"
+
+
+def test_discover_entry_points(tmp_path, monkeypatch):
+    # Installed distribution declaring an entry point of the "pyalgos.algorithms" group
+    dist_info = tmp_path / "my_algos-1.0.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text("Metadata-Version: 2.1\nName: my-algos\nVersion: 1.0\n")
+    (dist_info / "entry_points.txt").write_text("[pyalgos.algorithms]\nidentity = tests.test_registry:DEFINITION\n")
+    monkeypatch.setattr(sys, "path", [str(tmp_path)] + sys.path)
+    registry = AlgoRegistry()
+    registry.discover_entry_points()
+    assert registry.names == ["identity"]
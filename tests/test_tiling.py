@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from algos.compute_features import add_measurements, get_features_from_segm_mask
+from algos.tiling import iter_tiles, run_tiled
+
+
+def threshold_algo(data: np.ndarray, threshold: float = 0.5) -> {}:
+    labels, _ = ndimage.label(data > threshold)
+    return {"image": labels, "features": get_features_from_segm_mask(labels)}
+
+
+@pytest.fixture()
+def image() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return ndimage.gaussian_filter(rng.random((120, 150)), 2)
+
+
+def test_iter_tiles_cover_image():
+    coverage = np.zeros((100, 70), dtype=int)
+    for tile, core in iter_tiles(coverage.shape, tile_size=32, overlap=8):
+        coverage[core] += 1
+        assert all(t.start <= c.start and c.stop <= t.stop for t, c in zip(tile, core))
+    assert np.all(coverage == 1), "The cores of the tiles should partition the image"
+
+
+def test_run_tiled_labels_and_features(image):
+    threshold = np.percentile(image, 80)
+    expected = threshold_algo(image, threshold=threshold)
+    result = run_tiled(threshold_algo, image, tile_size=40, overlap=20, label_outputs=["image"], max_workers=2,
+                       threshold=threshold)
+    assert result["image"].shape == image.shape
+    assert np.array_equal(result["image"] > 0, expected["image"] > 0), "Unexpected stitched objects"
+    assert len(np.unique(result["image"])) == len(np.unique(expected["image"])), "Unexpected number of objects"
+    assert len(result["features"]) == len(expected["features"]), "Objects on the tiles borders should not be duplicated"
+    assert sorted(f.properties["Detection ID"] for f in result["features"]) == list(range(1, result["image"].max() + 1))
+    for feature in result["features"]:
+        coordinates = np.asarray(feature.geometry["coordinates"][0])
+        row, col = np.round(coordinates[:, 1].mean()), np.round(coordinates[:, 0].mean())
+        assert 0 <= row < image.shape[0] and 0 <= col < image.shape[1], "Features should be in image coordinates"
+    expected_coordinates = sorted(f.geometry["coordinates"][0][0] for f in expected["features"])
+    stitched_coordinates = sorted(f.geometry["coordinates"][0][0] for f in result["features"])
+    assert expected_coordinates == stitched_coordinates, "Unexpected geometry of the stitched features"
+
+
+def boxes_algo(data: np.ndarray) -> {}:
+    """ Detect boxes depending on the tile (the data being the column of each pixel): an object in the first tile,
+    and in the second tile another detection of this object & an object overlapping it """
+    first_col = int(data[0, 0])
+    boxes = [np.s_[5:15, 14:24]] if first_col == 0 else [np.s_[5:11, 16:26], np.s_[11:19, 20:30]]
+    labels = np.zeros(data.shape, dtype=np.int32)
+    for label, (rows, cols) in enumerate(boxes, start=1):
+        labels[rows, cols.start - first_col:cols.stop - first_col] = label
+    return {"image": labels, "features": add_measurements(get_features_from_segm_mask(labels), labels, data)}
+
+
+def test_run_tiled_overlapping_objects():
+    data = np.tile(np.arange(40, dtype=np.float64), (20, 1))
+    result = run_tiled(boxes_algo, data, tile_size=20, overlap=6, label_outputs=["image"], max_workers=1)
+    labels = result["image"]
+    assert sorted(np.unique(labels).tolist()) == [0, 1, 2], "Expecting the second detection of the object dropped"
+    assert np.all(labels[5:15, 14:24] == 1) and np.count_nonzero(labels == 2) == 8 * 10 - 4 * 4
+    assert [feature.properties["Detection ID"] for feature in result["features"]] == [1, 2]
+    clipped = result["features"][1]
+    expected = add_measurements(get_features_from_segm_mask((labels == 2).astype(np.int32)), labels == 2, data)[0]
+    assert clipped.geometry["coordinates"] == expected.geometry["coordinates"], "Expecting the stitched contour"
+    for name in ["Area", "Centroid X", "Centroid Y", "Channel 1 mean"]:
+        assert clipped.properties[name] == pytest.approx(expected.properties[name]), name